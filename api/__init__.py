@@ -14,4 +14,5 @@ from . import (
     submissions,
     study_plan,
     planes,
+    dashboard,
 )
@@ -15,9 +15,12 @@ from flask_login import login_required, current_user
 
 from extensions import db
 from models import User, Profile, Institution, RoleEnum, Grade, Section
+from api.utils.pagination import decode_cursor, encode_cursor, parse_limit
 from api.utils.permissions import require_roles, get_current_profile
 from api.institution import _normalize_hex_color, _normalize_rewards
-from services import save_logo
+from services import save_logo, release_blob
+from services.roster_import_service import RosterImportService
+from services.user_directory_service import UserDirectoryService
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -28,65 +31,60 @@ admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 def admin_usuarios():
     """
     Pantalla de administración básica de usuarios:
-    - Lista usuarios + perfiles
+    - Directorio paginado (q = prefijo de email o nombre, role, institution_id, cursor)
     - Formulario para crear nuevo usuario
     """
-    profile = get_current_profile()
+    return _render_user_directory(get_current_profile())
+
+
+def _render_user_directory(profile, import_report=None):
     instituciones = _institutions_for_profile(profile)
     if not instituciones:
         flash("Crea una institución desde 'Estructura escolar' antes de agregar usuarios.", "info")
 
-    if profile and profile.role and profile.role.name == "ADMIN":
-        return redirect(url_for("owner_institutions"))
-
-    if profile and profile.role and profile.role.name != "ADMIN":
-        usuarios = (
-            User.query.join(User.profiles)
-            .filter(Profile.institution_id == profile.institution_id)
-            .distinct()
-            .order_by(User.email.asc())
-            .all()
-        )
-        perfiles = (
-            Profile.query.filter_by(institution_id=profile.institution_id)
-            .order_by(Profile.full_name.asc())
-            .all()
+    viewer_is_owner = UserDirectoryService.is_owner(profile)
+    filtros = {
+        "q": (request.args.get("q") or "").strip(),
+        "role": (request.args.get("role") or "").strip(),
+        "institution_id": request.args.get("institution_id", type=int) if viewer_is_owner else None,
+    }
+    try:
+        role = RoleEnum[filtros["role"]] if filtros["role"] else None
+        after = decode_cursor(request.args.get("cursor"))
+    except (KeyError, ValueError):
+        flash("Filtro inválido; mostramos el listado completo.", "warning")
+        role, after = None, None
+        filtros.update(role="")
+
+    directorio = UserDirectoryService.page(
+        profile,
+        q=filtros["q"],
+        role=role,
+        institution_id=filtros["institution_id"],
+        limit=parse_limit(request.args.get("limit"), default=UserDirectoryService.PAGE_SIZE, maximum=200),
+        after=after,
+    )
+    next_url = None
+    if directorio["next"]:
+        next_url = url_for(
+            "admin.admin_usuarios",
+            cursor=encode_cursor(*directorio["next"]),
+            **{key: value for key, value in filtros.items() if value},
         )
-    else:
-        usuarios = User.query.order_by(User.email.asc()).all()
-        perfiles = Profile.query.order_by(Profile.full_name.asc()).all()
-    roles = list(RoleEnum)
-
-    perfiles_por_user = {}
-    for p in perfiles:
-        perfiles_por_user.setdefault(p.user_id, []).append(p)
-
-    perfiles_visible: dict[int, list] = {}
-    usuarios_visibles: list[User] = []
-    manageable_users: dict[int, bool] = {}
-    viewer_is_owner = bool(profile and profile.role and profile.role.name == "ADMIN")
-
-    for usuario in usuarios:
-        perfiles_usuario = perfiles_por_user.get(usuario.id, [])
-        if not viewer_is_owner:
-            perfiles_usuario = [
-                p for p in perfiles_usuario if getattr(p.role, "name", None) != "ADMIN"
-            ]
-        if not perfiles_usuario:
-            continue
-        perfiles_visible[usuario.id] = perfiles_usuario
-        usuarios_visibles.append(usuario)
-        manageable_users[usuario.id] = _can_manage_user(profile, usuario)
 
     return render_template(
         "admin_config.html",
-        usuarios=usuarios_visibles,
-        perfiles_por_user=perfiles_visible,
+        usuarios=directorio["users"],
+        perfiles_por_user=directorio["profiles_by_user"],
         instituciones=instituciones,
         has_institutions=bool(instituciones),
-        roles=roles,
-        manageable_users=manageable_users,
+        roles=list(RoleEnum),
+        manageable_users={user_id: True for user_id in directorio["manageable"]},
         can_manage_all=viewer_is_owner,
+        filtros=filtros,
+        is_paged=bool(after),
+        next_url=next_url,
+        import_report=import_report,
         is_admin=True,
     )
 
@@ -154,6 +152,42 @@ def admin_crear_usuario():
     return redirect(url_for("admin.admin_usuarios"))
 
 
+@admin_bp.post("/usuarios/importar")
+@login_required
+@require_roles("ADMIN", "ADMIN_COLEGIO")
+def admin_importar_usuarios():
+    """
+    Alta masiva desde un padrón CSV/XLSX (columnas: email, nombre, rol, y opcionales
+    contraseña y sección). Con "dry_run" sólo valida y muestra el reporte.
+    """
+    profile = get_current_profile()
+    roster = request.files.get("roster")
+    if not roster or not roster.filename:
+        flash("Seleccioná un archivo .csv o .xlsx.", "error")
+        return redirect(url_for("admin.admin_usuarios"))
+
+    if UserDirectoryService.is_owner(profile):
+        institution = Institution.query.get(request.form.get("institution_id", type=int) or 0)
+    else:
+        institution = Institution.query.get(profile.institution_id) if profile.institution_id else None
+    if not institution:
+        flash("Institución inválida.", "error")
+        return redirect(url_for("admin.admin_usuarios"))
+
+    dry_run = bool(request.form.get("dry_run"))
+    try:
+        report = RosterImportService.import_roster(institution, roster.stream, roster.filename, dry_run=dry_run)
+    except ValueError as exc:
+        flash(str(exc), "error")
+        return redirect(url_for("admin.admin_usuarios"))
+
+    if dry_run:
+        flash(f"Simulación: {report['valid_rows']} de {report['total_rows']} filas se pueden importar.", "info")
+    else:
+        flash(f"Importamos {report['created_profiles']} perfiles ({report['created_users']} usuarios nuevos).", "success")
+    return _render_user_directory(profile, import_report=report)
+
+
 @admin_bp.post("/usuarios/<int:user_id>/reset_password")
 @login_required
 @require_roles("ADMIN_COLEGIO")
@@ -487,6 +521,10 @@ def cms():
 
         inst.name = name
         saved_logo = save_logo(logo_file)
+        if saved_logo and saved_logo == inst.logo_url:
+            # Mismo contenido que el logo actual: la referencia que sumó save_logo sobra.
+            # (Si el logo cambia, el anterior se libera al hacer flush.)
+            release_blob(saved_logo)
         inst.logo_url = saved_logo or inst.logo_url
 
         try:
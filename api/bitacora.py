@@ -1,12 +1,15 @@
 from flask import request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
 from extensions import db
-from models import BitacoraEntrada, Profile, Lesson
+from models import BitacoraEntrada, BitacoraCategoria, Profile, Lesson
 from . import api_bp
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from api.services.attachment_service import AttachmentService
 from api.utils.attachments_helper import serialize_attachment
+from api.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from services.attachment_loader import AttachmentLoader
 
 
 def _can_write(author_profile: Profile):
@@ -105,15 +108,24 @@ def bitacora_create():
     )
 
 
+SUMMARY_NOTE_LENGTH = 140
+
+
 @api_bp.get("/bitacora/<int:student_profile_id>")
 @login_required
 def bitacora_list(student_profile_id):
     """
-    Lista entradas de bitácora por alumno.
+    Lista entradas de bitácora por alumno, de la más nueva a la más vieja, paginadas por
+    cursor (created_at, id).
     Respeta visibilidad según rol:
     - Padre → visible_para_padres = True
     - Alumno → visible_para_alumno = True
     - Profesor/Psicopedagogo/Admin → todo
+    Query params opcionales:
+    - limit (1-200, default 50) y cursor (next_cursor de la página anterior)
+    - categoria: una o varias separadas por coma (DISCIPLINA, APRENDIZAJE, ...)
+    - desde / hasta: YYYY-MM-DD (ambos inclusive)
+    - modo=resumen: sin adjuntos ni nota completa, sólo la cantidad de adjuntos
     """
 
     author_profile = Profile.query.filter_by(user_id=current_user.id).first()
@@ -125,6 +137,15 @@ def bitacora_list(student_profile_id):
     is_parent = author_profile.role.name == "PADRE"
     is_student = author_profile.role.name == "ALUMNO"
 
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        cursor = _parse_cursor(request.args.get("cursor"))
+        categorias = _parse_categorias(request.args.get("categoria"))
+        desde = _parse_day(request.args.get("desde"), "desde")
+        hasta = _parse_day(request.args.get("hasta"), "hasta")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     query = BitacoraEntrada.query.filter_by(student_profile_id=student_profile_id)
 
     if is_parent:
@@ -133,15 +154,81 @@ def bitacora_list(student_profile_id):
     if is_student:
         query = query.filter_by(visible_para_alumno=True)
 
-    entries = query.order_by(BitacoraEntrada.created_at.desc()).all()
-
-    return jsonify([_serialize_entry(e) for e in entries])
+    if categorias:
+        query = query.filter(BitacoraEntrada.categoria.in_(categorias))
+    if desde:
+        query = query.filter(BitacoraEntrada.created_at >= desde)
+    if hasta:
+        query = query.filter(BitacoraEntrada.created_at < hasta + timedelta(days=1))
+    if cursor:
+        cursor_created_at, cursor_id = cursor
+        query = query.filter(
+            or_(
+                BitacoraEntrada.created_at < cursor_created_at,
+                and_(BitacoraEntrada.created_at == cursor_created_at, BitacoraEntrada.id < cursor_id),
+            )
+        )
+
+    # Una fila de más para saber si hay otra página sin contar el total.
+    entries = (
+        query.order_by(BitacoraEntrada.created_at.desc(), BitacoraEntrada.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    if request.args.get("modo") == "resumen":
+        attachment_counts = AttachmentLoader.counts(entries)
+        payload = [_summarize_entry(e, attachment_counts.get(e.id, 0)) for e in entries]
+    else:
+        AttachmentLoader.preload(entries)
+        payload = [_serialize_entry(e) for e in entries]
+
+    next_cursor = None
+    if has_more:
+        last = entries[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return jsonify({"entradas": payload, "next_cursor": next_cursor})
+
+
+def _parse_cursor(raw: str | None) -> tuple[datetime, int] | None:
+    """(created_at, id) del cursor; ValueError si no tiene esa forma."""
+    values = decode_cursor(raw, datetime_positions=(0,))
+    if values is None:
+        return None
+    if len(values) != 2 or type(values[1]) is not int:
+        raise ValueError("cursor inválido")
+    return values[0], values[1]
+
+
+def _parse_categorias(raw: str | None) -> list[BitacoraCategoria]:
+    categorias = []
+    for token in (raw or "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        try:
+            categorias.append(BitacoraCategoria[token.upper()])
+        except KeyError:
+            raise ValueError(f"categoria inválida: {token}")
+    return categorias
+
+
+def _parse_day(raw: str | None, field: str) -> datetime | None:
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{field} debe tener formato YYYY-MM-DD")
 
 
 def _serialize_entry(entry: BitacoraEntrada) -> dict:
     return {
         "id": entry.id,
-        "categoria": entry.categoria,
+        "categoria": entry.categoria.value if entry.categoria else None,
         "nota": entry.nota,
         "lesson_id": entry.lesson_id,
         "created_at": entry.created_at.isoformat() if entry.created_at else None,
@@ -150,3 +237,16 @@ def _serialize_entry(entry: BitacoraEntrada) -> dict:
         "author_profile_id": entry.author_profile_id,
         "attachments": [serialize_attachment(att) for att in (entry.attachments or [])],
     }
+
+
+def _summarize_entry(entry: BitacoraEntrada, attachment_count: int) -> dict:
+    nota = entry.nota or ""
+    if len(nota) > SUMMARY_NOTE_LENGTH:
+        nota = nota[: SUMMARY_NOTE_LENGTH - 1].rstrip() + "…"
+    return {
+        "id": entry.id,
+        "categoria": entry.categoria.value if entry.categoria else None,
+        "nota": nota,
+        "created_at": entry.created_at.isoformat() if entry.created_at else None,
+        "attachment_count": attachment_count,
+    }
@@ -0,0 +1,140 @@
+from flask import request, jsonify
+from flask_login import login_required
+
+from api.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from api.utils.permissions import get_current_profile, require_roles
+from services.ai_client import AIClient
+from services.ai_providers import AIProviderHealth
+from services.ai_scheduler import AIScheduler
+from services.fragment_cache import FragmentCache
+from services.view_data_service import ViewDataService
+from . import api_bp
+
+
+@api_bp.get("/dashboard/clases")
+@login_required
+def dashboard_lessons():
+    """
+    Listado completo de clases del profesor logueado, paginado por cursor.
+    Lo usa el panel docente para cargar clases a demanda (limit, cursor).
+    """
+    profile = get_current_profile()
+    if not profile:
+        return jsonify({"error": "No autenticado"}), 401
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=100)
+        after = _lessons_cursor(request.args.get("cursor"))
+        lessons, next_values = ViewDataService.teacher_lessons_page(profile, limit=limit, after=after)
+    except (ValueError, TypeError):
+        return jsonify({"error": "cursor inválido"}), 400
+
+    return jsonify(
+        {
+            "clases": [
+                {
+                    "id": lesson.id,
+                    "title": lesson.title,
+                    "class_date": lesson.class_date.isoformat() if lesson.class_date else None,
+                    "start_time": str(lesson.start_time) if lesson.start_time else None,
+                    "section_id": lesson.section_id,
+                }
+                for lesson in lessons
+            ],
+            "next_cursor": encode_cursor(*next_values) if next_values else None,
+        }
+    )
+
+
+@api_bp.get("/dashboard/tareas")
+@login_required
+def dashboard_tasks():
+    """
+    Listado completo de tareas de las clases del profesor logueado, por fecha de entrega.
+    """
+    profile = get_current_profile()
+    if not profile:
+        return jsonify({"error": "No autenticado"}), 401
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=100)
+        after = _tasks_cursor(request.args.get("cursor"))
+        tasks, next_values = ViewDataService.teacher_tasks_page(profile, limit=limit, after=after)
+    except (ValueError, TypeError):
+        return jsonify({"error": "cursor inválido"}), 400
+
+    return jsonify(
+        {
+            "tareas": [
+                {
+                    "id": task.id,
+                    "title": task.title,
+                    "due_date": task.due_date.isoformat() if task.due_date else None,
+                    "lesson_id": task.lesson_id,
+                    "lesson_title": task.lesson.title if task.lesson else None,
+                }
+                for task in tasks
+            ],
+            "next_cursor": encode_cursor(*next_values) if next_values else None,
+        }
+    )
+
+
+def _lessons_cursor(raw: str | None) -> list | None:
+    """[class_date, id] del cursor de clases; ValueError si no tiene esa forma."""
+    values = decode_cursor(raw)
+    if values is not None and (len(values) != 2 or not isinstance(values[0], str) or type(values[1]) is not int):
+        raise ValueError("cursor inválido")
+    return values
+
+
+def _tasks_cursor(raw: str | None) -> list | None:
+    """[sin_fecha, due_date, id] del cursor de tareas; ValueError si no tiene esa forma."""
+    values = decode_cursor(raw)
+    if values is None:
+        return None
+    if len(values) != 3 or type(values[0]) is not bool or type(values[2]) is not int:
+        raise ValueError("cursor inválido")
+    if not values[0] and not isinstance(values[1], str):
+        raise ValueError("cursor inválido")
+    return values
+
+
+@api_bp.get("/dashboard/cache")
+@login_required
+@require_roles("ADMIN")
+def dashboard_fragment_cache_stats():
+    """
+    Aciertos / fallos del cache de fragmentos de los paneles, por fragmento.
+    """
+    return jsonify({"fragmentos": FragmentCache.stats()})
+
+
+@api_bp.get("/dashboard/ai-prompts")
+@login_required
+@require_roles("ADMIN")
+def dashboard_ai_prompt_stats():
+    """
+    Tamaño de los prompts enviados a la IA (tokens estimados) por punto de llamada.
+    """
+    return jsonify({"prompts": AIClient.prompt_stats()})
+
+
+@api_bp.get("/dashboard/ai-scheduler")
+@login_required
+@require_roles("ADMIN")
+def dashboard_ai_scheduler_stats():
+    """
+    Estado del planificador de IA de este proceso: llamadas en curso, cola y espera por prioridad.
+    """
+    return jsonify(AIScheduler.default().stats())
+
+
+@api_bp.get("/dashboard/ai-providers")
+@login_required
+@require_roles("ADMIN")
+def dashboard_ai_provider_health():
+    """
+    Salud de cada endpoint de IA en este proceso: circuito, fallos, latencias y hedges.
+    """
+    return jsonify({"endpoints": AIProviderHealth.stats()})
@@ -58,6 +58,7 @@ def update_institution(inst_id):
 
 
 HEX_COLOR_RE = re.compile(r"^#(?:[0-9a-fA-F]{3}){1,2}$")
+PROVIDER_NAME_RE = re.compile(r"^[a-z0-9_-]{1,40}$")
 
 
 def _normalize_hex_color(raw):
@@ -69,6 +70,13 @@ def _normalize_hex_color(raw):
     return raw.upper()
 
 
+def _normalize_provider_chain(raw):
+    """'OpenAI, local' -> 'openai,local'; descarta nombres inválidos o repetidos."""
+    names = [part.strip().lower() for part in (raw or "").split(",")]
+    names = [name for name in dict.fromkeys(names) if PROVIDER_NAME_RE.match(name)]
+    return ",".join(names)[:255] or None
+
+
 def _normalize_rewards(rewards_payload):
     if rewards_payload is None:
         return None
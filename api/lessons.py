@@ -124,14 +124,14 @@ def lesson_ai_brief():
         section = Section.query.get(section_id)
         if not section or section.grade.institution_id != profile.institution_id:
             return jsonify({"error": "Sección inválida."}), 403
-        grade_name = section.grade.name if section.grade else None
-        section_label = f"{grade_name or 'Grupo'} · {section.name}"
+        section_label = AuthoringService.section_label(section)
 
     brief = AuthoringService.generate_lesson_brief(
         lesson=lesson,
         objective=objective,
         section_label=section_label,
         title=title,
+        use_cache=not data.get("refresh"),
     )
     return jsonify(brief)
 
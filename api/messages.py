@@ -10,6 +10,7 @@ from api.services.messages_service import MessageService
 from api.services.profile_service import ProfileService
 from api.services.attachment_service import AttachmentService
 from api.utils.messages_helper import serialize_message
+from services.attachment_loader import AttachmentLoader
 
 
 # 🔹 CREAR / OBTENER THREAD PARA LECCIÓN
@@ -119,6 +120,7 @@ def list_lesson_messages(lesson_id):
     )
 
     msgs = MessageService.list_thread_messages(thread.id, viewer_profile=profile)
+    AttachmentLoader.preload(msgs)
 
     return jsonify([serialize_message(m) for m in msgs])
 
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import hashlib
+
 from flask import jsonify, request, current_app
 from flask_login import login_required
-from sqlalchemy import func, or_
 
-from extensions import db
-from models import Plan, PlanItem, Grade, StudyPlan
+from extensions import db, replica_reads
+from models import Plan, Grade, StudyPlan
 from services.plan_parser_service import PlanParserService
 from services.curriculum_service import CurriculumService
+from services.plan_index_service import PlanIndexService
 from api.utils.permissions import get_current_profile
 
 from . import api_bp
@@ -122,62 +124,91 @@ def _grade_filters(plan: Plan, grade_label_raw: str | None, grade_id_raw: str |
     return grade_label, normalized, None
 
 
-def _filter_items_by_grade(plan: Plan, grade_label: str | None, normalized: str | None):
-    query = PlanItem.query.filter_by(plan_id=plan.id)
-    if normalized:
-        query = query.filter(
-            or_(
-                PlanItem.grado_normalizado == normalized,
-                func.lower(PlanItem.grado) == func.lower(grade_label),
-            )
-        )
-    elif grade_label:
-        query = query.filter(func.lower(PlanItem.grado) == func.lower(grade_label))
-    return query.order_by(PlanItem.area.asc(), PlanItem.created_at.asc()).all()
-
-
-def _serialize_suggestion(item: PlanItem) -> dict:
-    metadata = item.metadata_dict
-    class_ideas = metadata.get("class_ideas") if isinstance(metadata.get("class_ideas"), list) else []
-    title = (
-        metadata.get("title")
-        or metadata.get("titulo")
-        or metadata.get("name")
-        or metadata.get("nombre")
-        or f"{item.area} · Objetivo"
-    )
-    return {
-        "id": item.id,
-        "grado": item.grado,
-        "area": item.area,
-        "title": title,
-        "descripcion": item.descripcion,
-        "description": item.descripcion,
-        "class_ideas": class_ideas,
-        "period": metadata.get("period") or metadata.get("periodo"),
-        "metadata": metadata,
+def _index_etag(plan: Plan, *parts) -> str:
+    """
+    ETag de una respuesta de sugerencias: etag del índice del plan + endpoint y filtros.
+    Los GET no reconstruyen el índice (pueden leer de la réplica): sin índice guardado se
+    responde con el calculado en memoria (PlanIndexService.current_etag).
+    """
+    seed = "|".join([PlanIndexService.current_etag(plan), *(str(part or "") for part in parts)])
+    return hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag: str):
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        return _with_etag(response, etag)
+    return None
+
+
+def _with_etag(response, etag: str):
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@api_bp.get("/planes/<int:plan_id>/progreso")
+@login_required
+def plan_progreso(plan_id: int):
+    plan, _profile, error = _require_plan(plan_id)
+    if error:
+        return error
+    payload = PlanParserService.progress(plan)
+    payload["documentos"] = {
+        str(plan_document_id): progress
+        for plan_document_id, progress in PlanParserService.progress_by_document(
+            [doc.id for doc in plan.study_plan.plan_documents] if plan.study_plan else []
+        ).items()
     }
+    return jsonify(payload)
+
+
+@api_bp.post("/planes/<int:plan_id>/reanudar")
+@login_required
+def plan_reanudar(plan_id: int):
+    plan, _profile, error = _require_plan(plan_id)
+    if error:
+        return error
+    plan_documents = plan.study_plan.plan_documents if plan.study_plan else []
+    try:
+        if plan_documents:
+            # Los planes con documentos se retoman por documento para no mezclar sus ítems.
+            progress = PlanParserService.progress_by_document([doc.id for doc in plan_documents])
+            items_total = 0
+            for plan_document in plan_documents:
+                if (progress.get(plan_document.id) or {}).get("status") in {"processing", "partial"}:
+                    items_total += PlanParserService.resume(plan, plan_document=plan_document)
+        else:
+            items_total = PlanParserService.resume(plan)
+        db.session.commit()
+    except Exception as exc:  # pragma: no cover - depends on external provider
+        current_app.logger.exception("No se pudo retomar el plan: %s", exc)
+        db.session.rollback()
+        return jsonify({"error": "No se pudo retomar el plan. Lo ya procesado se conserva."}), 500
+
+    payload = PlanParserService.progress(plan)
+    payload["items_generados"] = items_total
+    return jsonify(payload)
 
 
 @api_bp.get("/planes/<int:plan_id>/grados")
 @login_required
+@replica_reads()
 def plan_grados(plan_id: int):
     plan, _profile, error = _require_plan(plan_id)
     if error:
         return error
-    rows = (
-        db.session.query(PlanItem.grado)
-        .filter(PlanItem.plan_id == plan.id, PlanItem.grado.isnot(None))
-        .distinct()
-        .order_by(PlanItem.grado.asc())
-        .all()
-    )
-    grados = [row[0] for row in rows if row[0]]
-    return jsonify({"grados": grados})
+    etag = _index_etag(plan, "grados")
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    return _with_etag(jsonify({"grados": PlanIndexService.grades(plan)}), etag)
 
 
 @api_bp.get("/planes/<int:plan_id>/areas")
 @login_required
+@replica_reads()
 def plan_areas(plan_id: int):
     plan, _profile, error = _require_plan(plan_id)
     if error:
@@ -193,13 +224,19 @@ def plan_areas(plan_id: int):
         message, status = grade_error
         return jsonify({"error": message}), status
 
-    items = _filter_items_by_grade(plan, grade_label, normalized)
-    areas = sorted({item.area for item in items if item.area})
-    return jsonify({"areas": areas})
+    etag = _index_etag(plan, "areas", grade_label, normalized)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    entries = PlanIndexService.areas_for_grade(plan, grade_label, normalized)
+    areas = sorted({entry["area"] for entry in entries if entry["area"]})
+    return _with_etag(jsonify({"areas": areas}), etag)
 
 
 @api_bp.get("/planes/<int:plan_id>/sugerencias")
 @login_required
+@replica_reads()
 def plan_sugerencias(plan_id: int):
     plan, _profile, error = _require_plan(plan_id)
     if error:
@@ -216,25 +253,23 @@ def plan_sugerencias(plan_id: int):
         message, status = grade_error
         return jsonify({"error": message}), status
 
-    items = _filter_items_by_grade(plan, grade_label, normalized)
-    if not items:
+    etag = _index_etag(plan, "sugerencias", grade_label, normalized, area_param)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    entries = PlanIndexService.areas_for_grade(plan, grade_label, normalized)
+    if not entries:
         return jsonify({"areas": [], "message": "No encontramos contenidos para ese grado."}), 404
 
     if area_param:
-        filtered = [item for item in items if item.area == area_param]
-        return jsonify([_serialize_suggestion(item) for item in filtered])
-
-    grouped: dict[str, list[PlanItem]] = {}
-    for item in items:
-        grouped.setdefault(item.area, []).append(item)
-
-    payload = []
-    for area_name, area_items in sorted(grouped.items(), key=lambda entry: entry[0].lower()):
-        payload.append(
-            {
-                "area": area_name,
-                "suggestions": [_serialize_suggestion(item) for item in area_items],
-            }
-        )
-
-    return jsonify({"areas": payload})
+        filtered = [
+            suggestion
+            for entry in entries
+            if entry["area"] == area_param
+            for suggestion in entry["suggestions"]
+        ]
+        return _with_etag(jsonify(filtered), etag)
+
+    payload = sorted(entries, key=lambda entry: entry["area"].lower())
+    return _with_etag(jsonify({"areas": payload}), etag)
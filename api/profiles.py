@@ -1,7 +1,11 @@
 from flask import request, jsonify, url_for
 from flask_login import login_required
 from extensions import db
-from models import Profile, User, RoleEnum
+from models import Institution, Profile, User, RoleEnum
+from api.utils.pagination import parse_limit
+from api.utils.permissions import get_current_profile, require_roles
+from services.recipient_search_service import RecipientSearchService
+from services.roster_import_service import RosterImportService
 from . import api_bp
 from datetime import datetime, timedelta
 import uuid
@@ -95,4 +99,66 @@ def create_profile(inst_id):
     return jsonify({
         "id": profile.id,
         "status": "created"
-    }), 201
\ No newline at end of file
+    }), 201
+
+
+@api_bp.get("/profiles/buscar")
+@login_required
+@require_roles("PROFESOR", "ADMIN_COLEGIO", "PSICOPEDAGOGIA", "RECTOR")
+def search_recipients():
+    """
+    Typeahead de destinatarios: perfiles de la institución del usuario logueado cuyo
+    nombre (sin tildes) empieza por q, o cuyo rol/grupo empieza por q.
+    Parámetros: q (mín. 2 caracteres), grupo (students | parents | staff), limit.
+    Sólo para el equipo (los mismos roles que ven Mensajes, Insights y el panel docente).
+    """
+    profile = get_current_profile()
+    if not profile.institution_id:
+        return jsonify({"error": "Sin institución asociada"}), 403
+
+    try:
+        limit = parse_limit(
+            request.args.get("limit"),
+            default=RecipientSearchService.DEFAULT_LIMIT,
+            maximum=RecipientSearchService.MAX_LIMIT,
+        )
+        results = RecipientSearchService.search(
+            profile,
+            request.args.get("q"),
+            group=request.args.get("grupo") or None,
+            limit=limit,
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    return jsonify({"resultados": [RecipientSearchService.serialize(item) for item in results]})
+
+
+@api_bp.post("/institutions/<int:inst_id>/profiles/import")
+@login_required
+@require_roles("ADMIN", "ADMIN_COLEGIO")
+def import_profiles(inst_id):
+    """
+    Importa un padrón (multipart, campo "file": .csv o .xlsx) en la institución.
+    ?dry_run=1 valida sin escribir. Devuelve el reporte con errores por fila y tiempos, y
+    (sin dry_run) el enlace de activación de cada familia o cuenta sin contraseña.
+    """
+    profile = get_current_profile()
+    if profile.role != RoleEnum.ADMIN and profile.institution_id != inst_id:
+        return jsonify({"error": "Sin permisos sobre esta institución"}), 403
+
+    institution = Institution.query.get(inst_id)
+    if not institution:
+        return jsonify({"error": "Institución no encontrada"}), 404
+
+    roster = request.files.get("file")
+    if not roster or not roster.filename:
+        return jsonify({"error": "Falta el archivo (campo file)"}), 400
+
+    dry_run = request.args.get("dry_run", "").lower() in ("1", "true", "si", "sí")
+    try:
+        report = RosterImportService.import_roster(institution, roster.stream, roster.filename, dry_run=dry_run)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    return jsonify(report), (200 if dry_run else 201)
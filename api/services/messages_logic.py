@@ -4,6 +4,7 @@ from typing import List, Dict
 
 from api.services.messages_service import MessageService
 from api.utils.messages_helper import serialize_message
+from services.attachment_loader import AttachmentLoader
 
 
 class MessageLogic:
@@ -32,4 +33,5 @@ class MessageLogic:
     @staticmethod
     def get_thread_messages_serialized(thread_id: int) -> List[Dict]:
         msgs = MessageService.list_thread_messages(thread_id)
+        AttachmentLoader.preload(msgs)
         return [serialize_message(m) for m in msgs]
\ No newline at end of file
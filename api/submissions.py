@@ -4,7 +4,9 @@ from flask import request, jsonify, abort
 from flask_login import login_required, current_user
 
 from . import api_bp
-from models import Task, TaskSubmission
+from sqlalchemy.orm import selectinload
+
+from models import SubmissionEvidence, Task, TaskSubmission
 from api.services.profile_service import ProfileService
 from api.services.submission_service import SubmissionService
 from api.utils.submissions_helper import serialize_submission
@@ -57,7 +59,11 @@ def list_task_submissions(task_id):
     except PermissionError as exc:
         return jsonify({"error": str(exc)}), 403
 
-    query = TaskSubmission.query.filter_by(task_id=task_id).order_by(TaskSubmission.submitted_at.desc())
+    query = (
+        TaskSubmission.query.filter_by(task_id=task_id)
+        .options(selectinload(TaskSubmission.evidences).joinedload(SubmissionEvidence.attachment))
+        .order_by(TaskSubmission.submitted_at.desc())
+    )
 
     if profile.role and profile.role.name == "ALUMNO":
         query = query.filter_by(student_profile_id=profile.id)
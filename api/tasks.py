@@ -13,6 +13,7 @@ from api.services.profile_service import ProfileService
 from api.services.attachment_service import AttachmentService
 from api.utils.messages_helper import serialize_message
 from api.utils.attachments_helper import serialize_attachment
+from services.attachment_loader import AttachmentLoader
 from services.authoring_service import AuthoringService
 from services.help_rules import HELP_DETAIL_MODES, DEFAULT_HELP_DETAIL_MODE
 
@@ -126,6 +127,7 @@ def list_tasks(lesson_id):
         return jsonify({"error": str(exc)}), 403
 
     tasks = Task.query.filter_by(lesson_id=lesson_id).all()
+    AttachmentLoader.preload(tasks)
 
     return jsonify([_serialize_task(t) for t in tasks])
 
@@ -153,6 +155,7 @@ def task_ai_brief():
         lesson=lesson,
         objective=objective,
         due_date=data.get("due_date"),
+        use_cache=not data.get("refresh"),
     )
     return jsonify(brief)
 
@@ -281,6 +284,7 @@ def list_task_messages(task_id):
     )
 
     msgs = MessageService.list_thread_messages(thread.id, viewer_profile=current_profile)
+    AttachmentLoader.preload(msgs)
 
     return jsonify([serialize_message(m) for m in msgs])
 
@@ -0,0 +1,41 @@
+# api/utils/pagination.py
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+
+
+def parse_limit(raw, *, default: int = 50, maximum: int = 200) -> int:
+    try:
+        limit = int(raw) if raw not in (None, "") else default
+    except (TypeError, ValueError):
+        raise ValueError("limit debe ser un entero")
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values) -> str:
+    """
+    Cursor opaco para paginación por keyset: los valores de orden de la última fila entregada.
+    Las fechas viajan en ISO 8601.
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None, *, datetime_positions: tuple[int, ...] = ()) -> list | None:
+    """Inversa de encode_cursor; ValueError si el cursor no es válido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError
+        for position in datetime_positions:
+            values[position] = datetime.fromisoformat(values[position])
+    except (ValueError, TypeError, IndexError, UnicodeError):
+        raise ValueError("cursor inválido")
+    return values
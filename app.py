@@ -1,10 +1,16 @@
 # app.py
+import hashlib
 import json
 import os
+import queue
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from pathlib import Path
 
+import click
+
 try:
     from dotenv import load_dotenv
 except ImportError:  # pragma: no cover - optional dependency
@@ -21,23 +27,33 @@ from flask import (
     current_app,
     Response,
     jsonify,
-    send_from_directory,
+    stream_with_context,
 )
 from flask_migrate import Migrate
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
 
 from config import Config
-from extensions import db, login_manager
+from extensions import db, login_manager, replica_reads
 from services import (
     ViewDataService,
     InsightsService,
     AIInsightsService,
+    AuthoringService,
+    InsightBatchService,
     HelpUsageService,
     CurriculumService,
     PlanParserService,
+    PlanIndexService,
     AIClient,
+    AITelemetry,
+    AsyncAIClient,
+    FileDeliveryService,
+    FragmentCache,
+    ImageDerivativeService,
+    SQLitePragmas,
     save_logo,
+    save_upload,
+    release_blob,
 )
 from services.help_rules import (
     HELP_DETAIL_MODE_ORDER,
@@ -48,7 +64,7 @@ from services.help_rules import (
     STYLE_LABELS,
     DEFAULT_HELP_DETAIL_MODE,
 )
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import joinedload
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -66,6 +82,17 @@ Actúa como tutor pedagógico personalizado. Con la consigna, las ayudas base y
 Devuelve únicamente el texto listo para mostrar en pantalla.
 """.strip()
 
+OBJECTIVE_SUGGESTIONS_PROMPT = (
+    "Actúas como coordinador pedagógico senior. A partir de los fragmentos siguientes, "
+    "propone objetivos claros para el grado y área indicados. Cada objetivo debe incluir: "
+    "título breve, descripción (qué se espera lograr) y una lista de 2-4 ideas de clases. "
+    "Devuelve únicamente JSON válido con el formato:\n"
+    "{ \"objectives\": [ { \"title\": \"...\", \"description\": \"...\", \"class_ideas\": [\"...\"] } ] }\n"
+    "No agregues texto fuera del JSON."
+)
+# Incrementar al cambiar OBJECTIVE_SUGGESTIONS_PROMPT para invalidar las sugerencias cacheadas.
+OBJECTIVE_SUGGESTIONS_VERSION = "1"
+
 
 def create_app() -> Flask:
     """
@@ -80,6 +107,7 @@ def create_app() -> Flask:
 
     # Extensiones
     db.init_app(app)
+    SQLitePragmas.init_app(app)
     login_manager.init_app(app)
 
     # User loader para Flask-Login
@@ -104,6 +132,48 @@ def create_app() -> Flask:
     # Migraciones (Alembic/Flask-Migrate)
     Migrate(app, db)
 
+    # Variantes redimensionadas de imágenes subidas: {{ url|image_variant("thumb") }}
+    app.add_template_filter(ImageDerivativeService.variant_url, "image_variant")
+
+    # Cache de fragmentos: {% call cache_fragment("nombre", current_profile) %} ... {% endcall %}
+    FragmentCache.init_app(app)
+    AITelemetry.init_app(app)
+    InsightBatchService.init_app(app)
+
+    # Pregeneración nocturna de borradores (cron, p. ej.: `0 3 * * * flask pregenerate-briefs`).
+    @app.cli.command("pregenerate-briefs")
+    @click.option("--days", type=int, default=None, help="Días hacia adelante (AUTHORING_PREGENERATE_DAYS).")
+    @click.option("--institution", "institution_id", type=int, default=None, help="Sólo esta institución.")
+    def pregenerate_briefs_command(days, institution_id):
+        stats = AuthoringService.pregenerate_briefs(
+            days=days if days is not None else app.config["AUTHORING_PREGENERATE_DAYS"],
+            institution_id=institution_id,
+            concurrency=app.config["AUTHORING_PREGENERATE_CONCURRENCY"],
+        )
+        removed = AuthoringService.purge_briefs(app.config["AUTHORING_BRIEF_RETENTION_DAYS"])
+        AITelemetry.flush()
+        click.echo(
+            "Clases: {lessons} · generados: {generated} · ya guardados: {cached} · "
+            "fallidos: {failed} · sin proveedor: {skipped}".format(**stats)
+            + f" · borrados por antigüedad: {removed}"
+        )
+
+    @app.cli.command("rebuild-plan-indexes")
+    @click.option("--all", "rebuild_all", is_flag=True, help="También los planes que ya tienen índice.")
+    def rebuild_plan_indexes_command(rebuild_all):
+        """Reconstruye el índice de sugerencias de los planes que no lo tienen (p. ej. tras migrar)."""
+        from models import Plan
+
+        query = Plan.query
+        if not rebuild_all:
+            query = query.filter(Plan.suggestion_index_etag.is_(None))
+        rebuilt = 0
+        for plan in query.order_by(Plan.id.asc()).all():
+            PlanIndexService.rebuild(plan)
+            db.session.commit()
+            rebuilt += 1
+        click.echo(f"Índices reconstruidos: {rebuilt}")
+
     # Config visual básica disponible en todos los templates
     @app.context_processor
     def inject_ui_config():
@@ -184,6 +254,8 @@ def profe():
     if profile.role not in allowed_roles:
         abort(403)
 
+    from api.utils.pagination import encode_cursor
+
     data = ViewDataService.teacher_dashboard(profile)
     can_edit = profile.role in (
         RoleEnum.PROFESOR,
@@ -207,17 +279,17 @@ def profe():
         clases_hoy=data["clases_hoy"],
         resumen=resumen,
         lessons=data["lessons"],
+        lessons_cursor=encode_cursor(*data["lessons_next"]) if data["lessons_next"] else None,
         lessons_upcoming=data["lessons_upcoming"],
         students=data["students"],
-        tasks=data["tasks"],
         tasks_upcoming=data["tasks_upcoming"],
         bitacora_entries=data["bitacora_entries"],
         recent_messages=data["recent_messages"],
         metrics=data["metrics"],
         alerts=data["alerts"],
+        today=date.today(),
         can_edit=can_edit,
         is_admin=_has_admin_role(profile),
-        recipient_groups=_build_recipient_groups(profile),
     )
 
 
@@ -681,19 +753,19 @@ def mensajes():
         "mensajes.html",
         threads=thread_cards,
         lessons=lessons,
-        recipient_groups=_build_recipient_groups(profile),
         is_admin=_has_admin_role(profile),
     )
 
 
 @app.route("/insights")
 @login_required
+@replica_reads()
 def insights():
     profile = _get_current_profile()
     if not profile:
         abort(403)
 
-    from models import RoleEnum, Lesson, Profile as ProfileModel, InsightReport
+    from models import RoleEnum, Lesson, Profile as ProfileModel, InsightReport, Section, Grade
 
     allowed_roles = (
         RoleEnum.PROFESOR,
@@ -720,15 +792,24 @@ def insights():
         lessons_query = lessons_query.filter_by(teacher_profile_id=profile.id)
     lessons = lessons_query.limit(30).all()
 
-    students = (
-        ProfileModel.query.filter_by(institution_id=profile.institution_id, role=RoleEnum.ALUMNO)
+    students = FragmentCache.lazy(
+        lambda: ProfileModel.query.filter_by(institution_id=profile.institution_id, role=RoleEnum.ALUMNO)
         .order_by(ProfileModel.full_name.asc())
         .limit(100)
         .all()
     )
 
+    batch_sections = (
+        Section.query.options(joinedload(Section.grade))
+        .join(Grade)
+        .filter(Grade.institution_id == profile.institution_id)
+        .order_by(Grade.name.asc(), Section.name.asc())
+        .all()
+    )
+
     reports_own: list[InsightReport] = []
     reports_shared: list[InsightReport] = []
+    batch_jobs = []
     try:
         base_query = InsightReport.query.filter_by(institution_id=profile.institution_id)
         own_query = base_query.filter(InsightReport.author_profile_id == profile.id)
@@ -738,11 +819,13 @@ def insights():
         if not _has_admin_role(profile):
             shared_query = shared_query.filter(InsightReport.status == "ready")
         reports_shared = shared_query.order_by(InsightReport.updated_at.desc()).limit(10).all()
+        batch_jobs = InsightBatchService.recent_jobs(profile)
     except OperationalError as exc:
         current_app.logger.warning("Tabla insight_report no disponible: %s", exc)
         flash("Aún no habilitaste los reportes IA en la base de datos. Corré las migraciones para ver el historial.", "info")
         reports_own = []
         reports_shared = []
+        batch_jobs = []
 
     return render_template(
         "insights.html",
@@ -752,8 +835,9 @@ def insights():
         students=students,
         reports_own=reports_own,
         reports_shared=reports_shared,
+        batch_sections=batch_sections,
+        batch_jobs=batch_jobs,
         report_flavors=AIInsightsService.available_flavors(),
-        recipient_groups=_build_recipient_groups(profile),
         is_admin=_has_admin_role(profile),
         current_profile_id=profile.id,
     )
@@ -807,6 +891,55 @@ def create_insight_report():
     return redirect(url_for("insights", report_id=report.id))
 
 
+@app.post("/insights/report/batch")
+@login_required
+def create_insight_report_batch():
+    profile = _get_current_profile()
+    if not profile:
+        abort(403)
+
+    lesson_id = request.form.get("lesson_id", type=int)
+    section_id = request.form.get("section_id", type=int)
+    flavor = (request.form.get("report_flavor") or "standard").strip().lower()
+    custom_prompt = (request.form.get("custom_prompt") or "").strip()
+    try:
+        job = InsightBatchService.start(
+            profile,
+            lesson_id=lesson_id,
+            section_id=None if lesson_id else section_id,
+            flavor=flavor,
+            custom_prompt=custom_prompt,
+        )
+    except ValueError as exc:
+        flash(str(exc), "error")
+        return redirect(url_for("insights"))
+    except OperationalError as exc:
+        current_app.logger.exception("No se pudo crear el reporte en lote: %s", exc)
+        flash("Necesitás aplicar las migraciones (tabla insight_report_job) antes de generar reportes en lote.", "error")
+        return redirect(url_for("insights"))
+
+    flash(f"Generando {job.total} reportes para {job.target_label}. Podés seguir el avance abajo.", "success")
+    return redirect(url_for("insights"))
+
+
+@app.get("/insights/jobs/<int:job_id>")
+@login_required
+def insight_report_job_status(job_id: int):
+    profile = _get_current_profile()
+    if not profile:
+        abort(403)
+
+    from models import InsightReportJob
+
+    InsightBatchService.fail_stale_jobs(profile.institution_id)
+    job = InsightReportJob.query.get_or_404(job_id)
+    if job.institution_id != profile.institution_id:
+        abort(404)
+    if job.author_profile_id != profile.id and not _has_admin_role(profile):
+        abort(403)
+    return jsonify(job.as_dict())
+
+
 @app.post("/insights/report/<int:report_id>/save")
 @login_required
 def save_insight_report(report_id: int):
@@ -947,7 +1080,7 @@ def owner_institutions():
         CurriculumGradeAlias,
         CurriculumAreaKeyword,
     )
-    from api.institution import _normalize_hex_color
+    from api.institution import _normalize_hex_color, _normalize_provider_chain
 
     owner_role = getattr(RoleEnum, "ADMIN", None)
     if not owner_role or profile.role != owner_role:
@@ -961,6 +1094,7 @@ def owner_institutions():
     ]
     valid_ai_providers = {option["value"] for option in ai_provider_options if option["value"]}
     ai_model_default_hint = os.getenv("AI_MODEL") or "gpt-4o-mini"
+    ai_chain_default_hint = os.getenv("AI_PROVIDER_CHAIN") or "openai"
 
     if request.method == "POST":
         action = request.form.get("action")
@@ -972,6 +1106,7 @@ def owner_institutions():
             logo_file = request.files.get("logo_file")
             ai_provider = (request.form.get("ai_provider") or "").strip().lower() or None
             ai_model = (request.form.get("ai_model") or "").strip() or None
+            ai_provider_chain = _normalize_provider_chain(request.form.get("ai_provider_chain"))
 
             if not name:
                 flash("El nombre del colegio es obligatorio.", "error")
@@ -1000,6 +1135,7 @@ def owner_institutions():
                 logo_url=save_logo(logo_file),
                 ai_provider=ai_provider,
                 ai_model=ai_model or None,
+                ai_provider_chain=ai_provider_chain,
             )
             db.session.add(institution)
             db.session.commit()
@@ -1020,6 +1156,7 @@ def owner_institutions():
             logo_file = request.files.get("logo_file")
             ai_provider = (request.form.get("ai_provider") or "").strip().lower() or None
             ai_model = (request.form.get("ai_model") or "").strip() or None
+            ai_provider_chain = _normalize_provider_chain(request.form.get("ai_provider_chain"))
 
             if not name:
                 flash("El nombre del colegio es obligatorio.", "error")
@@ -1044,11 +1181,16 @@ def owner_institutions():
             institution.name = name
             institution.short_code = short_code
             saved_logo = save_logo(logo_file)
+            if saved_logo and saved_logo == institution.logo_url:
+                # Mismo contenido que el logo actual: la referencia que sumó save_logo sobra.
+                # (Si el logo cambia, el anterior se libera al hacer flush.)
+                release_blob(saved_logo)
             institution.logo_url = saved_logo or institution.logo_url
             institution.primary_color = normalized_primary
             institution.secondary_color = normalized_secondary
             institution.ai_provider = ai_provider
             institution.ai_model = ai_model or None
+            institution.ai_provider_chain = ai_provider_chain
             db.session.commit()
             flash("Institución actualizada.", "success")
             return redirect(url_for("owner_institutions"))
@@ -1241,6 +1383,16 @@ def owner_institutions():
         .all()
     )
 
+    ai_usage_days = min(max(request.args.get("ai_days", 7, type=int), 1), 90)
+    ai_usage_institution_id = request.args.get("ai_institution", type=int)
+    try:
+        AITelemetry.flush()
+        ai_usage = AITelemetry.summary(days=ai_usage_days, institution_id=ai_usage_institution_id)
+    except OperationalError as exc:
+        current_app.logger.warning("Tabla ai_call_log no disponible: %s", exc)
+        db.session.rollback()
+        ai_usage = None
+
     return render_template(
         "owner_institutions.html",
         institutions=institutions,
@@ -1249,16 +1401,77 @@ def owner_institutions():
         is_admin=True,
         ai_provider_options=ai_provider_options,
         ai_model_default_hint=ai_model_default_hint,
+        ai_chain_default_hint=ai_chain_default_hint,
         curriculum_prompt=curriculum_prompt,
         grade_aliases=grade_aliases,
         area_keywords=area_keywords,
+        ai_usage=ai_usage,
+        ai_usage_days=ai_usage_days,
+        ai_usage_institution_id=ai_usage_institution_id,
+    )
+
+
+def _serve_upload(root: Path, relative_path: str, *, url: str, internal_prefix: str):
+    """
+    Entrega un archivo subido validando el acceso en Python; los bytes los envía
+    FileDeliveryService (werkzeug con ETag/Range, o el proxy según FILE_DELIVERY_MODE).
+    """
+    public = FileDeliveryService.is_public(url)
+    if not FileDeliveryService.can_access(url, _get_current_profile(), public=public):
+        abort(404)
+    return FileDeliveryService.serve(
+        root,
+        relative_path,
+        url=url,
+        internal_prefix=internal_prefix,
+        public=public,
     )
 
 
 @app.get("/uploads/logos/<path:filename>")
 def serve_logo(filename: str):
     directory = Path(current_app.instance_path) / "uploads" / "logos"
-    return send_from_directory(directory, filename)
+    # Logos previos a la deduplicación: siempre públicos.
+    return FileDeliveryService.serve(
+        directory,
+        filename,
+        url=f"/uploads/logos/{filename}",
+        internal_prefix=f"{current_app.config['FILE_DELIVERY_INTERNAL_PREFIX']}/logos",
+        public=True,
+    )
+
+
+@app.get("/uploads/blobs/<path:key>")
+def serve_blob(key: str):
+    return _serve_upload(
+        Path(current_app.instance_path) / "uploads" / "blobs",
+        key,
+        url=f"/uploads/blobs/{key}",
+        internal_prefix=f"{current_app.config['FILE_DELIVERY_INTERNAL_PREFIX']}/blobs",
+    )
+
+
+@app.get("/uploads/s3/<path:key>")
+def serve_s3_standin(key: str):
+    # Sólo se usa con el stand-in local de S3; con un bucket real las URLs apuntan a S3_PUBLIC_URL.
+    return _serve_upload(
+        Path(current_app.instance_path) / "uploads" / "s3",
+        key,
+        url=f"/uploads/s3/{key}",
+        internal_prefix=f"{current_app.config['FILE_DELIVERY_INTERNAL_PREFIX']}/s3",
+    )
+
+
+@app.get("/static/uploads/<path:filename>")
+def serve_legacy_upload(filename: str):
+    # Adjuntos guardados antes del almacenamiento por contenido: tienen prioridad sobre /static
+    # para que también pasen por el control de acceso.
+    return _serve_upload(
+        Path(current_app.root_path) / "static" / "uploads",
+        filename,
+        url=f"/static/uploads/{filename}",
+        internal_prefix=f"{current_app.config['FILE_DELIVERY_INTERNAL_PREFIX']}/static",
+    )
 
 
 @app.route("/plan", methods=["GET", "POST"])
@@ -1492,6 +1705,34 @@ def plan_view():
                 flash("No pudimos agregar el documento. Intentá nuevamente.", "error")
             return redirect(url_for("plan_view"))
 
+        if action == "resume_plan_document":
+            plan_document_id = request.form.get("plan_document_id")
+            plan_document = PlanDocument.query.get(plan_document_id)
+            if (
+                not plan_document
+                or not plan_document.study_plan
+                or plan_document.institution_id != profile.institution_id
+                or not plan_document.study_plan.parsed_plan
+            ):
+                flash("Documento inválido.", "error")
+                return redirect(url_for("plan_view"))
+
+            try:
+                created_items = PlanParserService.resume(
+                    plan_document.study_plan.parsed_plan,
+                    plan_document=plan_document,
+                )
+                db.session.commit()
+                flash(
+                    f"Documento «{plan_document.title}» retomado ({created_items} fragmentos detectados).",
+                    "success",
+                )
+            except Exception as exc:
+                current_app.logger.exception("No se pudo retomar el parseo del plan: %s", exc)
+                db.session.rollback()
+                flash("No pudimos retomar el procesamiento. Lo ya procesado se conserva.", "warning")
+            return redirect(url_for("plan_view"))
+
         if action == "delete_plan_document":
             plan_document_id = request.form.get("plan_document_id")
             plan_document = PlanDocument.query.get(plan_document_id)
@@ -1508,6 +1749,10 @@ def plan_view():
                 CurriculumService.delete_document(plan_document.curriculum_document)
                 db.session.delete(plan_document)
                 db.session.flush()
+                if plan.parsed_plan:
+                    # Los PlanItem del documento se borraron en cascada: el índice de sugerencias
+                    # (y su ETag) tiene que dejar de ofrecerlos.
+                    PlanIndexService.rebuild(plan.parsed_plan)
                 remaining_docs = [
                     doc for doc in plan.plan_documents if doc.id != plan_document.id
                 ]
@@ -1640,6 +1885,10 @@ def plan_view():
         .all()
     )
 
+    document_progress = PlanParserService.progress_by_document(
+        [doc.id for plan in plans for doc in plan.plan_documents]
+    )
+
     plan_cards = []
     for plan in plans:
         periods = {}
@@ -1677,6 +1926,7 @@ def plan_view():
         "plan.html",
         plans=plan_cards,
         plan_options=plans,
+        document_progress=document_progress,
         grades=grades,
         can_edit=can_edit,
         is_admin=_has_admin_role(profile),
@@ -1749,87 +1999,217 @@ def plan_segments(plan_id: int, grade_id: int):
     if not profile:
         abort(403)
 
-    from models import StudyPlan, Grade, CurriculumDocument, Institution
+    # Sólo las lecturas van a la réplica: las sugerencias nuevas se guardan en PlanFragment
+    # (primario) mientras se itera areas, afuera de este bloque.
+    with replica_reads():
+        from models import StudyPlan, Grade, CurriculumDocument, Institution
 
-    plan = StudyPlan.query.get_or_404(plan_id)
-    if plan.institution_id != profile.institution_id:
-        abort(404)
+        plan = StudyPlan.query.get_or_404(plan_id)
+        if plan.institution_id != profile.institution_id:
+            abort(404)
 
-    grade = Grade.query.filter_by(id=grade_id, institution_id=profile.institution_id).first()
-    if not grade:
-        abort(404)
+        grade = Grade.query.filter_by(id=grade_id, institution_id=profile.institution_id).first()
+        if not grade:
+            abort(404)
 
-    if not plan.curriculum_document_id:
-        return jsonify({"areas": [], "message": "Este plan todavía no tiene un documento curricular vinculado."}), 404
+        if not plan.curriculum_document_id:
+            return jsonify({"areas": [], "message": "Este plan todavía no tiene un documento curricular vinculado."}), 404
 
-    document = CurriculumDocument.query.get(plan.curriculum_document_id)
-    if not document:
-        return jsonify({"areas": [], "message": "No encontramos el documento vinculado a este plan."}), 404
+        document = CurriculumDocument.query.get(plan.curriculum_document_id)
+        if not document:
+            return jsonify({"areas": [], "message": "No encontramos el documento vinculado a este plan."}), 404
 
-    normalized_grade = CurriculumService.normalize_grade_label(grade.name, plan.institution_id)
+        normalized_grade = CurriculumService.normalize_grade_label(grade.name, plan.institution_id)
 
-    try:
-        segments = CurriculumService.segments_for_grade(
-            documents=[document],
-            grade_label=normalized_grade,
-            limit_per_doc=30,
-            fallback_to_general=True,
-        )
-    except Exception as exc:
-        current_app.logger.exception("No se pudieron obtener segmentos: %s", exc)
-        return jsonify({"areas": [], "message": "No pudimos leer el documento."}), 500
-
-    if not segments:
-        ai_areas = CurriculumService.ai_grade_suggestions(document=document, grade=grade)
-        if ai_areas:
-            return jsonify(
-                {
-                    "areas": ai_areas,
-                    "message": "Detectamos los temas usando IA, revisá los objetivos sugeridos antes de calendarizarlos.",
-                }
+        try:
+            segments = CurriculumService.segments_for_grade(
+                documents=[document],
+                grade_label=normalized_grade,
+                limit_per_doc=30,
+                fallback_to_general=True,
             )
-        return jsonify({"areas": [], "message": "No encontramos segmentos para ese grado en el documento."}), 404
+        except Exception as exc:
+            current_app.logger.exception("No se pudieron obtener segmentos: %s", exc)
+            return jsonify({"areas": [], "message": "No pudimos leer el documento."}), 500
+
+        if not segments:
+            ai_areas = CurriculumService.ai_grade_suggestions(document=document, grade=grade)
+            if ai_areas:
+                return jsonify(
+                    {
+                        "areas": ai_areas,
+                        "message": "Detectamos los temas usando IA, revisá los objetivos sugeridos antes de calendarizarlos.",
+                    }
+                )
+            return jsonify({"areas": [], "message": "No encontramos segmentos para ese grado en el documento."}), 404
+
+        matched_specific = False
+        for seg in segments:
+            seg_label = (seg.grade_label or "").strip()
+            if normalized_grade and seg_label == normalized_grade:
+                matched_specific = True
+                break
+        used_general = not matched_specific
+
+        institution = Institution.query.get(plan.institution_id)
+        area_map: dict[str, list] = {}
+        for segment in segments:
+            area = segment.area or "Contenidos"
+            area_map.setdefault(area, []).append(segment)
+
+        message = None
+        if used_general:
+            if normalized_grade:
+                message = (
+                    "No encontramos contenidos exclusivos para ese grado. Mostramos el plan general para que elijas el área."
+                )
+            else:
+                message = "El nombre del grado no indica curso específico, se muestra el plan general."
+
+    areas = _ai_suggestions_by_area(
+        institution=institution,
+        plan=plan,
+        document=document,
+        grade=grade,
+        area_map=area_map,
+    )
 
-    matched_specific = False
-    for seg in segments:
-        seg_label = (seg.grade_label or "").strip()
-        if normalized_grade and seg_label == normalized_grade:
-            matched_specific = True
-            break
-    used_general = not matched_specific
+    # ?stream=1 (o Accept: application/x-ndjson): una línea JSON por área a medida que termina.
+    if request.args.get("stream") == "1" or "application/x-ndjson" in request.headers.get("Accept", ""):
+        def generate_lines():
+            try:
+                yield json.dumps({"areas_total": len(area_map), "message": message}, ensure_ascii=False) + "\n"
+                for area_name, suggestions in areas:
+                    yield json.dumps({"area": area_name, "suggestions": suggestions}, ensure_ascii=False) + "\n"
+                yield json.dumps({"done": True}) + "\n"
+            finally:
+                # Si el cliente corta la conexión, cerrar areas cancela las llamadas pendientes.
+                areas.close()
 
-    institution = Institution.query.get(plan.institution_id)
-    area_map: dict[str, list] = {}
-    for segment in segments:
-        area = segment.area or "Contenidos"
-        area_map.setdefault(area, []).append(segment)
-
-    payload = []
-    for area_name, area_segments in area_map.items():
-        suggestions = _ai_suggestions_from_segments(
-            institution=institution,
-            plan=plan,
-            grade=grade,
-            area_name=area_name,
-            segments=area_segments,
-        )
-        payload.append({"area": area_name, "suggestions": suggestions})
+        return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson")
 
+    payload = [{"area": area_name, "suggestions": suggestions} for area_name, suggestions in areas]
     payload.sort(key=lambda item: item["area"].lower())
     response_body = {"areas": payload}
-    if used_general:
-        if normalized_grade:
-            response_body["message"] = (
-                "No encontramos contenidos exclusivos para ese grado. Mostramos el plan general para que elijas el área."
+    if message:
+        response_body["message"] = message
+    return jsonify(response_body)
+
+
+def _ai_suggestions_by_area(*, institution, plan, document, grade, area_map: dict[str, list]):
+    """
+    Itera (área, sugerencias) a medida que cada área queda lista. Primero las que ya están en
+    cache (PlanFragment, por documento, grado, área y hash de los fragmentos enviados) y después
+    las que se piden a la IA en paralelo (AsyncAIClient, OBJECTIVE_SUGGESTIONS_CONCURRENCY a la vez).
+    Cerrar el generador antes de terminar cancela las llamadas que todavía no empezaron.
+    """
+    from models import PlanFragment
+
+    cached_areas = []
+    pending = []
+    with replica_reads():
+        for area_name, segments in area_map.items():
+            text_blocks = _segment_text_blocks(segments)
+            cache_hash = _objective_suggestions_hash(document, grade, area_name, text_blocks)
+            cached = PlanFragment.query.filter_by(institution_id=plan.institution_id, content_hash=cache_hash).first()
+            if cached is not None and cached.items:
+                cached_areas.append((area_name, cached.items))
+            else:
+                pending.append((area_name, text_blocks, cache_hash))
+    for area_name, items in cached_areas:
+        AITelemetry.record(call_site="objective_suggestions", institution_id=plan.institution_id, cache_hit=True)
+        yield area_name, items
+    if not pending:
+        return
+
+    client = AsyncAIClient(
+        provider_override=institution.ai_provider if institution else None,
+        model_override=institution.ai_model if institution else None,
+        provider_chain=institution.ai_provider_chain if institution else None,
+        institution_id=institution.id if institution else None,
+    )
+    requests_payload = [
+        {
+            "prompt": OBJECTIVE_SUGGESTIONS_PROMPT,
+            "context": {
+                "plan": plan.name,
+                "year": plan.year,
+                "grade": grade.name,
+                "area": area_name,
+                "jurisdiction": plan.jurisdiction,
+                "segments": text_blocks,
+            },
+            "call_site": "objective_suggestions",
+        }
+        for area_name, text_blocks, _ in pending
+    ]
+
+    # Las llamadas corren en el executor compartido, cada lote con su propio event loop; este
+    # generador (que tiene el contexto del request y la sesión de la base) va recibiendo los
+    # resultados por la cola.
+    finished = object()
+    results: queue.Queue = queue.Queue()
+    cancel = threading.Event()
+    concurrency = int(current_app.config.get("OBJECTIVE_SUGGESTIONS_CONCURRENCY") or 4)
+
+    def run_batch() -> None:
+        try:
+            client.generate_many(
+                requests_payload,
+                concurrency=concurrency,
+                on_result=lambda index, result: results.put((index, result)),
+                cancel=cancel,
             )
-        else:
-            response_body["message"] = (
-                "El nombre del grado no indica curso específico, se muestra el plan general."
+        finally:
+            results.put(finished)
+
+    fresh: dict[str, list[dict]] = {}
+    _objective_suggestions_executor().submit(run_batch)
+    try:
+        while True:
+            item = results.get()
+            if item is finished:
+                break
+            index, ai_result = item
+            area_name, text_blocks, cache_hash = pending[index]
+            suggestions = []
+            if isinstance(ai_result, Exception):
+                current_app.logger.warning("AI parser fallback (%s - %s): %s", plan.name, area_name, ai_result)
+            else:
+                suggestions = _parse_ai_objectives(ai_result.get("text", ""))[:5]
+            if suggestions and ai_result.get("model") != "heuristic":
+                fresh[cache_hash] = suggestions
+            if not suggestions:
+                suggestions = _fallback_objectives(area_name, grade.name, text_blocks)[:5]
+            yield area_name, suggestions
+    finally:
+        cancel.set()
+        # Lo ya pagado se guarda aunque el cliente se haya ido (un commit, no uno por área).
+        if fresh:
+            _store_objective_suggestions(plan.institution_id, fresh)
+
+
+_objective_suggestions_executor_lock = threading.Lock()
+
+
+def _objective_suggestions_executor() -> ThreadPoolExecutor:
+    """
+    Executor del proceso para los lotes de sugerencias: cada lote ocupa un hilo mientras dura
+    su event loop, así que como mucho corren OBJECTIVE_SUGGESTIONS_WORKERS a la vez y el resto
+    espera en cola (y sale enseguida si su request ya se canceló).
+    """
+    with _objective_suggestions_executor_lock:
+        executor = current_app.extensions.get("objective_suggestions_executor")
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=int(current_app.config.get("OBJECTIVE_SUGGESTIONS_WORKERS") or 4),
+                thread_name_prefix="objective-suggestions",
             )
-    return jsonify(response_body)
+            current_app.extensions["objective_suggestions_executor"] = executor
+        return executor
 
 
-def _ai_suggestions_from_segments(*, institution, plan, grade, area_name: str, segments: list) -> list[dict]:
+def _segment_text_blocks(segments: list) -> list[str]:
     text_blocks: list[str] = []
     for segment in segments:
         text = (segment.content_text or "").strip()
@@ -1840,40 +2220,30 @@ def _ai_suggestions_from_segments(*, institution, plan, grade, area_name: str, s
             break
     if not text_blocks:
         text_blocks.append("No se encontraron fragmentos específicos.")
+    return text_blocks
 
-    client = AIClient(
-        provider_override=institution.ai_provider if institution else None,
-        model_override=institution.ai_model if institution else None,
-    )
 
-    prompt = (
-        "Actúas como coordinador pedagógico senior. A partir de los fragmentos siguientes, "
-        "propone objetivos claros para el grado y área indicados. Cada objetivo debe incluir: "
-        "título breve, descripción (qué se espera lograr) y una lista de 2-4 ideas de clases. "
-        "Devuelve únicamente JSON válido con el formato:\n"
-        "{ \"objectives\": [ { \"title\": \"...\", \"description\": \"...\", \"class_ideas\": [\"...\"] } ] }\n"
-        "No agregues texto fuera del JSON."
-    )
-    context = {
-        "plan": plan.name,
-        "year": plan.year,
-        "grade": grade.name,
-        "area": area_name,
-        "jurisdiction": plan.jurisdiction,
-        "segments": text_blocks,
-    }
+def _objective_suggestions_hash(document, grade, area_name: str, text_blocks: list[str]) -> str:
+    digest = hashlib.sha256()
+    for part in ("objective_suggestions", OBJECTIVE_SUGGESTIONS_VERSION, str(document.id), str(grade.id), area_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    for block in text_blocks:
+        digest.update(hashlib.sha256(block.encode("utf-8")).digest())
+    return digest.hexdigest()
 
-    suggestions = []
-    try:
-        ai_result = client.generate(prompt=prompt, context=context)
-        suggestions = _parse_ai_objectives(ai_result.get("text", ""))
-    except Exception as exc:
-        current_app.logger.warning("AI parser fallback (%s - %s): %s", plan.name, area_name, exc)
 
-    if not suggestions:
-        suggestions = _fallback_objectives(area_name, grade.name, text_blocks)
+def _store_objective_suggestions(institution_id: int, suggestions_by_hash: dict[str, list[dict]]) -> None:
+    from models import PlanFragment
 
-    return suggestions[:5]
+    for cache_hash, suggestions in suggestions_by_hash.items():
+        try:
+            with db.session.begin_nested():
+                db.session.add(PlanFragment(institution_id=institution_id, content_hash=cache_hash, items_json=suggestions))
+        except IntegrityError:
+            # Otro request guardó la misma área mientras tanto.
+            pass
+    db.session.commit()
 
 
 def _parse_ai_objectives(raw_text: str) -> list[dict]:
@@ -1974,6 +2344,7 @@ def _fallback_objectives(area_name: str, grade_name: str, text_blocks: list[str]
 
 @app.get("/psico")
 @login_required
+@replica_reads()
 def psico_panel():
     profile = _get_current_profile()
     if not profile:
@@ -2399,49 +2770,6 @@ def _filter_recipient_ids(author_profile, raw_ids):
     return list(resolved_ids)
 
 
-def _build_recipient_groups(profile):
-    from models import Profile as ProfileModel, RoleEnum
-
-    if not getattr(profile, "institution_id", None):
-        return []
-
-    base_query = ProfileModel.query.filter_by(
-        institution_id=profile.institution_id
-    ).filter(ProfileModel.id != profile.id)
-
-    students = (
-        base_query.filter(ProfileModel.role == RoleEnum.ALUMNO)
-        .order_by(ProfileModel.full_name.asc())
-        .all()
-    )
-    parents = (
-        base_query.filter(ProfileModel.role == RoleEnum.PADRE)
-        .order_by(ProfileModel.full_name.asc())
-        .all()
-    )
-    staff_roles = [
-        RoleEnum.PROFESOR,
-        RoleEnum.PSICOPEDAGOGIA,
-        getattr(RoleEnum, "ADMIN_COLEGIO", None),
-        getattr(RoleEnum, "RECTOR", None),
-    ]
-    staff_roles = [r for r in staff_roles if r is not None]
-    staff = (
-        base_query.filter(ProfileModel.role.in_(staff_roles))
-        .order_by(ProfileModel.full_name.asc())
-        .all()
-    )
-
-    groups = []
-    if students:
-        groups.append({"label": "Alumnos", "profiles": students})
-    if parents:
-        groups.append({"label": "Familias", "profiles": parents})
-    if staff:
-        groups.append({"label": "Equipo", "profiles": staff})
-    return groups
-
-
 def _split_task_attachments(attachments):
     images, files = [], []
     for attachment in attachments or []:
@@ -2593,7 +2921,13 @@ def _ai_client_for_task(task):
     institution = getattr(task, "institution", None)
     provider = getattr(institution, "ai_provider", None) if institution else None
     model = getattr(institution, "ai_model", None) if institution else None
-    return AIClient(provider_override=provider, model_override=model)
+    chain = getattr(institution, "ai_provider_chain", None) if institution else None
+    return AIClient(
+        provider_override=provider,
+        model_override=model,
+        provider_chain=chain,
+        institution_id=getattr(task, "institution_id", None),
+    )
 
 
 def _student_grade_info(student_profile):
@@ -2750,31 +3084,6 @@ def _get_form_bool(field_name: str, default: bool = True) -> bool:
 
 def _save_uploaded_file(field_name: str):
     """
-    Guarda un archivo del form y devuelve metadata para AttachmentService.
+    Guarda un archivo del form (deduplicado por contenido) y devuelve metadata para AttachmentService.
     """
-    file = request.files.get(field_name)
-    if not file or not file.filename:
-        return None
-
-    filename = secure_filename(file.filename)
-    upload_folder = current_app.config.get("UPLOAD_FOLDER")
-    if not upload_folder:
-        upload_folder = os.path.join(current_app.root_path, "static", "uploads")
-        current_app.config["UPLOAD_FOLDER"] = upload_folder
-
-    os.makedirs(upload_folder, exist_ok=True)
-
-    basename, ext = os.path.splitext(filename)
-    final_name = f"{basename}_{int(datetime.utcnow().timestamp())}{ext}"
-    file_path = os.path.join(upload_folder, final_name)
-    file.save(file_path)
-
-    rel_path = os.path.relpath(file_path, current_app.root_path)
-    storage_path = f"/{rel_path}".replace("\\", "/")
-
-    return {
-        "filename": final_name,
-        "storage_path": storage_path,
-        "mime_type": file.mimetype,
-        "file_size": os.path.getsize(file_path),
-    }
+    return save_upload(request.files.get(field_name))
@@ -2,9 +2,101 @@
 import os
 
 
+def _engine_options(database_uri: str) -> dict:
+    """Opciones del pool según el motor (SQLALCHEMY_ENGINE_OPTIONS)."""
+    if database_uri.startswith("sqlite"):
+        if database_uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_uri:
+            # En memoria SQLAlchemy usa un pool de una sola conexión: no admite estos ajustes.
+            return {}
+        return {
+            # Las escrituras se serializan igual (un escritor a la vez en WAL); más conexiones
+            # sólo sirven para lecturas concurrentes.
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", "8")),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "8")),
+            "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+            # Espera del driver ante un lock (además del PRAGMA busy_timeout de SQLitePragmas).
+            "connect_args": {"timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000},
+        }
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        # Conexiones cortadas por el servidor/proxy (p. ej. PgBouncer o timeouts del proveedor).
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
 class Config:
     SECRET_KEY = "super-secret-key"
     _BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     _DEFAULT_DB_PATH = os.path.join(_BASE_DIR, "instance", "estudia.db")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or f"sqlite:///{_DEFAULT_DB_PATH}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Réplica de sólo lectura para reportes y dashboards (bind "replica", ver RoutingSession en
+    # extensions.py). Sin DATABASE_REPLICA_URL todas las consultas van al primario.
+    _REPLICA_URI = os.environ.get("DATABASE_REPLICA_URL")
+    SQLALCHEMY_BINDS = {"replica": {"url": _REPLICA_URI, **_engine_options(_REPLICA_URI)}} if _REPLICA_URI else {}
+    # Segundos que las lecturas de un usuario siguen yendo al primario después de que escribió.
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", "5"))
+
+    # SQLite en producción: al abrir cada conexión se aplican WAL (lectores y un escritor en
+    # paralelo), synchronous=NORMAL, busy_timeout, mmap y cache (ver SQLitePragmas).
+    SQLITE_PRODUCTION_MODE = os.environ.get("SQLITE_PRODUCTION_MODE", "1") != "0"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536"))
+
+    # Almacenamiento de archivos subidos: "local" (instance/uploads/blobs) o "s3".
+    # Con "s3" y sin boto3/endpoint configurado se usa un stand-in local en instance/uploads/s3.
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+    S3_BUCKET = os.environ.get("S3_BUCKET")
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+    S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL")
+
+    # Entrega de archivos subidos: "app" (werkzeug, con ETag y Range), "x-accel" (nginx,
+    # X-Accel-Redirect hacia FILE_DELIVERY_INTERNAL_PREFIX) o "x-sendfile" (Apache/lighttpd).
+    # El control de acceso se hace siempre en la app antes de delegar la transferencia.
+    FILE_DELIVERY_MODE = os.environ.get("FILE_DELIVERY_MODE", "app")
+    FILE_DELIVERY_INTERNAL_PREFIX = os.environ.get("FILE_DELIVERY_INTERNAL_PREFIX", "/_protected/uploads")
+
+    # Variantes de imágenes (miniaturas y versión web) generadas en segundo plano al subir.
+    IMAGE_DERIVATIVE_WORKERS = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", "2"))
+
+    # Procesos worker que sirven la app (gunicorn y la mayoría de los PaaS leen WEB_CONCURRENCY).
+    # Con más de uno, lo que vive en memoria de un proceso no lo ven los demás.
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY") or 1)
+
+    # Cache de fragmentos renderizados de los paneles (selectores, próximas clases, etc.).
+    # En memoria por proceso (LRU de FRAGMENT_CACHE_SIZE entradas, sólo con WEB_CONCURRENCY=1)
+    # o compartido vía redis.
+    FRAGMENT_CACHE_ENABLED = os.environ.get("FRAGMENT_CACHE_ENABLED", "1") != "0"
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "512"))
+    FRAGMENT_CACHE_REDIS_URL = os.environ.get("FRAGMENT_CACHE_REDIS_URL")
+
+    # Importación de padrones: procesos para hashear contraseñas (vacío = núcleos disponibles).
+    ROSTER_IMPORT_WORKERS = int(os.environ.get("ROSTER_IMPORT_WORKERS") or 0) or None
+
+    # Reportes IA en lote (toda una clase/sección): llamadas simultáneas al proveedor por lote.
+    INSIGHT_BATCH_CONCURRENCY = int(os.environ.get("INSIGHT_BATCH_CONCURRENCY", "4"))
+    # Los lotes corren en un hilo del proceso web (requiere WEB_CONCURRENCY=1). Un trabajo
+    # pendiente o en curso sin latido en este lapso (p. ej. tras reiniciar) se marca como fallido.
+    INSIGHT_BATCH_STALE_SECONDS = int(os.environ.get("INSIGHT_BATCH_STALE_SECONDS", "900"))
+
+    # Objetivos sugeridos por área (/plan/<id>/grade/<id>/segments): áreas pedidas a la IA a la vez.
+    OBJECTIVE_SUGGESTIONS_CONCURRENCY = int(os.environ.get("OBJECTIVE_SUGGESTIONS_CONCURRENCY", "4"))
+    # Lotes de sugerencias en curso a la vez por proceso (hilos del executor compartido).
+    OBJECTIVE_SUGGESTIONS_WORKERS = int(os.environ.get("OBJECTIVE_SUGGESTIONS_WORKERS", "4"))
+
+    # Pregeneración nocturna de borradores de clases/tareas (`flask pregenerate-briefs`):
+    # días hacia adelante, llamadas simultáneas y días que se conservan los borradores guardados.
+    AUTHORING_PREGENERATE_DAYS = int(os.environ.get("AUTHORING_PREGENERATE_DAYS", "3"))
+    AUTHORING_PREGENERATE_CONCURRENCY = int(os.environ.get("AUTHORING_PREGENERATE_CONCURRENCY", "4"))
+    AUTHORING_BRIEF_RETENTION_DAYS = int(os.environ.get("AUTHORING_BRIEF_RETENTION_DAYS", "30"))
+
+    # Telemetría de llamadas a la IA (tabla ai_call_log), escrita por lotes en segundo plano.
+    AI_TELEMETRY_ENABLED = os.environ.get("AI_TELEMETRY_ENABLED", "1") != "0"
+    AI_TELEMETRY_FLUSH_SIZE = int(os.environ.get("AI_TELEMETRY_FLUSH_SIZE", "50"))
+    AI_TELEMETRY_FLUSH_SECONDS = float(os.environ.get("AI_TELEMETRY_FLUSH_SECONDS", "5"))
@@ -1,7 +1,77 @@
 # extensions.py
-from flask_sqlalchemy import SQLAlchemy
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, session as flask_session
 from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+REPLICA_BIND = "replica"
+# Clave en la sesión del usuario con el momento de su última escritura (ver RoutingSession).
+_WROTE_AT_KEY = "_db_wrote_at"
+
+
+class RoutingSession(Session):
+    """
+    Sesión de db que manda las lecturas marcadas con replica_reads() a la réplica
+    (SQLALCHEMY_BINDS["replica"], ver DATABASE_REPLICA_URL). Todo lo demás va al primario:
+
+    - escrituras, flush, SELECT ... FOR UPDATE y SQL textual;
+    - cualquier lectura si no hay réplica configurada;
+    - lecturas posteriores a una escritura en esta misma sesión (read-your-writes), y
+      durante DB_REPLICA_STICKY_SECONDS las del usuario que escribió, para cubrir el retraso
+      de la réplica entre un POST y el GET que le sigue.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause) -> bool:
+        if not self.info.get("replica_reads") or self.info.get("wrote") or self._flushing:
+            return False
+        if clause is None or not getattr(clause, "is_select", False):
+            return False
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return False
+        if REPLICA_BIND not in self._db.engines:
+            return False
+        return not _user_wrote_recently()
+
+
+def _user_wrote_recently() -> bool:
+    if not has_request_context():
+        return False
+    wrote_at = flask_session.get(_WROTE_AT_KEY)
+    sticky = float(current_app.config.get("DB_REPLICA_STICKY_SECONDS") or 0)
+    return bool(wrote_at) and time.time() - wrote_at < sticky
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context) -> None:
+    session.info["wrote"] = True
+    if has_request_context() and REPLICA_BIND in session._db.engines:
+        flask_session[_WROTE_AT_KEY] = time.time()
+
+
+@contextmanager
+def replica_reads():
+    """
+    Las consultas de db.session dentro del bloque pueden leerse de la réplica.
+    Sirve también como decorador; sólo para lecturas que toleran unos segundos de retraso.
+    """
+    info = db.session.info
+    info["replica_reads"] = info.get("replica_reads", 0) + 1
+    try:
+        yield
+    finally:
+        info["replica_reads"] -= 1
+
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login_form"
\ No newline at end of file
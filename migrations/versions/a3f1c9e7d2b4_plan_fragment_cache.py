@@ -0,0 +1,42 @@
+"""plan fragment cache and plan_item fragment hash
+
+Revision ID: a3f1c9e7d2b4
+Revises: 1a5b6e4c2d31
+Create Date: 2025-03-02 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a3f1c9e7d2b4"
+down_revision = "1a5b6e4c2d31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "plan_fragment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institution.id"), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("items", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("institution_id", "content_hash", name="uq_plan_fragment_hash"),
+    )
+    op.create_index("ix_plan_fragment_institution_id", "plan_fragment", ["institution_id"])
+
+    with op.batch_alter_table("plan_item") as batch_op:
+        batch_op.add_column(sa.Column("fragment_hash", sa.String(length=64), nullable=True))
+        batch_op.create_index("ix_plan_item_fragment_hash", ["fragment_hash"])
+
+
+def downgrade():
+    with op.batch_alter_table("plan_item") as batch_op:
+        batch_op.drop_index("ix_plan_item_fragment_hash")
+        batch_op.drop_column("fragment_hash")
+
+    op.drop_index("ix_plan_fragment_institution_id", table_name="plan_fragment")
+    op.drop_table("plan_fragment")
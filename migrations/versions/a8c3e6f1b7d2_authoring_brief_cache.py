@@ -0,0 +1,43 @@
+"""authoring_brief cache of lesson/task briefs
+
+Revision ID: a8c3e6f1b7d2
+Revises: f7b2d5e9a3c6
+Create Date: 2025-03-26 08:15:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a8c3e6f1b7d2"
+down_revision = "f7b2d5e9a3c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "authoring_brief",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institution.id"), nullable=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lesson.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("source", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("fingerprint", name="uq_authoring_brief_fingerprint"),
+    )
+    with op.batch_alter_table("authoring_brief", schema=None) as batch_op:
+        batch_op.create_index("ix_authoring_brief_institution_id", ["institution_id"], unique=False)
+        batch_op.create_index("ix_authoring_brief_lesson_id", ["lesson_id"], unique=False)
+        batch_op.create_index("ix_authoring_brief_created_at", ["created_at"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("authoring_brief", schema=None) as batch_op:
+        batch_op.drop_index("ix_authoring_brief_created_at")
+        batch_op.drop_index("ix_authoring_brief_lesson_id")
+        batch_op.drop_index("ix_authoring_brief_institution_id")
+    op.drop_table("authoring_brief")
@@ -0,0 +1,33 @@
+"""indexes for the bounded teacher dashboard queries
+
+Revision ID: a9e2c7f5b1d4
+Revises: f8d1b6e4a9c3
+Create Date: 2025-03-15 09:30:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "a9e2c7f5b1d4"
+down_revision = "f8d1b6e4a9c3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("lesson", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_lesson_teacher_date",
+            ["teacher_profile_id", "class_date", "id"],
+            unique=False,
+        )
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.create_index("ix_task_lesson_due", ["lesson_id", "due_date"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.drop_index("ix_task_lesson_due")
+    with op.batch_alter_table("lesson", schema=None) as batch_op:
+        batch_op.drop_index("ix_lesson_teacher_date")
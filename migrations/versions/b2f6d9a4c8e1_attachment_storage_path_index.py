@@ -0,0 +1,29 @@
+"""index attachment by storage_path for file access checks
+
+Revision ID: b2f6d9a4c8e1
+Revises: a8c3e6f1b7d2
+Create Date: 2025-03-28 09:40:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b2f6d9a4c8e1"
+down_revision = "a8c3e6f1b7d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("attachment", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_attachment_storage_path",
+            ["storage_path", "uploaded_by_profile_id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("attachment", schema=None) as batch_op:
+        batch_op.drop_index("ix_attachment_storage_path")
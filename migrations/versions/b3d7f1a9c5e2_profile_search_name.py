@@ -0,0 +1,59 @@
+"""profile.search_name (accent-folded) for the recipient typeahead
+
+Revision ID: b3d7f1a9c5e2
+Revises: a9e2c7f5b1d4
+Create Date: 2025-03-18 10:15:00.000000
+"""
+
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b3d7f1a9c5e2"
+down_revision = "a9e2c7f5b1d4"
+branch_labels = None
+depends_on = None
+
+
+def _normalize(value):
+    # Copia de models.user.normalize_search_name: la migración no depende del modelo actual.
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.casefold().split())
+
+
+def upgrade():
+    with op.batch_alter_table("profile", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("search_name", sa.String(length=255), nullable=True))
+
+    connection = op.get_bind()
+    profile = sa.table(
+        "profile",
+        sa.column("id", sa.Integer),
+        sa.column("full_name", sa.String),
+        sa.column("search_name", sa.String),
+    )
+    rows = connection.execute(sa.select(profile.c.id, profile.c.full_name)).fetchall()
+    if rows:
+        connection.execute(
+            profile.update()
+            .where(profile.c.id == sa.bindparam("profile_id"))
+            .values(search_name=sa.bindparam("normalized")),
+            [{"profile_id": row.id, "normalized": _normalize(row.full_name)} for row in rows],
+        )
+
+    with op.batch_alter_table("profile", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_profile_institution_search",
+            ["institution_id", "search_name"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("profile", schema=None) as batch_op:
+        batch_op.drop_index("ix_profile_institution_search")
+        batch_op.drop_column("search_name")
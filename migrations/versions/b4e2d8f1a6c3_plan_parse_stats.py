@@ -0,0 +1,30 @@
+"""add parse_stats to plan and plan_document
+
+Revision ID: b4e2d8f1a6c3
+Revises: a3f1c9e7d2b4
+Create Date: 2025-03-04 09:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b4e2d8f1a6c3"
+down_revision = "a3f1c9e7d2b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("plan") as batch_op:
+        batch_op.add_column(sa.Column("parse_stats", sa.JSON(), nullable=True))
+    with op.batch_alter_table("plan_document") as batch_op:
+        batch_op.add_column(sa.Column("parse_stats", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("plan_document") as batch_op:
+        batch_op.drop_column("parse_stats")
+    with op.batch_alter_table("plan") as batch_op:
+        batch_op.drop_column("parse_stats")
@@ -0,0 +1,29 @@
+"""index profile by user and institution for the admin user directory
+
+Revision ID: c4e8a2b6d9f1
+Revises: b3d7f1a9c5e2
+Create Date: 2025-03-19 11:40:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c4e8a2b6d9f1"
+down_revision = "b3d7f1a9c5e2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("profile", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_profile_user_institution",
+            ["user_id", "institution_id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("profile", schema=None) as batch_op:
+        batch_op.drop_index("ix_profile_user_institution")
@@ -0,0 +1,38 @@
+"""add plan_parse_checkpoint table
+
+Revision ID: c5a7e3b9d1f2
+Revises: b4e2d8f1a6c3
+Create Date: 2025-03-06 18:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c5a7e3b9d1f2"
+down_revision = "b4e2d8f1a6c3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "plan_parse_checkpoint",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("plan_id", sa.Integer(), sa.ForeignKey("plan.id"), nullable=False),
+        sa.Column("plan_document_id", sa.Integer(), sa.ForeignKey("plan_document.id"), nullable=True),
+        sa.Column("fragment_index", sa.Integer(), nullable=False),
+        sa.Column("fragment_hash", sa.String(length=64), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("item_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_plan_parse_checkpoint_plan_id", "plan_parse_checkpoint", ["plan_id"])
+    op.create_index("ix_plan_parse_checkpoint_plan_document_id", "plan_parse_checkpoint", ["plan_document_id"])
+
+
+def downgrade():
+    op.drop_index("ix_plan_parse_checkpoint_plan_document_id", table_name="plan_parse_checkpoint")
+    op.drop_index("ix_plan_parse_checkpoint_plan_id", table_name="plan_parse_checkpoint")
+    op.drop_table("plan_parse_checkpoint")
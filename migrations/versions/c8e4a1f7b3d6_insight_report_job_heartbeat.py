@@ -0,0 +1,26 @@
+"""insight_report_job.heartbeat_at to detect orphaned batch jobs
+
+Revision ID: c8e4a1f7b3d6
+Revises: b2f6d9a4c8e1
+Create Date: 2025-03-28 11:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c8e4a1f7b3d6"
+down_revision = "b2f6d9a4c8e1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("insight_report_job", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("insight_report_job", schema=None) as batch_op:
+        batch_op.drop_column("heartbeat_at")
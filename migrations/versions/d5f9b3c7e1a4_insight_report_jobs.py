@@ -0,0 +1,57 @@
+"""insight_report_job table and insight_report.job_id for batch reports
+
+Revision ID: d5f9b3c7e1a4
+Revises: c4e8a2b6d9f1
+Create Date: 2025-03-20 16:05:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d5f9b3c7e1a4"
+down_revision = "c4e8a2b6d9f1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "insight_report_job",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institution.id"), nullable=False),
+        sa.Column("author_profile_id", sa.Integer(), sa.ForeignKey("profile.id"), nullable=False),
+        sa.Column("target_kind", sa.String(length=20), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("target_label", sa.String(length=255), nullable=True),
+        sa.Column("flavor", sa.String(length=50), nullable=True),
+        sa.Column("custom_prompt", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failures", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    with op.batch_alter_table("insight_report_job", schema=None) as batch_op:
+        batch_op.create_index("ix_insight_report_job_author_profile_id", ["author_profile_id"], unique=False)
+
+    with op.batch_alter_table("insight_report", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("job_id", sa.Integer(), nullable=True))
+        batch_op.create_index("ix_insight_report_job_id", ["job_id"], unique=False)
+        batch_op.create_foreign_key(
+            "fk_insight_report_job_id", "insight_report_job", ["job_id"], ["id"]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("insight_report", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_insight_report_job_id", type_="foreignkey")
+        batch_op.drop_index("ix_insight_report_job_id")
+        batch_op.drop_column("job_id")
+    with op.batch_alter_table("insight_report_job", schema=None) as batch_op:
+        batch_op.drop_index("ix_insight_report_job_author_profile_id")
+    op.drop_table("insight_report_job")
@@ -0,0 +1,37 @@
+"""add plan_suggestion_index table
+
+Revision ID: d6b8f4c2e7a1
+Revises: c5a7e3b9d1f2
+Create Date: 2025-03-09 11:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d6b8f4c2e7a1"
+down_revision = "c5a7e3b9d1f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "plan_suggestion_index",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("plan_id", sa.Integer(), sa.ForeignKey("plan.id"), nullable=False),
+        sa.Column("grade_key", sa.String(length=64), nullable=False),
+        sa.Column("grade_labels", sa.JSON(), nullable=False),
+        sa.Column("areas", sa.JSON(), nullable=False),
+        sa.UniqueConstraint("plan_id", "grade_key", name="uq_plan_suggestion_index_grade"),
+    )
+    # Los planes existentes quedan con etag NULL y se indexan en la primera consulta.
+    with op.batch_alter_table("plan") as batch_op:
+        batch_op.add_column(sa.Column("suggestion_index_etag", sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("plan") as batch_op:
+        batch_op.drop_column("suggestion_index_etag")
+    op.drop_table("plan_suggestion_index")
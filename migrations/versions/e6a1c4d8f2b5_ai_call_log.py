@@ -0,0 +1,47 @@
+"""ai_call_log telemetry table
+
+Revision ID: e6a1c4d8f2b5
+Revises: d5f9b3c7e1a4
+Create Date: 2025-03-24 10:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e6a1c4d8f2b5"
+down_revision = "d5f9b3c7e1a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ai_call_log",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("call_site", sa.String(length=50), nullable=False),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institution.id"), nullable=True),
+        sa.Column("provider", sa.String(length=30), nullable=True),
+        sa.Column("model", sa.String(length=100), nullable=True),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("cost_usd", sa.Float(), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cache_hit", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("fallback", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("error", sa.String(length=255), nullable=True),
+    )
+    with op.batch_alter_table("ai_call_log", schema=None) as batch_op:
+        batch_op.create_index("ix_ai_call_log_institution_id", ["institution_id"], unique=False)
+        batch_op.create_index("ix_ai_call_log_site_created", ["call_site", "created_at"], unique=False)
+        batch_op.create_index("ix_ai_call_log_created_at", ["created_at"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("ai_call_log", schema=None) as batch_op:
+        batch_op.drop_index("ix_ai_call_log_created_at")
+        batch_op.drop_index("ix_ai_call_log_site_created")
+        batch_op.drop_index("ix_ai_call_log_institution_id")
+    op.drop_table("ai_call_log")
@@ -0,0 +1,37 @@
+"""add stored_blob table for content-addressed uploads
+
+Revision ID: e7c9a5d3f8b2
+Revises: d6b8f4c2e7a1
+Create Date: 2025-03-12 16:40:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e7c9a5d3f8b2"
+down_revision = "d6b8f4c2e7a1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stored_blob",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("content_hash", sa.String(length=64), nullable=False, unique=True),
+        sa.Column("backend", sa.String(length=20), nullable=False, server_default="local"),
+        sa.Column("storage_key", sa.String(length=255), nullable=False),
+        sa.Column("url", sa.String(length=512), nullable=False),
+        sa.Column("mime_type", sa.String(length=100), nullable=True),
+        sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_stored_blob_url", "stored_blob", ["url"])
+
+
+def downgrade():
+    op.drop_index("ix_stored_blob_url", table_name="stored_blob")
+    op.drop_table("stored_blob")
@@ -0,0 +1,26 @@
+"""institution ai_provider_chain
+
+Revision ID: f7b2d5e9a3c6
+Revises: e6a1c4d8f2b5
+Create Date: 2025-03-25 09:40:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f7b2d5e9a3c6"
+down_revision = "e6a1c4d8f2b5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("institution", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("ai_provider_chain", sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("institution", schema=None) as batch_op:
+        batch_op.drop_column("ai_provider_chain")
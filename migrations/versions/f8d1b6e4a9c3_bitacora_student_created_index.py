@@ -0,0 +1,29 @@
+"""index bitacora_entrada by student and created_at for cursor pagination
+
+Revision ID: f8d1b6e4a9c3
+Revises: e7c9a5d3f8b2
+Create Date: 2025-03-14 10:20:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f8d1b6e4a9c3"
+down_revision = "e7c9a5d3f8b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("bitacora_entrada", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_bitacora_student_created",
+            ["student_profile_id", "created_at", "id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("bitacora_entrada", schema=None) as batch_op:
+        batch_op.drop_index("ix_bitacora_student_created")
@@ -6,7 +6,7 @@ from .bitacora import BitacoraEntrada, BitacoraCategoria
 from .lesson import Lesson
 from .messages import Message, MessageThread, MessageThreadParticipant
 from .study_plan import StudyPlan, Objective
-from .plan import Plan, PlanItem, PlanDocument
+from .plan import Plan, PlanItem, PlanDocument, PlanFragment, PlanParseCheckpoint, PlanSuggestionIndex
 from .task import Task
 from .attachment import Attachment
 from .task_submission import (
@@ -14,8 +14,10 @@ from .task_submission import (
     SubmissionEvidence,
     EvidenceTypeEnum,
 )
-from .insight_report import InsightReport, ReportScope
+from .insight_report import InsightReport, InsightReportJob, ReportScope
 from .help_usage import TaskHelpUsage
+from .ai_call_log import AICallLog
+from .authoring_brief import AuthoringBrief
 from .curriculum import CurriculumDocument, CurriculumSegment
 from .curriculum_config import (
     CurriculumPrompt,
@@ -23,6 +25,7 @@ from .curriculum_config import (
     CurriculumAreaKeyword,
 )
 from .platform_theme import PlatformTheme
+from .stored_blob import StoredBlob
 
 __all__ = [
     "RoleEnum",
@@ -42,17 +45,24 @@ __all__ = [
     "Plan",
     "PlanDocument",
     "PlanItem",
+    "PlanFragment",
+    "PlanParseCheckpoint",
+    "PlanSuggestionIndex",
     "Objective",
     "Task",
     "TaskSubmission",
     "SubmissionEvidence",
     "EvidenceTypeEnum",
     "InsightReport",
+    "InsightReportJob",
     "ReportScope",
     "TaskHelpUsage",
+    "AICallLog",
+    "AuthoringBrief",
     "CurriculumDocument",
     "CurriculumSegment",
     "PlatformTheme",
+    "StoredBlob",
     "CurriculumPrompt",
     "CurriculumGradeAlias",
     "CurriculumAreaKeyword",
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from extensions import db
+
+
+class AICallLog(db.Model):
+    """
+    Telemetría de llamadas a la IA (una fila por llamada, sólo se agrega).
+    La escribe AITelemetry en lotes, fuera de la transacción del request.
+    """
+
+    __tablename__ = "ai_call_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Punto de llamada: student_help, lesson_brief, task_brief, insights, plan_parser, ...
+    call_site = db.Column(db.String(50), nullable=False)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institution.id"), nullable=True, index=True)
+
+    provider = db.Column(db.String(30), nullable=True)
+    model = db.Column(db.String(100), nullable=True)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    # USD estimados según AITelemetry.MODEL_PRICES al momento de la llamada.
+    cost_usd = db.Column(db.Float, nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=False, default=0)
+
+    cache_hit = db.Column(db.Boolean, nullable=False, default=False)
+    # Se pidió un proveedor real y se respondió con el heurístico.
+    fallback = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.String(255), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_ai_call_log_site_created", "call_site", "created_at"),
+        db.Index("ix_ai_call_log_created_at", "created_at"),
+    )
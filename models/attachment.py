@@ -40,6 +40,8 @@ class Attachment(db.Model):
 
     __table_args__ = (
         db.Index("ix_attachment_context", "context_type", "context_id"),
+        # FileDeliveryService.can_access resuelve los autores de cada URL servida.
+        db.Index("ix_attachment_storage_path", "storage_path", "uploaded_by_profile_id"),
     )
 
     def __repr__(self) -> str:  # pragma: no cover - helper
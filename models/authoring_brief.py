@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from extensions import db
+
+
+class AuthoringBrief(db.Model):
+    """
+    Borradores de AuthoringService (descripción y agenda de clase, consigna y ayudas de tarea)
+    indexados por la huella de sus entradas: prompt, modelo, institución y datos de la clase.
+    Los genera por adelantado `flask pregenerate-briefs` para las clases próximas y también se
+    guardan los pedidos a demanda; si la huella coincide el endpoint responde sin llamar a la IA.
+    """
+
+    __tablename__ = "authoring_brief"
+
+    KIND_LESSON = "lesson"
+    KIND_TASK = "task"
+    SOURCE_PREGENERATED = "pregenerated"
+    SOURCE_ON_DEMAND = "on_demand"
+
+    id = db.Column(db.Integer, primary_key=True)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institution.id"), nullable=True, index=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey("lesson.id", ondelete="SET NULL"), nullable=True, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    result = db.Column(db.JSON, nullable=False)
+    source = db.Column(db.String(20), nullable=False, default=SOURCE_ON_DEMAND)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("fingerprint", name="uq_authoring_brief_fingerprint"),
+    )
@@ -79,5 +79,10 @@ class BitacoraEntrada(db.Model):
         primaryjoin="and_(foreign(Attachment.context_id) == BitacoraEntrada.id, "
                     "Attachment.context_type == 'bitacora')",
         viewonly=True,
-        lazy="selectin",
+        lazy="select",
+    )
+
+    __table_args__ = (
+        # Listado por alumno paginado por cursor (created_at, id), del más nuevo al más viejo.
+        db.Index("ix_bitacora_student_created", "student_profile_id", "created_at", "id"),
     )
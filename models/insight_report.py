@@ -1,4 +1,5 @@
 import enum
+import json
 from datetime import datetime
 
 from extensions import db
@@ -28,6 +29,8 @@ class InsightReport(db.Model):
     ai_draft = db.Column(db.Text, nullable=True)
     final_text = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(50), nullable=False, default="draft")
+    # Lote que lo generó (reportes individuales de toda una clase/sección).
+    job_id = db.Column(db.Integer, db.ForeignKey("insight_report_job.id"), nullable=True, index=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -47,3 +50,63 @@ class InsightReport(db.Model):
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "final_text": self.final_text or self.ai_draft,
         }
+
+
+class InsightReportJob(db.Model):
+    """
+    Generación en lote de reportes individuales para todos los alumnos de una clase o sección.
+    Guarda el avance (completed/failed sobre total) y el detalle de los alumnos que fallaron.
+    """
+
+    __tablename__ = "insight_report_job"
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_ERROR = "error"
+
+    id = db.Column(db.Integer, primary_key=True)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institution.id"), nullable=False)
+    author_profile_id = db.Column(db.Integer, db.ForeignKey("profile.id"), nullable=False, index=True)
+
+    # "lesson" o "section"
+    target_kind = db.Column(db.String(20), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    target_label = db.Column(db.String(255), nullable=True)
+    flavor = db.Column(db.String(50), nullable=True)
+    custom_prompt = db.Column(db.Text, nullable=True)
+
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    # JSON: [{"student_id", "student", "error"}]
+    failures = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Lo actualiza el hilo del trabajo mientras avanza; sin latido reciente, el trabajo quedó huérfano.
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    author = db.relationship("Profile")
+    reports = db.relationship("InsightReport", backref="job", lazy="dynamic")
+
+    def failure_list(self) -> list[dict]:
+        return json.loads(self.failures) if self.failures else []
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "target_kind": self.target_kind,
+            "target_id": self.target_id,
+            "target_label": self.target_label,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "failures": self.failure_list(),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
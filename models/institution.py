@@ -13,6 +13,8 @@ class Institution(db.Model):
     rewards_config = db.Column(db.JSON, nullable=True)
     ai_provider = db.Column(db.String(50), nullable=True)
     ai_model = db.Column(db.String(100), nullable=True)
+    # Endpoints de IA en orden de preferencia, separados por coma (vacío = AI_PROVIDER_CHAIN).
+    ai_provider_chain = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     grades = db.relationship("Grade", back_populates="institution", cascade="all, delete-orphan")
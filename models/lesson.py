@@ -43,5 +43,10 @@ class Lesson(db.Model):
         "Attachment",
         primaryjoin="and_(foreign(Attachment.context_id) == Lesson.id, Attachment.context_type == 'lesson')",
         viewonly=True,
-        lazy="selectin",
+        lazy="select",
+    )
+
+    __table_args__ = (
+        # Panel docente: clases de un profesor por fecha (resumen y listado paginado).
+        db.Index("ix_lesson_teacher_date", "teacher_profile_id", "class_date", "id"),
     )
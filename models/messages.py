@@ -106,5 +106,5 @@ class Message(db.Model):
         "Attachment",
         primaryjoin="and_(foreign(Attachment.context_id) == Message.id, Attachment.context_type == 'message')",
         viewonly=True,
-        lazy="selectin",
+        lazy="select",
     )
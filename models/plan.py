@@ -16,6 +16,9 @@ class Plan(db.Model):
     jurisdiccion = db.Column(db.String(120), nullable=True)
     descripcion_general = db.Column(db.Text, nullable=True)
     contenido_bruto = db.Column(db.Text, nullable=False)
+    parse_stats = db.Column(db.JSON, nullable=True)
+    # Hash del índice de sugerencias vigente; None cuando los ítems cambiaron y hay que reconstruirlo.
+    suggestion_index_etag = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(
         db.DateTime,
@@ -30,6 +33,16 @@ class Plan(db.Model):
         cascade="all, delete-orphan",
     )
     study_plan = db.relationship("StudyPlan", back_populates="parsed_plan", uselist=False)
+    parse_checkpoints = db.relationship(
+        "PlanParseCheckpoint",
+        back_populates="plan",
+        cascade="all, delete-orphan",
+    )
+    suggestion_index = db.relationship(
+        "PlanSuggestionIndex",
+        back_populates="plan",
+        cascade="all, delete-orphan",
+    )
 
     def to_dict(self) -> dict:
         return {
@@ -40,6 +53,7 @@ class Plan(db.Model):
             "anio_lectivo": self.anio_lectivo,
             "jurisdiccion": self.jurisdiccion,
             "descripcion_general": self.descripcion_general,
+            "parse_stats": self.parse_stats,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -55,6 +69,7 @@ class PlanDocument(db.Model):
     title = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=True)
     subject_hint = db.Column(db.String(255), nullable=True)
+    parse_stats = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(
         db.DateTime,
@@ -66,6 +81,11 @@ class PlanDocument(db.Model):
     study_plan = db.relationship("StudyPlan", back_populates="plan_documents")
     curriculum_document = db.relationship("CurriculumDocument")
     plan_items = db.relationship("PlanItem", back_populates="plan_document", cascade="all, delete-orphan")
+    parse_checkpoints = db.relationship(
+        "PlanParseCheckpoint",
+        back_populates="plan_document",
+        cascade="all, delete-orphan",
+    )
 
     def label(self) -> str:
         base = self.title or "Documento"
@@ -85,6 +105,7 @@ class PlanItem(db.Model):
     area = db.Column(db.String(255), nullable=False)
     descripcion = db.Column(db.Text, nullable=False)
     metadata_json = db.Column("metadata", db.JSON, nullable=True)
+    fragment_hash = db.Column(db.String(64), nullable=True, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(
         db.DateTime,
@@ -115,3 +136,82 @@ class PlanItem(db.Model):
             "descripcion": self.descripcion,
             "metadata": self.metadata_dict,
         }
+
+
+class PlanFragment(db.Model):
+    """
+    Resultado del parser LLM para un fragmento de texto, indexado por el hash del fragmento
+    y la versión de la instrucción. Permite re-procesar planes editados sin volver a
+    consultar al modelo por los fragmentos que no cambiaron.
+    También guarda los objetivos sugeridos por área de plan_segments (hash propio que
+    incluye documento, grado, área y fragmentos enviados).
+    """
+
+    __tablename__ = "plan_fragment"
+
+    id = db.Column(db.Integer, primary_key=True)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institution.id"), nullable=False, index=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    items_json = db.Column("items", db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("institution_id", "content_hash", name="uq_plan_fragment_hash"),
+    )
+
+    @property
+    def items(self) -> list[dict]:
+        return self.items_json or []
+
+
+class PlanParseCheckpoint(db.Model):
+    """
+    Estado de cada fragmento de un parseo de plan. Se confirma a medida que el fragmento
+    termina, para poder retomar un parseo interrumpido y mostrar resultados parciales.
+    Los ítems parseados se guardan en PlanFragment (por fragment_hash).
+    """
+
+    __tablename__ = "plan_parse_checkpoint"
+
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_ERROR = "error"
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey("plan.id"), nullable=False, index=True)
+    plan_document_id = db.Column(db.Integer, db.ForeignKey("plan_document.id"), nullable=True, index=True)
+    fragment_index = db.Column(db.Integer, nullable=False)
+    fragment_hash = db.Column(db.String(64), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+    plan = db.relationship("Plan", back_populates="parse_checkpoints")
+    plan_document = db.relationship("PlanDocument", back_populates="parse_checkpoints")
+
+
+class PlanSuggestionIndex(db.Model):
+    """
+    Índice precalculado de sugerencias de un plan: una fila por grado con las áreas y los
+    ítems ya serializados, para que /api/planes/<id>/{grados,areas,sugerencias} respondan
+    con una sola búsqueda indexada.
+    """
+
+    __tablename__ = "plan_suggestion_index"
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey("plan.id"), nullable=False)
+    grade_key = db.Column(db.String(64), nullable=False)
+    grade_labels = db.Column(db.JSON, nullable=False, default=list)
+    areas = db.Column(db.JSON, nullable=False, default=list)
+
+    plan = db.relationship("Plan", back_populates="suggestion_index")
+
+    __table_args__ = (
+        db.UniqueConstraint("plan_id", "grade_key", name="uq_plan_suggestion_index_grade"),
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from extensions import db
+
+
+class StoredBlob(db.Model):
+    """
+    Archivo almacenado una única vez por contenido (sha256). Adjuntos y logos apuntan a su
+    URL; ref_count lleva cuántas referencias lo usan para poder borrarlo al llegar a cero.
+    """
+
+    __tablename__ = "stored_blob"
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, unique=True)
+    backend = db.Column(db.String(20), nullable=False, default="local")
+    storage_key = db.Column(db.String(255), nullable=False)
+    url = db.Column(db.String(512), nullable=False, index=True)
+    mime_type = db.Column(db.String(100), nullable=True)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
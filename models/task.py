@@ -53,5 +53,9 @@ class Task(db.Model):
         "Attachment",
         primaryjoin="and_(foreign(Attachment.context_id) == Task.id, Attachment.context_type == 'task')",
         viewonly=True,
-        lazy="selectin",
+        lazy="select",
+    )
+
+    __table_args__ = (
+        db.Index("ix_task_lesson_due", "lesson_id", "due_date"),
     )
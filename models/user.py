@@ -1,9 +1,22 @@
+import unicodedata
 from datetime import datetime
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
 from .roles import RoleEnum
 from flask_login import UserMixin
 
+def normalize_search_name(value: str | None) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados: "  José  Pérez" -> "jose perez"."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.casefold().split())
+
+
+def _default_search_name(context) -> str:
+    return normalize_search_name(context.get_current_parameters().get("full_name"))
+
+
 class User(UserMixin, db.Model):
     __tablename__ = "user"
 
@@ -34,9 +47,22 @@ class Profile(db.Model):
     institution_id = db.Column(db.Integer, db.ForeignKey("institution.id"), nullable=True)
     role = db.Column(db.Enum(RoleEnum), nullable=False)
     full_name = db.Column(db.String(255), nullable=False)
+    # full_name normalizado para el buscador de destinatarios (prefijo sobre índice).
+    search_name = db.Column(db.String(255), nullable=True, default=_default_search_name)
 
     section_id = db.Column(db.Integer, db.ForeignKey("section.id"), nullable=True)
 
     user = db.relationship("User", back_populates="profiles")
     institution = db.relationship("Institution", back_populates="profiles")
-    section = db.relationship("Section", back_populates="students") 
+    section = db.relationship("Section", back_populates="students")
+
+    __table_args__ = (
+        db.Index("ix_profile_institution_search", "institution_id", "search_name"),
+        # Directorio de admin: perfiles de un usuario (EXISTS correlacionado por user_id).
+        db.Index("ix_profile_user_institution", "user_id", "institution_id"),
+    )
+
+    @validates("full_name")
+    def _sync_search_name(self, key, value):
+        self.search_name = normalize_search_name(value)
+        return value
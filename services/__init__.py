@@ -1,21 +1,51 @@
+from .attachment_loader import AttachmentLoader
+from .fragment_cache import FragmentCache
+from .sqlite_pragmas import SQLitePragmas
+from .recipient_search_service import RecipientSearchService
+from .user_directory_service import UserDirectoryService
+from .roster_import_service import RosterImportService
 from .view_data_service import ViewDataService
 from .insights_service import InsightsService
+from .ai_telemetry import AITelemetry
+from .ai_scheduler import AIScheduler
+from .ai_providers import AIProviderHealth
 from .ai_client import AIClient
+from .async_ai_client import AsyncAIClient
 from .ai_insights_service import AIInsightsService
+from .insight_batch_service import InsightBatchService
 from .help_usage_service import HelpUsageService
 from .curriculum_service import CurriculumService
 from .plan_parser_service import PlanParserService
+from .plan_index_service import PlanIndexService
 from .authoring_service import AuthoringService
-from .storage_service import save_logo
+from .image_derivative_service import ImageDerivativeService
+from .file_delivery_service import FileDeliveryService
+from .storage_service import save_logo, save_upload, release_blob
 
 __all__ = [
+    "AttachmentLoader",
+    "FragmentCache",
+    "SQLitePragmas",
+    "RecipientSearchService",
+    "UserDirectoryService",
+    "RosterImportService",
     "ViewDataService",
     "InsightsService",
+    "AITelemetry",
+    "AIScheduler",
+    "AIProviderHealth",
     "AIClient",
+    "AsyncAIClient",
     "AIInsightsService",
+    "InsightBatchService",
     "HelpUsageService",
     "CurriculumService",
     "PlanParserService",
+    "PlanIndexService",
     "AuthoringService",
+    "FileDeliveryService",
+    "ImageDerivativeService",
     "save_logo",
+    "save_upload",
+    "release_blob",
 ]
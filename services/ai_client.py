@@ -3,11 +3,20 @@ from __future__ import annotations
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Any
+from typing import Any, NamedTuple
 from urllib import error as urlerror
 from urllib import request as urlrequest
 
+from services.ai_providers import AIEndpoint, AIProviderHealth
+from services.ai_scheduler import AIScheduler
+from services.ai_telemetry import AITelemetry
+from services.context_compactor import ContextCompactor
+from services.token_estimator import TokenEstimator
+
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +25,60 @@ class AIClient:
     """
     Cliente de IA genérico. Por defecto funciona en modo heurístico, pero puede utilizar un
     proveedor real (p. ej. OpenAI) configurando AI_PROVIDER/AI_API_KEY.
+
+    Con AI_PROVIDER_CHAIN (o Institution.ai_provider_chain) se arma una cadena ordenada de
+    endpoints compatibles con OpenAI: "openai" es el configurado con AI_API_*, y cualquier
+    otro nombre se lee de AI_<NOMBRE>_API_BASE / _API_KEY / _MODEL. Si el endpoint en curso
+    tarda más que su p95 se manda una copia al siguiente y gana la primera respuesta; los
+    endpoints con el circuito abierto (AIProviderHealth) se saltean. El heurístico queda
+    siempre como último recurso.
     """
 
-    def __init__(self, *, provider_override: str | None = None, model_override: str | None = None):
+    SYSTEM_PROMPT = (
+        "Actúas como asesor pedagógico senior. Redactas informes claros, empáticos y accionables "
+        "basados estrictamente en los datos provistos. Menciona hallazgos, alertas y próximos pasos."
+    )
+
+    # Ventana de contexto (tokens de entrada + salida) por prefijo de modelo.
+    MODEL_CONTEXT_WINDOWS = {
+        "gpt-4o": 128000,
+        "gpt-4.1": 1047576,
+        "gpt-4-turbo": 128000,
+        "gpt-4": 8192,
+        "gpt-3.5-turbo": 16385,
+    }
+    DEFAULT_CONTEXT_WINDOW = 8192
+
+    # Tope de tokens del contexto estructurado por punto de llamada (None = sin tope: el
+    # parser de planes y el de documentos ya fragmentan su entrada con su propio presupuesto).
+    # AI_CONTEXT_MAX_TOKENS pisa estos valores para todos los puntos con tope.
+    CONTEXT_TOKEN_BUDGETS = {
+        "student_help": 1200,
+        "lesson_brief": 1500,
+        "task_brief": 1500,
+        "lesson_brief_pregen": 1500,
+        "task_brief_pregen": 1500,
+        "insights": 2000,
+        "insights_batch": 2000,
+    }
+
+    _prompt_stats: dict[str, dict] = {}
+    _prompt_stats_lock = threading.Lock()
+
+    # Hilos para las llamadas de la cadena con hedge (las que pierden terminan en segundo plano).
+    _provider_executor: ThreadPoolExecutor | None = None
+    _provider_executor_lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        provider_override: str | None = None,
+        model_override: str | None = None,
+        provider_chain: str | None = None,
+        institution_id: int | None = None,
+    ):
+        # Sólo para la telemetría: a qué institución se imputa la llamada.
+        self.institution_id = institution_id
         self.api_key = os.getenv("AI_API_KEY") or os.getenv("OPENAI_API_KEY")
 
         provider_override_norm = (provider_override or "").strip().lower() or None
@@ -31,8 +91,8 @@ class AIClient:
             self.provider = provider_override_norm
         elif provider:
             self.provider = provider.lower()
-        elif self.api_key:
-            # Si hay clave pero no se configuró proveedor, asumimos OpenAI.
+        elif self.api_key or os.getenv("AI_PROVIDER_CHAIN"):
+            # Si hay clave (o cadena de endpoints) pero no se configuró proveedor, asumimos OpenAI.
             self.provider = "openai"
         else:
             self.provider = "heuristic"
@@ -44,6 +104,46 @@ class AIClient:
         self.max_tokens = int(os.getenv("AI_MAX_TOKENS", "700") or 700)
         self.timeout = self._float_env("AI_TIMEOUT", default=20.0)
         self.api_base = os.getenv("AI_API_BASE", "https://api.openai.com/v1").rstrip("/")
+        self.context_window = int(self._float_env("AI_CONTEXT_WINDOW", default=0)) or self._context_window_for(self.model)
+
+        self.endpoints = self._build_endpoints(provider_chain or os.getenv("AI_PROVIDER_CHAIN") or "openai")
+        self.hedge_enabled = os.getenv("AI_HEDGE_ENABLED", "1") != "0"
+        # Demora del hedge mientras un endpoint no tiene suficientes latencias para estimar su p95.
+        self.hedge_delay = self._float_env("AI_HEDGE_DELAY", default=4.0)
+        self.hedge_min_delay = self._float_env("AI_HEDGE_MIN_DELAY", default=0.5)
+
+    def _build_endpoints(self, chain: str) -> list[AIEndpoint]:
+        endpoints: list[AIEndpoint] = []
+        for name in dict.fromkeys(part.strip().lower() for part in chain.split(",") if part.strip()):
+            if name == "openai":
+                if self.api_key:
+                    endpoints.append(AIEndpoint("openai", self.api_base, self.api_key, self.model))
+                continue
+            prefix = f"AI_{name.upper().replace('-', '_')}_"
+            api_base = os.getenv(f"{prefix}API_BASE")
+            if not api_base:
+                logger.warning("Endpoint de IA '%s' sin %sAPI_BASE: se omite de la cadena.", name, prefix)
+                continue
+            endpoints.append(
+                AIEndpoint(
+                    name,
+                    api_base.rstrip("/"),
+                    os.getenv(f"{prefix}API_KEY"),
+                    os.getenv(f"{prefix}MODEL") or self.model,
+                )
+            )
+        return endpoints
+
+    @classmethod
+    def _context_window_for(cls, model: str) -> int:
+        name = (model or "").lower()
+        matches = [prefix for prefix in cls.MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+        if not matches:
+            return cls.DEFAULT_CONTEXT_WINDOW
+        return cls.MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+    def token_estimator(self) -> TokenEstimator:
+        return TokenEstimator.for_model(self.model)
 
     @staticmethod
     def _float_env(var_name: str, default: float) -> float:
@@ -56,52 +156,209 @@ class AIClient:
             logger.warning("Valor inválido para %s=%s. Se usa %s por defecto.", var_name, raw, default)
             return default
 
-    def generate(self, prompt: str, context: dict) -> dict:
+    def generate(self, prompt: str, context: dict, *, call_site: str | None = None) -> dict:
         """
         Devuelve un dict con texto generado y metadata básica.
+        El contexto se compacta (ContextCompactor) antes de enviarlo y de guardarlo como
+        snapshot; el tamaño del prompt queda registrado por call_site (por defecto, context["scope"]).
         """
-        if self.provider == "openai" and self.api_key:
+        call = self._prepare(prompt, context, call_site)
+        started = time.perf_counter()
+        error = None
+        if self.uses_provider:
             try:
-                return self._openai_response(prompt, context)
+                # El planificador reparte la clave compartida entre instituciones y prioridades.
+                with AIScheduler.default().slot(self.institution_id, AIScheduler.priority_for(call.site)):
+                    result = self._chain_response(prompt, call.context_json)
             except Exception as exc:  # pragma: no cover - sólo se usa cuando OpenAI falla
                 logger.warning("Fallo al invocar OpenAI, se usa fallback heurístico: %s", exc)
+                error = str(exc)
+            else:
+                return self._finish(call, result, started)
 
         # Si no hay proveedor real o falló, lo resolvemos in-memory.
-        return self._heuristic_response(prompt, context, provider_override="heuristic")
+        return self._finish_with_fallback(call, prompt, started, error)
 
-    def _openai_response(self, prompt: str, context: dict) -> dict:
-        """
-        Llama a la API de chat completions para generar el informe.
-        """
-        payload = {
-            "model": self.model,
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "Actúas como asesor pedagógico senior. Redactas informes claros, empáticos y accionables "
-                        "basados estrictamente en los datos provistos. Menciona hallazgos, alertas y próximos pasos."
-                    ),
-                },
-                {"role": "user", "content": prompt},
+    @property
+    def uses_provider(self) -> bool:
+        return self.provider == "openai" and bool(self.endpoints)
+
+    def _prepare(self, prompt: str, context: dict, call_site: str | None) -> "_PreparedCall":
+        """Compacta el contexto y registra el tamaño del prompt (común a AIClient y AsyncAIClient)."""
+        site = call_site or (context or {}).get("scope") or "generic"
+        estimator = self.token_estimator()
+        context, context_json, truncated = ContextCompactor.compact(
+            context,
+            max_tokens=AIClient._budget_for(site),
+            estimator=estimator,
+        )
+        context_tokens = estimator.count(context_json)
+        prompt_tokens = estimator.count(self.SYSTEM_PROMPT) + estimator.count(prompt) + context_tokens
+        AIClient._record_prompt(site, prompt_tokens, context_tokens, truncated)
+        return _PreparedCall(site, context, context_json, prompt_tokens, estimator)
+
+    def _finish(self, call: "_PreparedCall", result: dict, started: float) -> dict:
+        result["prompt_tokens"] = call.prompt_tokens
+        self._record_call(call, result, started)
+        return result
+
+    def _finish_with_fallback(self, call: "_PreparedCall", prompt: str, started: float, error: str | None) -> dict:
+        result = self._heuristic_response(prompt, call.context, provider_override="heuristic")
+        result["context_snapshot"] = call.context_json
+        result["prompt_tokens"] = call.prompt_tokens
+        self._record_call(call, result, started, fallback=error is not None, error=error)
+        return result
+
+    def _record_call(
+        self,
+        call: "_PreparedCall",
+        result: dict,
+        started: float,
+        *,
+        fallback: bool = False,
+        error: str | None = None,
+    ) -> None:
+        # Tokens reales del proveedor (usage) si los hay; si no, los estimados.
+        usage = result.get("usage") or {}
+        AITelemetry.record(
+            call_site=call.site,
+            institution_id=self.institution_id,
+            provider=result.get("provider"),
+            model=result.get("model"),
+            prompt_tokens=usage.get("prompt_tokens") or call.prompt_tokens,
+            completion_tokens=usage.get("completion_tokens") or call.estimator.count(result.get("text")),
+            latency_ms=round((time.perf_counter() - started) * 1000),
+            fallback=fallback,
+            error=error,
+        )
+
+    @classmethod
+    def prompt_stats(cls) -> dict[str, dict]:
+        """Tamaño de prompt (tokens estimados) por punto de llamada desde que arrancó el proceso."""
+        with cls._prompt_stats_lock:
+            snapshot = {site: dict(stats) for site, stats in cls._prompt_stats.items()}
+        for site, stats in snapshot.items():
+            calls = stats["calls"]
+            stats["avg_prompt_tokens"] = round(stats.pop("prompt_tokens_total") / calls) if calls else 0
+            stats["avg_context_tokens"] = round(stats.pop("context_tokens_total") / calls) if calls else 0
+            stats["context_budget"] = cls._budget_for(site)
+        return snapshot
+
+    @classmethod
+    def _budget_for(cls, site: str) -> int | None:
+        budget = cls.CONTEXT_TOKEN_BUDGETS.get(site)
+        override = int(cls._float_env("AI_CONTEXT_MAX_TOKENS", default=0))
+        if budget and override:
+            return override
+        return budget
+
+    @classmethod
+    def _record_prompt(cls, site: str, prompt_tokens: int, context_tokens: int, truncated: bool) -> None:
+        with cls._prompt_stats_lock:
+            stats = cls._prompt_stats.setdefault(
+                site,
                 {
-                    "role": "user",
-                    "content": "Contexto estructurado:\n{}".format(
-                        json.dumps(context, ensure_ascii=False, indent=2)
-                    ),
+                    "calls": 0,
+                    "prompt_tokens_total": 0,
+                    "context_tokens_total": 0,
+                    "max_prompt_tokens": 0,
+                    "truncated": 0,
                 },
-            ],
-        }
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens_total"] += prompt_tokens
+            stats["context_tokens_total"] += context_tokens
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], prompt_tokens)
+            stats["truncated"] += int(truncated)
+
+    def _chain_response(self, prompt: str, context_json: str) -> dict:
+        """
+        Recorre la cadena de endpoints: arranca por el primero sano y, si no respondió dentro
+        de su p95, manda una copia al siguiente (hedge); gana la primera respuesta válida.
+        Si uno falla se pasa al siguiente sin esperar. Lanza RuntimeError si ninguno respondió.
+        """
+        candidates = [(endpoint, AIProviderHealth.for_endpoint(endpoint)) for endpoint in self.endpoints]
+        if len(candidates) == 1:
+            endpoint, health = candidates[0]
+            if not health.allow():
+                raise RuntimeError(f"{endpoint.name}: circuito abierto")
+            return self._timed_response(endpoint, health, prompt, context_json)
+
+        errors: list[str] = []
+        pending: dict = {}
+        hedges: dict = {}
+        executor = AIClient._executor()
+
+        def launch(as_hedge: bool) -> AIProviderHealth | None:
+            while candidates:
+                endpoint, health = candidates.pop(0)
+                if not health.allow():
+                    errors.append(f"{endpoint.name}: circuito abierto")
+                    continue
+                future = executor.submit(self._timed_response, endpoint, health, prompt, context_json)
+                pending[future] = (endpoint, health)
+                if as_hedge:
+                    hedges[future] = health
+                return health
+            return None
 
+        current = launch(as_hedge=False)
+        winner = None
+        try:
+            while pending:
+                timeout = None
+                if self.hedge_enabled and candidates and current is not None:
+                    timeout = current.hedge_delay(self.hedge_delay, self.hedge_min_delay)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    current = launch(as_hedge=True) or current
+                    continue
+                for future in done:
+                    endpoint, _health = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        errors.append(f"{endpoint.name}: {exc}")
+                        continue
+                    winner = future
+                    result["hedged"] = bool(hedges)
+                    return result
+                if not pending:
+                    current = launch(as_hedge=False)
+        finally:
+            for future, health in hedges.items():
+                health.record_hedge(won=future is winner)
+        raise RuntimeError("; ".join(errors) or "No hay endpoints de IA disponibles.")
+
+    def _timed_response(self, endpoint: AIEndpoint, health: AIProviderHealth, prompt: str, context_json: str) -> dict:
+        started = time.perf_counter()
+        try:
+            result = self._openai_response(endpoint, prompt, context_json)
+        except Exception as exc:
+            health.record_failure(str(exc))
+            raise
+        health.record_success(time.perf_counter() - started)
+        return result
+
+    @classmethod
+    def _executor(cls) -> ThreadPoolExecutor:
+        with cls._provider_executor_lock:
+            if cls._provider_executor is None:
+                workers = 2 * int(os.getenv("AI_MAX_CONCURRENCY") or 8)
+                cls._provider_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-provider")
+            return cls._provider_executor
+
+    def _openai_response(self, endpoint: AIEndpoint, prompt: str, context_json: str) -> dict:
+        """
+        Llama a la API de chat completions del endpoint para generar el informe.
+        """
+        headers = {"Content-Type": "application/json"}
+        if endpoint.api_key:
+            headers["Authorization"] = f"Bearer {endpoint.api_key}"
         request = urlrequest.Request(
-            f"{self.api_base}/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            },
+            f"{endpoint.api_base}/chat/completions",
+            data=json.dumps(self._openai_payload(endpoint, prompt, context_json)).encode("utf-8"),
+            headers=headers,
             method="POST",
         )
 
@@ -113,7 +370,28 @@ class AIClient:
             raise RuntimeError(f"OpenAI HTTP {exc.code}: {detail}") from exc
         except urlerror.URLError as exc:
             raise RuntimeError(f"OpenAI request error: {exc.reason}") from exc
+        except TimeoutError as exc:
+            # Lectura de la respuesta más lenta que AI_TIMEOUT (urllib no lo envuelve en URLError).
+            raise RuntimeError(f"OpenAI request error: timeout tras {self.timeout:g}s") from exc
 
+        return self._openai_result(endpoint, data, context_json)
+
+    def _openai_payload(self, endpoint: AIEndpoint, prompt: str, context_json: str) -> dict:
+        return {
+            "model": endpoint.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": self.SYSTEM_PROMPT,
+                },
+                {"role": "user", "content": prompt},
+                {"role": "user", "content": f"Contexto estructurado:\n{context_json}"},
+            ],
+        }
+
+    def _openai_result(self, endpoint: AIEndpoint, data: str, context_json: str) -> dict:
         payload = json.loads(data)
         choice: dict[str, Any] = (payload.get("choices") or [{}])[0]
         message = (choice.get("message") or {}).get("content", "").strip()
@@ -122,9 +400,10 @@ class AIClient:
 
         return {
             "text": message,
-            "model": payload.get("model") or self.model,
-            "provider": "openai",
-            "context_snapshot": json.dumps(context, ensure_ascii=False),
+            "model": payload.get("model") or endpoint.model,
+            "provider": endpoint.name,
+            "context_snapshot": context_json,
+            "usage": payload.get("usage") or {},
         }
 
     def _heuristic_response(self, prompt: str, context: dict, provider_override: str | None = None) -> dict:
@@ -175,5 +454,13 @@ class AIClient:
             "text": body,
             "model": "heuristic",
             "provider": provider_override or self.provider,
-            "context_snapshot": json.dumps(context, ensure_ascii=False),
+            "context_snapshot": ContextCompactor.dumps(context),
         }
+
+
+class _PreparedCall(NamedTuple):
+    site: str
+    context: dict
+    context_json: str
+    prompt_tokens: int
+    estimator: TokenEstimator
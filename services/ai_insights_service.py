@@ -64,8 +64,10 @@ class AIInsightsService:
         client = AIClient(
             provider_override=institution_provider,
             model_override=institution_model,
+            provider_chain=institution.ai_provider_chain if institution else None,
+            institution_id=author.institution_id,
         )
-        ai_result = client.generate(prompt=prompt, context=context)
+        ai_result = client.generate(prompt=prompt, context=context, call_site="insights")
 
         report = InsightReport(
             institution_id=author.institution_id,
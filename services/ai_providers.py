@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class AIEndpoint(NamedTuple):
+    """Un servidor compatible con la API de chat completions de OpenAI."""
+
+    name: str
+    api_base: str
+    api_key: str | None
+    model: str
+
+
+class AIProviderHealth:
+    """
+    Salud de cada endpoint de IA en este proceso (compartida entre clientes e hilos):
+
+    - Latencias recientes de las respuestas exitosas, para calcular el p95 que usa AIClient
+      como demora antes de mandar la copia (hedge) al siguiente endpoint de la cadena.
+    - Circuit breaker: tras AI_BREAKER_FAILURES fallos seguidos el endpoint queda abierto
+      AI_BREAKER_COOLDOWN segundos y las llamadas pasan directo al siguiente. Pasado ese
+      tiempo se deja pasar una sola llamada de prueba (semiabierto): si responde se cierra,
+      si falla vuelve a abrirse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    LATENCY_SAMPLES = 200
+    # Con menos muestras que esto el p95 no es confiable y se usa AI_HEDGE_DELAY.
+    MIN_SAMPLES = 20
+
+    # Clave: (name, api_base, model) del AIEndpoint.
+    _registry: dict[tuple[str, str, str], "AIProviderHealth"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name: str, *, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._successes = 0
+        self._failures = 0
+        self._skipped = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._last_error: str | None = None
+
+    @classmethod
+    def for_endpoint(cls, endpoint: AIEndpoint) -> "AIProviderHealth":
+        # Mismo nombre con otra URL o modelo (p. ej. override por institución) es otro endpoint:
+        # sus fallos y latencias no se mezclan.
+        key = (endpoint.name, endpoint.api_base, endpoint.model)
+        with cls._registry_lock:
+            health = cls._registry.get(key)
+            if health is None:
+                health = cls(
+                    f"{endpoint.name}:{endpoint.model}@{endpoint.api_base}",
+                    failure_threshold=int(os.getenv("AI_BREAKER_FAILURES") or 3),
+                    cooldown=float(os.getenv("AI_BREAKER_COOLDOWN") or 30),
+                )
+                cls._registry[key] = health
+            return health
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._registry_lock:
+            registry = list(cls._registry.values())
+        return {health.name: health.snapshot() for health in registry}
+
+    def allow(self) -> bool:
+        """¿Se puede mandar una llamada a este endpoint? (reserva la llamada de prueba si corresponde)."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._skipped += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._successes += 1
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._last_error = error[:200]
+            if self._trial_in_flight or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logger.warning("Endpoint de IA '%s' fuera de servicio: %s", self.name, error)
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """La llamada se canceló sin resultado (perdió el hedge): libera la prueba si era ella."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_hedge(self, won: bool) -> None:
+        with self._lock:
+            self._hedges += 1
+            self._hedge_wins += int(won)
+
+    def hedge_delay(self, default: float, minimum: float) -> float:
+        """Segundos a esperar una respuesta de este endpoint antes de mandar la copia al siguiente."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.MIN_SAMPLES:
+            return default
+        return max(minimum, samples[min(len(samples) - 1, int(len(samples) * 0.95))])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._latencies)
+            return {
+                "state": self._state(time.monotonic()),
+                "successes": self._successes,
+                "failures": self._failures,
+                "consecutive_failures": self._consecutive_failures,
+                "skipped": self._skipped,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "p50_s": round(samples[len(samples) // 2], 3) if samples else None,
+                "p95_s": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else None,
+                "last_error": self._last_error,
+            }
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if now - self._opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class AIQueueTimeout(RuntimeError):
+    """La llamada esperó más que su límite por un lugar en el proveedor de IA."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "institution_id", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, institution_id: int | None):
+        self.priority = priority
+        self.seq = seq
+        self.institution_id = institution_id
+        self.enqueued_at = time.monotonic()
+
+
+class AIScheduler:
+    """
+    Planificador delante del proveedor de IA (una sola clave compartida por todas las instituciones).
+
+    - Concurrencia global (AI_MAX_CONCURRENCY) y por institución (AI_INSTITUTION_CONCURRENCY), para
+      que un colegio parseando planes o generando reportes en lote no acapare la clave.
+    - Clases de prioridad: ayudas a alumnos > autoría docente > procesos en segundo plano. Los lugares
+      libres se asignan en ese orden (y por orden de llegada dentro de cada clase); además
+      AI_INTERACTIVE_RESERVED lugares quedan siempre reservados para las ayudas a alumnos.
+    - Token bucket de AI_RATE_PER_MINUTE llamadas (0 = sin límite) con ráfaga de AI_RATE_BURST.
+
+    Si una llamada no consigue lugar dentro del tiempo de su clase se lanza AIQueueTimeout
+    (AIClient responde con el fallback heurístico).
+    """
+
+    INTERACTIVE = 0
+    AUTHORING = 1
+    BACKGROUND = 2
+    PRIORITY_NAMES = {INTERACTIVE: "interactive", AUTHORING: "authoring", BACKGROUND: "background"}
+
+    # Punto de llamada -> clase de prioridad (el resto: AUTHORING).
+    CALL_SITE_PRIORITIES = {
+        "student_help": INTERACTIVE,
+        "plan_parser": BACKGROUND,
+        "curriculum_structure": BACKGROUND,
+        "insights_batch": BACKGROUND,
+        "lesson_brief_pregen": BACKGROUND,
+        "task_brief_pregen": BACKGROUND,
+    }
+    # Espera máxima por un lugar, en segundos, por clase.
+    QUEUE_TIMEOUTS = {INTERACTIVE: 8.0, AUTHORING: 30.0, BACKGROUND: 600.0}
+    # Cantidad de esperas recientes que se guardan para las estadísticas.
+    WAIT_SAMPLES = 500
+    # Los que esperan desde asyncio no pueden dormir en la Condition: revisan la cola cada tanto.
+    ASYNC_POLL_SECONDS = 0.02
+
+    _default: "AIScheduler | None" = None
+    _default_lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 8,
+        institution_concurrency: int = 3,
+        interactive_reserved: int = 2,
+        rate_per_minute: float = 0,
+        burst: int | None = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.institution_concurrency = max(1, institution_concurrency)
+        self.interactive_reserved = min(max(0, interactive_reserved), self.max_concurrency - 1)
+        self.rate_per_second = max(0.0, rate_per_minute) / 60.0
+        self.burst = float(burst or self.max_concurrency)
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: list[_Waiter] = []
+        self._in_flight = 0
+        self._in_flight_by_institution: dict[int | None, int] = {}
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+
+        self._waits = {priority: deque(maxlen=self.WAIT_SAMPLES) for priority in self.PRIORITY_NAMES}
+        self._started = dict.fromkeys(self.PRIORITY_NAMES, 0)
+        self._timeouts = dict.fromkeys(self.PRIORITY_NAMES, 0)
+
+    @classmethod
+    def default(cls) -> "AIScheduler":
+        """Instancia del proceso, configurada con las variables de entorno AI_*."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(
+                    max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY") or 8),
+                    institution_concurrency=int(os.getenv("AI_INSTITUTION_CONCURRENCY") or 3),
+                    interactive_reserved=int(os.getenv("AI_INTERACTIVE_RESERVED") or 2),
+                    rate_per_minute=float(os.getenv("AI_RATE_PER_MINUTE") or 0),
+                    burst=int(os.getenv("AI_RATE_BURST") or 0) or None,
+                )
+            return cls._default
+
+    @classmethod
+    def priority_for(cls, call_site: str | None) -> int:
+        return cls.CALL_SITE_PRIORITIES.get(call_site or "", cls.AUTHORING)
+
+    @contextmanager
+    def slot(self, institution_id: int | None, priority: int, timeout: float | None = None):
+        self.acquire(institution_id, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(institution_id)
+
+    def acquire(self, institution_id: int | None, priority: int, timeout: float | None = None) -> float:
+        """Bloquea hasta obtener lugar; devuelve los segundos de espera."""
+        timeout = self.QUEUE_TIMEOUTS.get(priority, 30.0) if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            waiter = _Waiter(priority, next(self._seq), institution_id)
+            self._waiting.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self._is_next(waiter):
+                        delay = self._token_delay(now)
+                        if delay == 0:
+                            self._start(waiter)
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._timeout_error(priority, timeout)
+                    self._cond.wait(min(remaining, delay) if delay else remaining)
+            finally:
+                self._waiting.remove(waiter)
+                # Otro en la cola puede haber quedado primero.
+                self._cond.notify_all()
+        waited = time.monotonic() - waiter.enqueued_at
+        self._waits[priority].append(waited)
+        return waited
+
+    @asynccontextmanager
+    async def aslot(self, institution_id: int | None, priority: int, timeout: float | None = None):
+        await self.aacquire(institution_id, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(institution_id)
+
+    async def aacquire(self, institution_id: int | None, priority: int, timeout: float | None = None) -> float:
+        """Como acquire, sin bloquear el event loop; comparte cola y cupos con las llamadas sincrónicas."""
+        timeout = self.QUEUE_TIMEOUTS.get(priority, 30.0) if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            waiter = _Waiter(priority, next(self._seq), institution_id)
+            self._waiting.append(waiter)
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    delay = None
+                    if self._is_next(waiter):
+                        delay = self._token_delay(now)
+                        if delay == 0:
+                            self._start(waiter)
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._timeout_error(priority, timeout)
+                await asyncio.sleep(min(remaining, delay or self.ASYNC_POLL_SECONDS, self.ASYNC_POLL_SECONDS))
+        finally:
+            with self._cond:
+                self._waiting.remove(waiter)
+                self._cond.notify_all()
+        waited = time.monotonic() - waiter.enqueued_at
+        self._waits[priority].append(waited)
+        return waited
+
+    def release(self, institution_id: int | None) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            remaining = self._in_flight_by_institution.get(institution_id, 1) - 1
+            if remaining > 0:
+                self._in_flight_by_institution[institution_id] = remaining
+            else:
+                self._in_flight_by_institution.pop(institution_id, None)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = dict.fromkeys(self.PRIORITY_NAMES.values(), 0)
+            oldest = dict.fromkeys(self.PRIORITY_NAMES.values(), 0.0)
+            now = time.monotonic()
+            for waiter in self._waiting:
+                name = self.PRIORITY_NAMES[waiter.priority]
+                queued[name] += 1
+                oldest[name] = max(oldest[name], round(now - waiter.enqueued_at, 3))
+            classes = {}
+            for priority, name in self.PRIORITY_NAMES.items():
+                waits = sorted(self._waits[priority])
+                classes[name] = {
+                    "queued": queued[name],
+                    "oldest_wait_s": oldest[name],
+                    "started": self._started[priority],
+                    "timeouts": self._timeouts[priority],
+                    "wait_p50_s": round(waits[len(waits) // 2], 3) if waits else None,
+                    "wait_p95_s": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                    "wait_max_s": round(waits[-1], 3) if waits else None,
+                }
+            return {
+                "in_flight": self._in_flight,
+                "in_flight_by_institution": {
+                    str(institution_id): count for institution_id, count in self._in_flight_by_institution.items()
+                },
+                "max_concurrency": self.max_concurrency,
+                "institution_concurrency": self.institution_concurrency,
+                "interactive_reserved": self.interactive_reserved,
+                "rate_per_minute": round(self.rate_per_second * 60, 2),
+                "tokens_available": round(self._tokens, 2) if self.rate_per_second else None,
+                "classes": classes,
+            }
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    def _can_run(self, waiter: _Waiter) -> bool:
+        limit = self.max_concurrency
+        if waiter.priority != self.INTERACTIVE:
+            limit -= self.interactive_reserved
+        if self._in_flight >= limit:
+            return False
+        return self._in_flight_by_institution.get(waiter.institution_id, 0) < self.institution_concurrency
+
+    def _is_next(self, waiter: _Waiter) -> bool:
+        """Puede arrancar y nadie con mejor prioridad (o anterior) que también pueda está esperando."""
+        if not self._can_run(waiter):
+            return False
+        key = (waiter.priority, waiter.seq)
+        return not any(
+            (other.priority, other.seq) < key and self._can_run(other) for other in self._waiting
+        )
+
+    def _token_delay(self, now: float) -> float:
+        if not self.rate_per_second:
+            return 0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate_per_second
+
+    def _timeout_error(self, priority: int, timeout: float) -> AIQueueTimeout:
+        self._timeouts[priority] += 1
+        return AIQueueTimeout(
+            f"Sin lugar en el proveedor de IA tras {timeout:g}s "
+            f"(prioridad {self.PRIORITY_NAMES.get(priority, priority)})."
+        )
+
+    def _start(self, waiter: _Waiter) -> None:
+        if self.rate_per_second:
+            self._tokens -= 1
+        self._in_flight += 1
+        self._in_flight_by_institution[waiter.institution_id] = (
+            self._in_flight_by_institution.get(waiter.institution_id, 0) + 1
+        )
+        self._started[waiter.priority] += 1
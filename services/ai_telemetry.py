@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import atexit
+import math
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert
+
+from extensions import db
+from models import AICallLog
+
+
+class TelemetryWriter:
+    """
+    Buffer en memoria de filas de AICallLog. Un hilo de fondo las inserta por lotes cuando
+    se juntan flush_size filas o pasan flush_seconds, en su propia conexión (nunca dentro
+    de la transacción del request que hizo la llamada).
+    """
+
+    # Si la base no responde, no acumulamos filas sin límite.
+    MAX_BUFFERED = 5000
+
+    def __init__(self, app, *, flush_size: int = 50, flush_seconds: float = 5.0):
+        self.app = app
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def append(self, row: dict) -> None:
+        with self._lock:
+            if len(self._rows) >= self.MAX_BUFFERED:
+                self._rows.pop(0)
+                self.dropped += 1
+            self._rows.append(row)
+            pending = len(self._rows)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="ai-telemetry", daemon=True)
+                self._thread.start()
+        if pending >= self.flush_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(insert(AICallLog), rows)
+        except Exception as exc:  # pragma: no cover - tabla sin migrar o base caída
+            self.dropped += len(rows)
+            self.app.logger.warning("No se pudo guardar la telemetría de IA (%s filas): %s", len(rows), exc)
+            return 0
+        return len(rows)
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+
+class AITelemetry:
+    """
+    Registro de cada llamada a la IA (punto de llamada, institución, proveedor, modelo, tokens,
+    latencia, costo estimado, cache y fallback) y agregados para el panel del dueño.
+    """
+
+    EXTENSION_KEY = "ai_telemetry"
+    # USD por millón de tokens (entrada, salida), por prefijo de modelo.
+    MODEL_PRICES = {
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4.1-nano": (0.10, 0.40),
+        "gpt-4.1-mini": (0.40, 1.60),
+        "gpt-4.1": (2.00, 8.00),
+        "gpt-4-turbo": (10.00, 30.00),
+        "gpt-3.5-turbo": (0.50, 1.50),
+    }
+
+    _writer: TelemetryWriter | None = None
+
+    @staticmethod
+    def init_app(app) -> None:
+        if not app.config.get("AI_TELEMETRY_ENABLED", True):
+            return
+        writer = TelemetryWriter(
+            app,
+            flush_size=int(app.config.get("AI_TELEMETRY_FLUSH_SIZE") or 50),
+            flush_seconds=float(app.config.get("AI_TELEMETRY_FLUSH_SECONDS") or 5),
+        )
+        app.extensions[AITelemetry.EXTENSION_KEY] = writer
+        AITelemetry._writer = writer
+        atexit.register(writer.flush)
+
+    @staticmethod
+    def record(
+        *,
+        call_site: str,
+        institution_id: int | None = None,
+        provider: str | None = None,
+        model: str | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+        latency_ms: int = 0,
+        cache_hit: bool = False,
+        fallback: bool = False,
+        error: str | None = None,
+    ) -> None:
+        """No toca la base: encola la fila (se puede llamar desde cualquier hilo)."""
+        writer = AITelemetry._writer
+        if writer is None:
+            return
+        writer.append(
+            {
+                "created_at": datetime.utcnow(),
+                "call_site": (call_site or "generic")[:50],
+                "institution_id": institution_id,
+                "provider": (provider or "")[:30] or None,
+                "model": (model or "")[:100] or None,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": AITelemetry.estimate_cost(model, prompt_tokens, completion_tokens)
+                if provider != "heuristic" and not cache_hit
+                else 0.0,
+                "latency_ms": int(latency_ms),
+                "cache_hit": cache_hit,
+                "fallback": fallback,
+                "error": error[:255] if error else None,
+            }
+        )
+
+    @staticmethod
+    def flush() -> int:
+        writer = AITelemetry._writer
+        return writer.flush() if writer is not None else 0
+
+    @staticmethod
+    def estimate_cost(model: str | None, prompt_tokens: int | None, completion_tokens: int | None) -> float | None:
+        name = (model or "").lower()
+        matches = [prefix for prefix in AITelemetry.MODEL_PRICES if name.startswith(prefix)]
+        if not matches:
+            return None
+        input_price, output_price = AITelemetry.MODEL_PRICES[max(matches, key=len)]
+        return round(((prompt_tokens or 0) * input_price + (completion_tokens or 0) * output_price) / 1_000_000, 6)
+
+    @staticmethod
+    def summary(*, days: int = 7, institution_id: int | None = None) -> dict:
+        """
+        Agregados de los últimos `days` días: por funcionalidad (llamadas, tokens, costo,
+        p50/p95 de latencia, fallbacks, errores, aciertos de cache) y llamadas por día.
+        """
+        since = datetime.utcnow() - timedelta(days=days)
+        filters = [AICallLog.created_at >= since]
+        if institution_id is not None:
+            filters.append(AICallLog.institution_id == institution_id)
+
+        rows = (
+            db.session.query(
+                AICallLog.call_site,
+                func.count(AICallLog.id),
+                func.coalesce(func.sum(AICallLog.prompt_tokens), 0),
+                func.coalesce(func.sum(AICallLog.completion_tokens), 0),
+                func.coalesce(func.sum(AICallLog.cost_usd), 0.0),
+                func.sum(case((AICallLog.fallback.is_(True), 1), else_=0)),
+                func.sum(case((AICallLog.error.isnot(None), 1), else_=0)),
+                func.sum(case((AICallLog.cache_hit.is_(True), 1), else_=0)),
+            )
+            .filter(*filters)
+            .group_by(AICallLog.call_site)
+            .order_by(func.count(AICallLog.id).desc())
+            .all()
+        )
+        features = []
+        for call_site, calls, prompt_tokens, completion_tokens, cost, fallbacks, errors, cache_hits in rows:
+            features.append(
+                {
+                    "call_site": call_site,
+                    "calls": calls,
+                    "prompt_tokens": int(prompt_tokens),
+                    "completion_tokens": int(completion_tokens),
+                    "cost_usd": round(float(cost), 4),
+                    "p50_ms": AITelemetry._latency_percentile(filters, call_site, calls, 0.50),
+                    "p95_ms": AITelemetry._latency_percentile(filters, call_site, calls, 0.95),
+                    "fallbacks": int(fallbacks or 0),
+                    "errors": int(errors or 0),
+                    "cache_hits": int(cache_hits or 0),
+                }
+            )
+
+        day = func.date(AICallLog.created_at)
+        daily: dict[str, dict[str, int]] = {}
+        for call_site, day_value, calls in (
+            db.session.query(AICallLog.call_site, day, func.count(AICallLog.id))
+            .filter(*filters)
+            .group_by(AICallLog.call_site, day)
+        ):
+            daily.setdefault(call_site, {})[str(day_value)] = calls
+
+        day_labels = [(since + timedelta(days=offset + 1)).date().isoformat() for offset in range(days)]
+        return {
+            "days": day_labels,
+            "features": features,
+            "daily": [
+                {
+                    "call_site": feature["call_site"],
+                    "counts": [daily.get(feature["call_site"], {}).get(label, 0) for label in day_labels],
+                }
+                for feature in features
+            ],
+        }
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _latency_percentile(filters: list, call_site: str, count: int, percentile: float) -> int | None:
+        if not count:
+            return None
+        # Percentil por posición (nearest-rank): portable entre SQLite y PostgreSQL.
+        offset = max(0, math.ceil(percentile * count) - 1)
+        return (
+            db.session.query(AICallLog.latency_ms)
+            .filter(*filters, AICallLog.call_site == call_site)
+            .order_by(AICallLog.latency_ms.asc())
+            .offset(offset)
+            .limit(1)
+            .scalar()
+        )
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from services.ai_client import AIClient
+from services.ai_providers import AIEndpoint, AIProviderHealth
+from services.ai_scheduler import AIScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAIClient(AIClient):
+    """
+    Versión asyncio de AIClient para los puntos que disparan muchas llamadas a la vez
+    (reportes en lote, sugerencias por área, fragmentos de planes).
+
+    Misma configuración (AI_* / overrides por institución), mismo compactado de contexto,
+    telemetría, planificador, cadena de endpoints con hedge y fallback heurístico que el
+    cliente sincrónico. Cada request HTTP usa el mismo transporte (urllib, con HTTPS_PROXY /
+    NO_PROXY y redirecciones) en el pool de hilos de proveedores: el event loop sólo orquesta
+    la concurrencia, el orden y los hedges del lote.
+
+    Desde vistas Flask (sincrónicas) se usa el puente generate_many(), que corre el lote en
+    un event loop propio y devuelve los resultados en orden.
+    """
+
+    DEFAULT_CONCURRENCY = 4
+
+    async def agenerate(self, prompt: str, context: dict, *, call_site: str | None = None) -> dict:
+        call = self._prepare(prompt, context, call_site)
+        started = time.perf_counter()
+        error = None
+        if self.uses_provider:
+            try:
+                async with AIScheduler.default().aslot(self.institution_id, AIScheduler.priority_for(call.site)):
+                    result = await self._achain_response(prompt, call.context_json)
+            except Exception as exc:  # pragma: no cover - sólo se usa cuando OpenAI falla
+                logger.warning("Fallo al invocar OpenAI, se usa fallback heurístico: %s", exc)
+                error = str(exc)
+            else:
+                return self._finish(call, result, started)
+        return self._finish_with_fallback(call, prompt, started, error)
+
+    async def agenerate_many(
+        self,
+        requests: Iterable[dict],
+        *,
+        concurrency: int | None = None,
+        on_result: Callable[[int, Any], None] | None = None,
+        cancel: threading.Event | None = None,
+    ) -> list[Any]:
+        """
+        requests: dicts con prompt, context y opcionalmente call_site.
+        Devuelve los resultados en el mismo orden; si una llamada lanza una excepción
+        inesperada, en su lugar queda la excepción (como gather(return_exceptions=True)).
+        on_result(índice, resultado) se invoca a medida que cada una termina.
+        cancel: una vez seteado, las llamadas que todavía no empezaron no se hacen (su
+        resultado es un RuntimeError); las que ya están en curso terminan igual.
+        """
+        requests = list(requests)
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.DEFAULT_CONCURRENCY))
+        results: list[Any] = [None] * len(requests)
+
+        async def run(index: int, request: dict) -> None:
+            async with semaphore:
+                try:
+                    if cancel is not None and cancel.is_set():
+                        raise RuntimeError("solicitud cancelada")
+                    result = await self.agenerate(
+                        request["prompt"],
+                        request.get("context") or {},
+                        call_site=request.get("call_site"),
+                    )
+                except Exception as exc:
+                    result = exc
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+
+        await asyncio.gather(*(run(index, request) for index, request in enumerate(requests)))
+        return results
+
+    def generate_many(
+        self,
+        requests: Iterable[dict],
+        *,
+        concurrency: int | None = None,
+        on_result: Callable[[int, Any], None] | None = None,
+        cancel: threading.Event | None = None,
+    ) -> list[Any]:
+        """Puente sincrónico de agenerate_many (vistas Flask, CLI, hilos de trabajos)."""
+        return AsyncAIClient.run_sync(
+            self.agenerate_many(requests, concurrency=concurrency, on_result=on_result, cancel=cancel)
+        )
+
+    @staticmethod
+    def run_sync(awaitable: Awaitable) -> Any:
+        """
+        Corre una corrutina hasta el final desde código sincrónico. Si el hilo ya tiene un
+        event loop corriendo, la corre en un hilo aparte para no anidar loops.
+        on_result se ejecuta en el hilo que corre el loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(awaitable)
+
+        outcome: dict[str, Any] = {}
+
+        def target() -> None:
+            try:
+                outcome["value"] = asyncio.run(awaitable)
+            except BaseException as exc:  # pragma: no cover - se relanza en el hilo llamador
+                outcome["error"] = exc
+
+        thread = threading.Thread(target=target, name="ai-async-bridge")
+        thread.start()
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    async def _achain_response(self, prompt: str, context_json: str) -> dict:
+        """Igual que AIClient._chain_response; las copias que pierden se cancelan."""
+        candidates = [(endpoint, AIProviderHealth.for_endpoint(endpoint)) for endpoint in self.endpoints]
+        if len(candidates) == 1:
+            endpoint, health = candidates[0]
+            if not health.allow():
+                raise RuntimeError(f"{endpoint.name}: circuito abierto")
+            return await self._atimed_response(endpoint, health, prompt, context_json)
+
+        errors: list[str] = []
+        pending: dict = {}
+        hedges: dict = {}
+
+        def launch(as_hedge: bool) -> AIProviderHealth | None:
+            while candidates:
+                endpoint, health = candidates.pop(0)
+                if not health.allow():
+                    errors.append(f"{endpoint.name}: circuito abierto")
+                    continue
+                task = asyncio.ensure_future(self._atimed_response(endpoint, health, prompt, context_json))
+                pending[task] = (endpoint, health)
+                if as_hedge:
+                    hedges[task] = health
+                return health
+            return None
+
+        current = launch(as_hedge=False)
+        winner = None
+        try:
+            while pending:
+                timeout = None
+                if self.hedge_enabled and candidates and current is not None:
+                    timeout = current.hedge_delay(self.hedge_delay, self.hedge_min_delay)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    current = launch(as_hedge=True) or current
+                    continue
+                for task in done:
+                    endpoint, _health = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        errors.append(f"{endpoint.name}: {exc}")
+                        continue
+                    winner = task
+                    result["hedged"] = bool(hedges)
+                    return result
+                if not pending:
+                    current = launch(as_hedge=False)
+        finally:
+            for task in pending:
+                task.cancel()
+            for task, health in hedges.items():
+                health.record_hedge(won=task is winner)
+        raise RuntimeError("; ".join(errors) or "No hay endpoints de IA disponibles.")
+
+    async def _atimed_response(
+        self, endpoint: AIEndpoint, health: AIProviderHealth, prompt: str, context_json: str
+    ) -> dict:
+        started = time.perf_counter()
+        try:
+            result = await self._aopenai_response(endpoint, prompt, context_json)
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            raise
+        except Exception as exc:
+            health.record_failure(str(exc))
+            raise
+        health.record_success(time.perf_counter() - started)
+        return result
+
+    async def _aopenai_response(self, endpoint: AIEndpoint, prompt: str, context_json: str) -> dict:
+        # El transporte es el del cliente sincrónico (urllib: proxies, redirecciones, TLS y
+        # timeout), corrido en el pool de proveedores; la concurrencia la acota el semáforo del lote.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            AIClient._executor(), self._openai_response, endpoint, prompt, context_json
+        )
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from itertools import chain
+from typing import Iterable
+
+from sqlalchemy import func, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensions import db
+from models import Attachment
+
+
+class AttachmentLoader:
+    """
+    Carga por lotes de adjuntos polimórficos (context_type, context_id).
+    Junta los ids de todos los padres de un resultado, trae sus adjuntos con un único
+    IN por tipo de contexto y los deja cargados en parent.attachments, de modo que los
+    serializers y templates que recorren .attachments no disparan una query por fila.
+    Las relaciones .attachments son lazy="select" (no todas las vistas las usan), así que toda
+    vista que las recorra en un listado tiene que llamar a preload; las de tareas, portal del
+    alumno y panel docente lo verifican en tests/test_attachment_loading.py.
+    """
+
+    # Nombre de la clase padre -> context_type con el que se guardan sus adjuntos.
+    CONTEXT_TYPES = {
+        "Task": "task",
+        "Lesson": "lesson",
+        "Message": "message",
+        "BitacoraEntrada": "bitacora",
+    }
+    # Tope de ids por IN (SQLite limita la cantidad de parámetros por sentencia).
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def counts(parents: Iterable) -> dict[int, int]:
+        """Cantidad de adjuntos por id de padre (un GROUP BY), sin cargar los adjuntos."""
+        ids_by_type: dict[str, list[int]] = {}
+        for parent in parents:
+            ids_by_type.setdefault(AttachmentLoader._context_type(parent), []).append(parent.id)
+
+        counts: dict[int, int] = {}
+        for context_type, parent_ids in ids_by_type.items():
+            for start in range(0, len(parent_ids), AttachmentLoader.BATCH_SIZE):
+                rows = (
+                    db.session.query(Attachment.context_id, func.count(Attachment.id))
+                    .filter(
+                        Attachment.context_type == context_type,
+                        Attachment.context_id.in_(parent_ids[start : start + AttachmentLoader.BATCH_SIZE]),
+                    )
+                    .group_by(Attachment.context_id)
+                    .all()
+                )
+                counts.update({context_id: total for context_id, total in rows})
+        return counts
+
+    @staticmethod
+    def preload(*collections: Iterable) -> None:
+        """
+        Acepta uno o más iterables de padres (pueden mezclar tipos). Los padres que ya tienen
+        .attachments cargado se respetan tal cual.
+        """
+        pending: dict[str, dict[int, list]] = {}
+        for parent in chain.from_iterable(collections):
+            if parent is None:
+                continue
+            context_type = AttachmentLoader._context_type(parent)
+            if "attachments" not in inspect(parent).unloaded:
+                continue
+            pending.setdefault(context_type, {}).setdefault(parent.id, []).append(parent)
+
+        for context_type, parents_by_id in pending.items():
+            grouped: dict[int, list[Attachment]] = {parent_id: [] for parent_id in parents_by_id}
+            parent_ids = list(parents_by_id)
+            for start in range(0, len(parent_ids), AttachmentLoader.BATCH_SIZE):
+                rows = (
+                    Attachment.query.filter(
+                        Attachment.context_type == context_type,
+                        Attachment.context_id.in_(parent_ids[start : start + AttachmentLoader.BATCH_SIZE]),
+                    )
+                    .order_by(Attachment.id.asc())
+                    .all()
+                )
+                for attachment in rows:
+                    grouped[attachment.context_id].append(attachment)
+
+            for parent_id, parents in parents_by_id.items():
+                for parent in parents:
+                    set_committed_value(parent, "attachments", grouped[parent_id])
+
+    @staticmethod
+    def _context_type(parent) -> str:
+        context_type = AttachmentLoader.CONTEXT_TYPES.get(type(parent).__name__)
+        if context_type is None:
+            raise TypeError(f"{type(parent).__name__} no tiene adjuntos polimórficos")
+        return context_type
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import hashlib
 import json
+from datetime import date, datetime, timedelta
 from typing import Any, Iterable
 
 from flask import current_app
 from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from models import Objective, Lesson, Task, PlanItem, Institution
+from extensions import db
+from models import AuthoringBrief, Objective, Lesson, Task, PlanItem, Institution, Section
 from services.ai_client import AIClient
+from services.ai_telemetry import AITelemetry
+from services.async_ai_client import AsyncAIClient
 from services.curriculum_service import CurriculumService
 
 
@@ -15,6 +22,9 @@ class AuthoringService:
     """
     Generador centralizado de textos para clases y tareas utilizando IA (o heurísticas).
     Devuelve siempre estructuras simples para integrar directamente en la UI.
+
+    Las respuestas de la IA se guardan en AuthoringBrief por la huella de sus entradas; las de
+    las clases próximas se generan de antemano con pregenerate_briefs (`flask pregenerate-briefs`).
     """
 
     LESSON_PROMPT = """
@@ -48,34 +58,22 @@ que el profesor podrá ofrecer. Devuelve únicamente JSON:
         objective: Objective | None = None,
         section_label: str | None = None,
         title: str | None = None,
+        use_cache: bool = True,
     ) -> dict[str, Any]:
         institution = cls._resolve_institution(objective, lesson)
-        plan_context = cls._plan_context(objective)
-        grade_label = objective.grade.name if objective and objective.grade else None
-        subject = cls._subject_name(objective)
-
-        payload = {
-            "title": title or getattr(lesson, "title", None),
-            "grade": grade_label or section_label,
-            "section": section_label,
-            "subject": subject,
-            "objective_title": getattr(objective, "title", None),
-            "objective_description": getattr(objective, "description", None),
-            "plan_snippets": plan_context,
-        }
-
+        payload = cls._lesson_payload(lesson=lesson, objective=objective, section_label=section_label, title=title)
         client = cls._client_for_institution(institution)
+        fingerprint = cls._fingerprint(AuthoringBrief.KIND_LESSON, client, institution, payload)
+        if use_cache and fingerprint:
+            cached = cls._cached_brief(fingerprint, institution, "lesson_brief")
+            if cached is not None:
+                return cached
+
         result = client.generate(cls.LESSON_PROMPT, {"scope": "lesson_brief", **payload})
-        parsed = cls._safe_parse(result.get("text", ""))
-        if isinstance(parsed, dict):
-            return {
-                "description": parsed.get("description") or cls._lesson_fallback_description(payload),
-                "agenda": cls._normalize_list(parsed.get("agenda")),
-            }
-        return {
-            "description": cls._lesson_fallback_description(payload),
-            "agenda": cls._default_agenda(subject),
-        }
+        brief, from_ai = cls._lesson_brief_from(result, payload)
+        if from_ai and fingerprint:
+            cls._store_brief(AuthoringBrief.KIND_LESSON, fingerprint, institution, getattr(lesson, "id", None), brief)
+        return brief
 
     @classmethod
     def generate_task_brief(
@@ -85,50 +83,309 @@ que el profesor podrá ofrecer. Devuelve únicamente JSON:
         lesson: Lesson | None = None,
         objective: Objective | None = None,
         due_date: str | None = None,
+        use_cache: bool = True,
     ) -> dict[str, Any]:
         objective = objective or (lesson.objective if lesson else None)
         institution = cls._resolve_institution(objective, lesson, task)
-        plan_context = cls._plan_context(objective)
-        subject = cls._subject_name(objective)
-        lesson_title = getattr(lesson, "title", None) or getattr(task, "title", None)
+        payload = cls._task_payload(task=task, lesson=lesson, objective=objective)
+        client = cls._client_for_institution(institution)
+        fingerprint = cls._fingerprint(AuthoringBrief.KIND_TASK, client, institution, payload)
+        if use_cache and fingerprint:
+            cached = cls._cached_brief(fingerprint, institution, "task_brief")
+            if cached is not None:
+                return cached
+
+        result = client.generate(cls.TASK_PROMPT, {"scope": "task_brief", **payload})
+        # La fecha de entrega no va a la IA (no cambia consigna ni ayudas, y así la respuesta
+        # sirve para cualquier fecha); sólo se menciona en la descripción de respaldo.
+        brief, from_ai = cls._task_brief_from(result, {**payload, "due_date": due_date})
+        if from_ai and fingerprint:
+            cls._store_brief(AuthoringBrief.KIND_TASK, fingerprint, institution, getattr(lesson, "id", None), brief)
+        return brief
+
+    @classmethod
+    def pregenerate_briefs(
+        cls,
+        *,
+        days: int = 3,
+        institution_id: int | None = None,
+        concurrency: int = 4,
+    ) -> dict[str, int]:
+        """
+        Genera de antemano la descripción/agenda de cada clase de los próximos `days` días y la
+        consigna/ayudas de una tarea para esa clase, con las mismas entradas que arman
+        /api/lessons/ai/brief y /api/tasks/ai/brief, así esos pedidos salen de AuthoringBrief.
+        Las llamadas van en paralelo (AsyncAIClient) y con prioridad de segundo plano.
+        """
+        today = date.today()
+        query = (
+            Lesson.query.options(
+                joinedload(Lesson.objective),
+                joinedload(Lesson.section).joinedload(Section.grade),
+            )
+            .filter(Lesson.class_date >= today, Lesson.class_date <= today + timedelta(days=days))
+        )
+        if institution_id:
+            query = query.filter(Lesson.institution_id == institution_id)
+        lessons = query.order_by(Lesson.class_date.asc(), Lesson.id.asc()).all()
+
+        stats = {"lessons": len(lessons), "generated": 0, "cached": 0, "failed": 0, "skipped": 0}
+        clients: dict[int | None, AsyncAIClient] = {}
+        institutions: dict[int | None, Institution | None] = {}
+        plan_contexts: dict[int | None, list[str]] = {}
+        pending: dict[int | None, dict[str, tuple]] = {}
+
+        for lesson in lessons:
+            objective = lesson.objective
+            institution = cls._resolve_institution(objective, lesson)
+            key = institution.id if institution else None
+            if key not in clients:
+                clients[key] = cls._client_for_institution(institution, client_class=AsyncAIClient)
+                institutions[key] = institution
+            if not clients[key].uses_provider:
+                # Sin proveedor real el heurístico responde al instante: no hay nada que adelantar.
+                stats["skipped"] += 1
+                continue
+
+            objective_key = objective.id if objective else None
+            if objective_key not in plan_contexts:
+                plan_contexts[objective_key] = cls._plan_context(objective)
+            snippets = plan_contexts[objective_key]
+            requests = (
+                (
+                    AuthoringBrief.KIND_LESSON,
+                    cls._lesson_payload(
+                        lesson=lesson,
+                        objective=objective,
+                        section_label=cls.section_label(lesson.section),
+                        title=lesson.title,
+                        plan_snippets=snippets,
+                    ),
+                ),
+                (
+                    AuthoringBrief.KIND_TASK,
+                    cls._task_payload(task=None, lesson=lesson, objective=objective, plan_snippets=snippets),
+                ),
+            )
+            for kind, payload in requests:
+                fingerprint = cls._fingerprint(kind, clients[key], institution, payload)
+                pending.setdefault(key, {}).setdefault(fingerprint, (kind, lesson.id, payload))
+
+        for key, by_fingerprint in pending.items():
+            existing = {
+                row.fingerprint
+                for row in db.session.query(AuthoringBrief.fingerprint).filter(
+                    AuthoringBrief.fingerprint.in_(list(by_fingerprint))
+                )
+            }
+            stats["cached"] += len(existing)
+            todo = [(fingerprint, *item) for fingerprint, item in by_fingerprint.items() if fingerprint not in existing]
+            if not todo:
+                continue
+
+            results = clients[key].generate_many(
+                [
+                    {
+                        "prompt": cls.LESSON_PROMPT if kind == AuthoringBrief.KIND_LESSON else cls.TASK_PROMPT,
+                        "context": {"scope": f"{kind}_brief", **payload},
+                        "call_site": f"{kind}_brief_pregen",
+                    }
+                    for _, kind, _, payload in todo
+                ],
+                concurrency=concurrency,
+            )
+            for (fingerprint, kind, lesson_id, payload), result in zip(todo, results):
+                if isinstance(result, Exception):
+                    current_app.logger.warning("Pregeneración de %s (clase %s) falló: %s", kind, lesson_id, result)
+                    stats["failed"] += 1
+                    continue
+                if kind == AuthoringBrief.KIND_LESSON:
+                    brief, from_ai = cls._lesson_brief_from(result, payload)
+                else:
+                    brief, from_ai = cls._task_brief_from(result, payload)
+                if not from_ai:
+                    stats["failed"] += 1
+                    continue
+                cls._store_brief(
+                    kind,
+                    fingerprint,
+                    institutions[key],
+                    lesson_id,
+                    brief,
+                    source=AuthoringBrief.SOURCE_PREGENERATED,
+                )
+                stats["generated"] += 1
+        return stats
+
+    @staticmethod
+    def purge_briefs(older_than_days: int) -> int:
+        """Borra los borradores guardados hace más de `older_than_days` días."""
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        removed = AuthoringBrief.query.filter(AuthoringBrief.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    @staticmethod
+    def section_label(section: Section | None) -> str | None:
+        if not section:
+            return None
+        grade_name = section.grade.name if section.grade else None
+        return f"{grade_name or 'Grupo'} · {section.name}"
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @classmethod
+    def _lesson_payload(
+        cls,
+        *,
+        lesson: Lesson | None,
+        objective: Objective | None,
+        section_label: str | None,
+        title: str | None,
+        plan_snippets: list[str] | None = None,
+    ) -> dict[str, Any]:
+        grade_label = objective.grade.name if objective and objective.grade else None
+        return {
+            "title": title or getattr(lesson, "title", None),
+            "grade": grade_label or section_label,
+            "section": section_label,
+            "subject": cls._subject_name(objective),
+            "objective_title": getattr(objective, "title", None),
+            "objective_description": getattr(objective, "description", None),
+            "plan_snippets": cls._plan_context(objective) if plan_snippets is None else plan_snippets,
+        }
 
-        payload = {
+    @classmethod
+    def _task_payload(
+        cls,
+        *,
+        task: Task | None,
+        lesson: Lesson | None,
+        objective: Objective | None,
+        plan_snippets: list[str] | None = None,
+    ) -> dict[str, Any]:
+        return {
             "task_title": getattr(task, "title", None),
-            "lesson_title": lesson_title,
-            "subject": subject,
+            "lesson_title": getattr(lesson, "title", None) or getattr(task, "title", None),
+            "subject": cls._subject_name(objective),
             "grade": objective.grade.name if objective and objective.grade else None,
             "objective_title": getattr(objective, "title", None),
             "objective_description": getattr(objective, "description", None),
             "lesson_description": getattr(lesson, "description", None),
-            "due_date": due_date,
-            "plan_snippets": plan_context,
+            "plan_snippets": cls._plan_context(objective) if plan_snippets is None else plan_snippets,
         }
 
-        client = cls._client_for_institution(institution)
-        result = client.generate(cls.TASK_PROMPT, {"scope": "task_brief", **payload})
+    @classmethod
+    def _lesson_brief_from(cls, result: dict, payload: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+        """(borrador, si salió de una respuesta válida del proveedor)."""
+        parsed = cls._safe_parse(result.get("text", ""))
+        if isinstance(parsed, dict):
+            brief = {
+                "description": parsed.get("description") or cls._lesson_fallback_description(payload),
+                "agenda": cls._normalize_list(parsed.get("agenda")),
+            }
+            return brief, result.get("model") != "heuristic"
+        return {
+            "description": cls._lesson_fallback_description(payload),
+            "agenda": cls._default_agenda(payload.get("subject")),
+        }, False
+
+    @classmethod
+    def _task_brief_from(cls, result: dict, payload: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+        subject = payload.get("subject")
         parsed = cls._safe_parse(result.get("text", ""))
         if isinstance(parsed, dict):
-            helps = parsed.get("helps") or {}
-            return {
+            brief = {
                 "description": parsed.get("description") or cls._task_fallback_description(payload),
-                "helps": cls._normalize_helps(helps, subject),
+                "helps": cls._normalize_helps(parsed.get("helps") or {}, subject),
             }
+            return brief, result.get("model") != "heuristic"
         return {
             "description": cls._task_fallback_description(payload),
             "helps": cls._default_helps(subject),
-        }
+        }, False
 
-    # -----------------
-    # Helpers internos
-    # -----------------
+    @classmethod
+    def _fingerprint(
+        cls,
+        kind: str,
+        client: AIClient,
+        institution: Institution | None,
+        payload: dict[str, Any],
+    ) -> str | None:
+        """Huella de todo lo que define la respuesta; None si no hay proveedor real (no se cachea)."""
+        if not client.uses_provider:
+            return None
+        digest = hashlib.sha256()
+        parts = (
+            kind,
+            cls.LESSON_PROMPT if kind == AuthoringBrief.KIND_LESSON else cls.TASK_PROMPT,
+            client.model,
+            ",".join(f"{endpoint.name}:{endpoint.model}" for endpoint in client.endpoints),
+            str(institution.id if institution else ""),
+            json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str),
+        )
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @staticmethod
+    def _cached_brief(fingerprint: str, institution: Institution | None, call_site: str) -> dict[str, Any] | None:
+        row = AuthoringBrief.query.filter_by(fingerprint=fingerprint).first()
+        if row is None:
+            return None
+        AITelemetry.record(
+            call_site=call_site,
+            institution_id=institution.id if institution else None,
+            cache_hit=True,
+        )
+        return row.result
+
+    @staticmethod
+    def _store_brief(
+        kind: str,
+        fingerprint: str,
+        institution: Institution | None,
+        lesson_id: int | None,
+        brief: dict[str, Any],
+        *,
+        source: str = AuthoringBrief.SOURCE_ON_DEMAND,
+    ) -> None:
+        try:
+            row = AuthoringBrief.query.filter_by(fingerprint=fingerprint).first()
+            if row is None:
+                db.session.add(
+                    AuthoringBrief(
+                        institution_id=institution.id if institution else None,
+                        lesson_id=lesson_id,
+                        kind=kind,
+                        fingerprint=fingerprint,
+                        result=brief,
+                        source=source,
+                    )
+                )
+            else:
+                # Pedido con refresh: la versión nueva reemplaza a la guardada.
+                row.result = brief
+                row.source = source
+                row.created_at = datetime.utcnow()
+            db.session.commit()
+        except IntegrityError:
+            # Otro pedido (o la pregeneración) guardó la misma huella mientras tanto.
+            db.session.rollback()
 
     @staticmethod
-    def _client_for_institution(institution: Institution | None) -> AIClient:
+    def _client_for_institution(institution: Institution | None, client_class: type[AIClient] = AIClient) -> AIClient:
         if not institution:
-            return AIClient()
-        return AIClient(
+            return client_class()
+        return client_class(
             provider_override=institution.ai_provider,
             model_override=institution.ai_model,
+            provider_chain=institution.ai_provider_chain,
+            institution_id=institution.id,
         )
 
     @staticmethod
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from services.token_estimator import TokenEstimator
+
+
+class ContextCompactor:
+    """
+    Achica el contexto estructurado que se manda a la IA (y que se guarda como snapshot):
+    JSON sin indentación, sin campos vacíos, con topes por campo para las listas y textos
+    que más crecen y, si se indica un presupuesto de tokens, recortes progresivos de todo
+    el contexto hasta que entre.
+    """
+
+    TRUNCATION_MARK = "…"
+
+    # campo -> (máximo de elementos si es lista, máximo de caracteres por texto)
+    FIELD_BUDGETS: dict[str, tuple[int | None, int | None]] = {
+        "highlights": (6, 280),
+        "followups": (6, 280),
+        "actions": (6, 240),
+        "plan_snippets": (4, 500),
+        "segments": (8, 1200),
+        "help_seed": (None, 1200),
+        "description": (None, 2000),
+        "objective_description": (None, 1200),
+        "lesson_description": (None, 1200),
+    }
+
+    # (caracteres por texto, elementos por lista) que se prueban en orden cuando el
+    # contexto supera el presupuesto de tokens.
+    SHRINK_STEPS = ((2000, 12), (1000, 8), (500, 5), (250, 3), (120, 2))
+
+    @staticmethod
+    def compact(
+        context: dict | None,
+        *,
+        max_tokens: int | None = None,
+        estimator: TokenEstimator | None = None,
+    ) -> tuple[dict, str, bool]:
+        """
+        Devuelve (contexto compacto, JSON minificado, si hubo que recortar por presupuesto).
+        Los topes por campo se aplican siempre; max_tokens sólo si se indica.
+        """
+        compacted = ContextCompactor._prune(context or {}, None)
+        serialized = ContextCompactor.dumps(compacted)
+        if not max_tokens:
+            return compacted, serialized, False
+
+        estimator = estimator or TokenEstimator()
+        truncated = False
+        for max_chars, max_items in ContextCompactor.SHRINK_STEPS:
+            if estimator.count(serialized) <= max_tokens:
+                break
+            compacted = ContextCompactor._shrink(compacted, max_chars, max_items)
+            serialized = ContextCompactor.dumps(compacted)
+            truncated = True
+        return compacted, serialized, truncated
+
+    @staticmethod
+    def dumps(context: Any) -> str:
+        return json.dumps(context, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _prune(value: Any, field: str | None) -> Any:
+        max_items, max_chars = ContextCompactor.FIELD_BUDGETS.get(field, (None, None))
+        if isinstance(value, dict):
+            pruned = {}
+            for key, item in value.items():
+                item = ContextCompactor._prune(item, key)
+                if not ContextCompactor._is_empty(item):
+                    pruned[key] = item
+            return pruned
+        if isinstance(value, (list, tuple)):
+            items = [ContextCompactor._prune(item, field) for item in value]
+            items = [item for item in items if not ContextCompactor._is_empty(item)]
+            return items[:max_items] if max_items else items
+        if isinstance(value, str):
+            value = value.strip()
+            return ContextCompactor._truncate(value, max_chars) if max_chars else value
+        return value
+
+    @staticmethod
+    def _shrink(value: Any, max_chars: int, max_items: int) -> Any:
+        if isinstance(value, dict):
+            return {key: ContextCompactor._shrink(item, max_chars, max_items) for key, item in value.items()}
+        if isinstance(value, list):
+            return [ContextCompactor._shrink(item, max_chars, max_items) for item in value[:max_items]]
+        if isinstance(value, str):
+            return ContextCompactor._truncate(value, max_chars)
+        return value
+
+    @staticmethod
+    def _truncate(text: str, max_chars: int) -> str:
+        if len(text) <= max_chars:
+            return text
+        return text[: max_chars - 1].rstrip() + ContextCompactor.TRUNCATION_MARK
+
+    @staticmethod
+    def _is_empty(value: Any) -> bool:
+        return value is None or value == "" or value == [] or value == {}
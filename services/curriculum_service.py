@@ -10,6 +10,7 @@ from pathlib import Path
 from typing import Sequence
 
 from flask import current_app
+from sqlalchemy import insert
 
 from extensions import db
 from models import (
@@ -31,6 +32,7 @@ except ImportError:  # pragma: no cover - fallback only when dependency missing
 
 class CurriculumService:
     PROMPT_CONTEXT = "curriculum_parser"
+    BULK_BATCH_SIZE = 1000
     DEFAULT_PROMPT = (
         "Analiza el documento curricular sin asumir un formato fijo. Detecta grados/cursos, materias/áreas "
         "y objetivos de aprendizaje (competencias, propósitos o resultados esperados) usando títulos y secciones "
@@ -137,17 +139,7 @@ class CurriculumService:
 
         try:
             segments = CurriculumService._segment_text(raw_text, profile.institution_id)
-            for payload in segments:
-                segment = CurriculumSegment(
-                    document_id=document.id,
-                    grade_label=payload.grade_label,
-                    area=payload.area,
-                    section_title=payload.section_title,
-                    content_text=payload.content_text,
-                    start_line=payload.start_line,
-                    end_line=payload.end_line,
-                )
-                db.session.add(segment)
+            CurriculumService._bulk_insert_segments(document.id, segments)
             document.segment_count = len(segments)
             document.status = "ready"
         except Exception as exc:
@@ -203,17 +195,7 @@ class CurriculumService:
 
         try:
             segments = CurriculumService._segment_text(text, profile.institution_id)
-            for payload in segments:
-                segment = CurriculumSegment(
-                    document_id=document.id,
-                    grade_label=payload.grade_label,
-                    area=payload.area,
-                    section_title=payload.section_title,
-                    content_text=payload.content_text,
-                    start_line=payload.start_line,
-                    end_line=payload.end_line,
-                )
-                db.session.add(segment)
+            CurriculumService._bulk_insert_segments(document.id, segments)
             document.segment_count = len(segments)
             document.status = "ready"
         except Exception as exc:
@@ -223,10 +205,32 @@ class CurriculumService:
 
         db.session.commit()
         return document
+
+    @staticmethod
+    def _bulk_insert_segments(document_id: int, segments: Sequence["SegmentRecord"]) -> None:
+        rows = [
+            {
+                "document_id": document_id,
+                "grade_label": payload.grade_label,
+                "area": payload.area,
+                "section_title": payload.section_title,
+                "content_text": payload.content_text,
+                "start_line": payload.start_line,
+                "end_line": payload.end_line,
+            }
+            for payload in segments
+        ]
+        batch_size = CurriculumService.BULK_BATCH_SIZE
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(CurriculumSegment), rows[start : start + batch_size])
+
     @staticmethod
     def delete_document(document):
         if not document:
             return
+        # Los segmentos se borran en una sola sentencia en lugar de cargarlos para la cascada ORM.
+        CurriculumSegment.query.filter_by(document_id=document.id).delete(synchronize_session=False)
+        db.session.expire(document, ["segments"])
         db.session.delete(document)
         db.session.flush()
 
@@ -334,8 +338,8 @@ class CurriculumService:
             "Incluye un párrafo que describa los ejes prioritarios y otra nota con sugerencias."
         )
         context = {"segments": summarized_segments}
-        client = AIClient()
-        ai_result = client.generate(prompt=prompt, context=context)
+        client = AIClient(institution_id=plan.institution_id)
+        ai_result = client.generate(prompt=prompt, context=context, call_site="curriculum_summary")
 
         objectives = []
         if include_objectives:
@@ -588,6 +592,8 @@ class CurriculumService:
         client = AIClient(
             provider_override=institution.ai_provider if institution else None,
             model_override=institution.ai_model if institution else None,
+            provider_chain=institution.ai_provider_chain if institution else None,
+            institution_id=document.institution_id,
         )
         prompt = CurriculumService._prompt_text(CurriculumService.PROMPT_CONTEXT, document.institution_id)
         context = {
@@ -597,7 +603,7 @@ class CurriculumService:
         }
 
         try:
-            ai_result = client.generate(prompt=prompt, context=context)
+            ai_result = client.generate(prompt=prompt, context=context, call_site="curriculum_structure")
         except Exception as exc:
             current_app.logger.warning("AI curriculum parsing failed: %s", exc)
             return []
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import mimetypes
+from pathlib import Path
+
+from flask import abort, current_app, request
+from sqlalchemy import exists, or_
+from werkzeug.utils import send_file
+
+from extensions import db
+from models import (
+    Attachment,
+    BitacoraEntrada,
+    Institution,
+    Lesson,
+    Message,
+    MessageThreadParticipant,
+    PlatformTheme,
+    Profile,
+    RoleEnum,
+    StoredBlob,
+    Task,
+    TaskSubmission,
+)
+from services.image_derivative_service import ImageDerivativeService
+
+
+class FileDeliveryService:
+    """
+    Entrega de archivos subidos (logos y adjuntos). Los permisos se validan siempre en Python;
+    la transferencia de bytes la hace werkzeug (con ETag y Range) o, según FILE_DELIVERY_MODE,
+    el proxy frontal vía X-Accel-Redirect (nginx) o X-Sendfile (Apache/lighttpd).
+    """
+
+    MODE_APP = "app"
+    MODE_X_ACCEL = "x-accel"
+    MODE_X_SENDFILE = "x-sendfile"
+
+    IMMUTABLE_MAX_AGE = 31536000
+    MUTABLE_MAX_AGE = 300
+
+    # Regla de visibilidad del registro padre según Attachment.context_type.
+    PARENT_RULES = {
+        "task": "_can_see_task",
+        "lesson": "_can_see_lesson",
+        "bitacora": "_can_see_bitacora",
+        "message": "_can_see_message",
+        "submission": "_can_see_submission",
+    }
+
+    @staticmethod
+    def mode() -> str:
+        mode = (current_app.config.get("FILE_DELIVERY_MODE") or FileDeliveryService.MODE_APP).lower()
+        if mode not in {
+            FileDeliveryService.MODE_APP,
+            FileDeliveryService.MODE_X_ACCEL,
+            FileDeliveryService.MODE_X_SENDFILE,
+        }:
+            return FileDeliveryService.MODE_APP
+        return mode
+
+    @staticmethod
+    def serve(
+        root: Path,
+        relative_path: str,
+        *,
+        url: str,
+        internal_prefix: str,
+        public: bool = False,
+    ):
+        """
+        Responde con el archivo root/relative_path publicado en url.
+        - Blobs deduplicados: ETag = sha256 del contenido y Cache-Control immutable.
+        - Archivos previos a la deduplicación: ETag por mtime/tamaño y caché corta.
+        - ?size=icon|thumb|web entrega la variante redimensionada del blob si ya existe.
+        internal_prefix es la location interna del proxy (X-Accel-Redirect) que mapea a root.
+        """
+        root = Path(root).resolve()
+        path = (root / relative_path).resolve()
+        if root not in path.parents or not path.is_file():
+            abort(404)
+
+        blob = StoredBlob.query.filter_by(url=url).first()
+        etag = blob.content_hash if blob else None
+
+        # ?size=<variante>: si la variante ya fue generada se entrega en lugar del original.
+        variant = request.args.get("size")
+        if blob and variant in ImageDerivativeService.VARIANTS:
+            variant_path = path.with_name(ImageDerivativeService.derivative_key(path.name, variant))
+            if variant_path.is_file():
+                path = variant_path
+                etag = f"{blob.content_hash}-{variant}"
+        mime_type = blob.mime_type if blob and blob.mime_type else None
+        immutable = blob is not None
+
+        mode = FileDeliveryService.mode()
+        if mode == FileDeliveryService.MODE_X_ACCEL:
+            response = FileDeliveryService._x_accel_response(
+                path,
+                internal_uri=f"{internal_prefix.rstrip('/')}/{path.relative_to(root).as_posix()}",
+                etag=etag,
+                mime_type=mime_type,
+            )
+        else:
+            response = send_file(
+                path,
+                request.environ,
+                mimetype=mime_type,
+                conditional=True,
+                etag=etag if etag else True,
+                max_age=None,
+                use_x_sendfile=mode == FileDeliveryService.MODE_X_SENDFILE,
+                response_class=current_app.response_class,
+            )
+
+        return FileDeliveryService._apply_cache_headers(response, public=public, immutable=immutable)
+
+    @staticmethod
+    def can_access(url: str, profile: Profile | None, *, public: bool | None = None) -> bool:
+        """
+        Logos de institución/plataforma son públicos (se muestran antes del login).
+        Un adjunto hereda la visibilidad de su registro padre (tarea, clase, mensaje, bitácora,
+        entrega); como los blobs se deduplican, una URL puede colgar de varios adjuntos y basta
+        con que alguno sea visible. El ADMIN de plataforma ve todo. public evita repetir
+        is_public si el llamador ya lo resolvió.
+        """
+        if public is None:
+            public = FileDeliveryService.is_public(url)
+        if public:
+            return True
+        if profile is None:
+            return False
+        if profile.role == RoleEnum.ADMIN:
+            return True
+
+        attachments = (
+            db.session.query(Attachment.context_type, Attachment.context_id, Attachment.uploaded_by_profile_id)
+            .filter(Attachment.storage_path == url)
+            .all()
+        )
+        return any(
+            FileDeliveryService._can_see_attachment(context_type, context_id, uploader_id, profile)
+            for context_type, context_id, uploader_id in attachments
+        )
+
+    @staticmethod
+    def _can_see_attachment(context_type: str, context_id: int, uploader_id: int | None, profile: Profile) -> bool:
+        if uploader_id is not None and uploader_id == profile.id:
+            return True
+        rule = FileDeliveryService.PARENT_RULES.get(context_type)
+        if rule is not None:
+            return getattr(FileDeliveryService, rule)(context_id, profile)
+        # Contextos sin registro padre conocido: misma institución de quien lo subió.
+        if uploader_id is None:
+            # Adjuntos sin autor registrado (datos previos): basta con estar autenticado.
+            return True
+        return (
+            db.session.query(Profile.id)
+            .filter(Profile.id == uploader_id, Profile.institution_id == profile.institution_id)
+            .first()
+            is not None
+        )
+
+    @staticmethod
+    def _is_student(profile: Profile) -> bool:
+        return profile.role == RoleEnum.ALUMNO
+
+    @staticmethod
+    def _is_parent(profile: Profile) -> bool:
+        return profile.role == RoleEnum.PADRE
+
+    @staticmethod
+    def _can_see_task(task_id: int, profile: Profile) -> bool:
+        task = db.session.get(Task, task_id)
+        return task is not None and task.institution_id == profile.institution_id
+
+    @staticmethod
+    def _can_see_lesson(lesson_id: int, profile: Profile) -> bool:
+        lesson = db.session.get(Lesson, lesson_id)
+        return lesson is not None and lesson.institution_id == profile.institution_id
+
+    @staticmethod
+    def _can_see_bitacora(entry_id: int, profile: Profile) -> bool:
+        # Misma regla que GET /api/bitacora/<alumno>: el alumno sólo ve sus entradas marcadas
+        # visible_para_alumno, el padre las visible_para_padres y el staff todas las de su institución.
+        entry = db.session.get(BitacoraEntrada, entry_id)
+        if entry is None or entry.institution_id != profile.institution_id:
+            return False
+        if FileDeliveryService._is_student(profile):
+            return entry.student_profile_id == profile.id and bool(entry.visible_para_alumno)
+        if FileDeliveryService._is_parent(profile):
+            return bool(entry.visible_para_padres)
+        return True
+
+    @staticmethod
+    def _can_see_message(message_id: int, profile: Profile) -> bool:
+        # Sólo los participantes del thread, y según la visibilidad por rol del mensaje
+        # (la misma que aplica MessageService.list_thread_messages).
+        message = db.session.get(Message, message_id)
+        if message is None:
+            return False
+        is_participant = (
+            db.session.query(MessageThreadParticipant.id)
+            .filter_by(thread_id=message.thread_id, profile_id=profile.id)
+            .first()
+            is not None
+        )
+        if not is_participant:
+            return False
+        if FileDeliveryService._is_student(profile):
+            return bool(message.visible_for_student)
+        if FileDeliveryService._is_parent(profile):
+            return bool(message.visible_for_parent)
+        return bool(message.visible_for_teacher)
+
+    @staticmethod
+    def _can_see_submission(submission_id: int, profile: Profile) -> bool:
+        # La entrega la ven el alumno que la hizo y el staff de la institución de la tarea.
+        submission = db.session.get(TaskSubmission, submission_id)
+        if submission is None:
+            return False
+        if FileDeliveryService._is_student(profile) or FileDeliveryService._is_parent(profile):
+            return submission.student_profile_id == profile.id
+        return FileDeliveryService._can_see_task(submission.task_id, profile)
+
+    @staticmethod
+    def is_public(url: str) -> bool:
+        # Una sola ida a la base para ambos orígenes de logos.
+        return bool(
+            db.session.query(
+                or_(
+                    exists().where(Institution.logo_url == url),
+                    exists().where(PlatformTheme.logo_url == url),
+                )
+            ).scalar()
+        )
+
+    @staticmethod
+    def _x_accel_response(path: Path, *, internal_uri: str, etag: str | None, mime_type: str | None):
+        # El proxy resuelve Range y envía los bytes; nosotros sólo contestamos 304 si corresponde.
+        mime_type = mime_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        response = current_app.response_class(mimetype=mime_type)
+        if etag:
+            response.set_etag(etag)
+        else:
+            stat = path.stat()
+            response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+            response.last_modified = stat.st_mtime
+        response.headers["X-Accel-Redirect"] = internal_uri
+        return response.make_conditional(request.environ)
+
+    @staticmethod
+    def _apply_cache_headers(response, *, public: bool, immutable: bool):
+        # send_file marca no-cache cuando no recibe max_age; acá fijamos la política explícita.
+        response.cache_control.no_cache = None
+        if public:
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+        if immutable:
+            response.cache_control.max_age = FileDeliveryService.IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = FileDeliveryService.MUTABLE_MAX_AGE
+        return response
+
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from markupsafe import Markup
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - fallback only when dependency missing
+    redis = None
+
+
+class MemoryFragmentBackend:
+    """
+    LRU en memoria del proceso: fragmentos renderizados (con vencimiento) + contadores de versión.
+    Sólo sirve con un único proceso worker: bump() no llega a los demás procesos.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, scope: str) -> int:
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def bump(self, scope: str) -> None:
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+
+class RedisFragmentBackend:
+    """Backend compartido entre workers (redis); las versiones son contadores INCR."""
+
+    def __init__(self, client, prefix: str = "estudia:frag:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> str | None:
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(self.prefix + key, value.encode("utf-8"), ex=ttl)
+
+    def version(self, scope: str) -> int:
+        value = self.client.get(f"{self.prefix}version:{scope}")
+        return int(value) if value is not None else 0
+
+    def bump(self, scope: str) -> None:
+        self.client.incr(f"{self.prefix}version:{scope}")
+
+
+class FragmentCache:
+    """
+    Cache de fragmentos de templates Jinja.
+    Cada fragmento se guarda por nombre + perfil + versión de datos de la institución.
+    La versión la sube la propia capa de servicios: al confirmar una transacción que escribió
+    algo de lo que leen los fragmentos (clases, tareas, entregas, mensajes, perfiles, secciones,
+    grados, bitácora o adjuntos) se incrementa la de esa institución, así que el siguiente
+    render vuelve a generar el bloque.
+
+    En templates:
+        {% call cache_fragment("recipient_options", current_profile) %} ... {% endcall %}
+    """
+
+    EXTENSION_KEY = "fragment_cache"
+    DEFAULT_TTL = 3600
+    # Modelos cuyas escrituras invalidan los fragmentos de su institución. Profile cubre
+    # también la pertenencia a una sección (Profile.section_id).
+    WATCHED_MODELS = {
+        "Lesson",
+        "Task",
+        "TaskSubmission",
+        "SubmissionEvidence",
+        "Message",
+        "MessageThreadParticipant",
+        "Profile",
+        "Grade",
+        "Section",
+        "BitacoraEntrada",
+        "Attachment",
+    }
+
+    _stats: dict[str, dict[str, int]] = {}
+    _stats_lock = threading.Lock()
+    _listeners_installed = False
+
+    @staticmethod
+    def init_app(app) -> None:
+        backend = None
+        redis_url = app.config.get("FRAGMENT_CACHE_REDIS_URL")
+        if redis_url and redis is not None:
+            backend = RedisFragmentBackend(redis.Redis.from_url(redis_url))
+        elif redis_url:
+            app.logger.warning("FRAGMENT_CACHE_REDIS_URL configurado pero redis no está instalado; usamos memoria.")
+        if backend is None and int(app.config.get("WEB_CONCURRENCY") or 1) > 1:
+            # Cada proceso tendría sus propias versiones: las escrituras atendidas por un worker
+            # no invalidarían lo cacheado en los otros. Sin backend compartido, sin cache.
+            app.logger.warning(
+                "Cache de fragmentos desactivado: WEB_CONCURRENCY > 1 requiere FRAGMENT_CACHE_REDIS_URL."
+            )
+        elif backend is None:
+            backend = MemoryFragmentBackend(int(app.config.get("FRAGMENT_CACHE_SIZE") or 512))
+        app.extensions[FragmentCache.EXTENSION_KEY] = backend
+        app.add_template_global(FragmentCache.render, "cache_fragment")
+
+        if not FragmentCache._listeners_installed:
+            event.listen(Session, "after_flush", FragmentCache._collect_dirty_scopes)
+            event.listen(Session, "after_commit", FragmentCache._bump_dirty_scopes)
+            event.listen(Session, "after_rollback", FragmentCache._discard_dirty_scopes)
+            FragmentCache._listeners_installed = True
+
+    @staticmethod
+    def render(name: str, profile=None, *extra, caller=None, ttl: int | None = None) -> Markup:
+        """Devuelve el fragmento cacheado o lo renderiza (caller) y lo guarda."""
+        backend = FragmentCache._backend()
+        if backend is None or not current_app.config.get("FRAGMENT_CACHE_ENABLED", True):
+            return Markup(caller())
+
+        institution_id = getattr(profile, "institution_id", None)
+        version = backend.version(FragmentCache._scope(institution_id))
+        key_source = "|".join(
+            [name, str(getattr(profile, "id", "")), str(version), *(str(part) for part in extra)]
+        )
+        key = f"{name}:{hashlib.sha1(key_source.encode('utf-8')).hexdigest()}"
+
+        cached = backend.get(key)
+        if cached is not None:
+            FragmentCache._record(name, hit=True)
+            return Markup(cached)
+
+        FragmentCache._record(name, hit=False)
+        html = str(caller())
+        backend.set(key, html, ttl or FragmentCache.DEFAULT_TTL)
+        return Markup(html)
+
+    @staticmethod
+    def bump(institution_id: int | None) -> None:
+        backend = FragmentCache._backend()
+        if backend is not None:
+            backend.bump(FragmentCache._scope(institution_id))
+
+    @staticmethod
+    def stats() -> dict[str, dict]:
+        with FragmentCache._stats_lock:
+            snapshot = {name: dict(counts) for name, counts in FragmentCache._stats.items()}
+        for counts in snapshot.values():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / total, 3) if total else None
+        return snapshot
+
+    @staticmethod
+    def lazy(loader):
+        """Difiere una consulta hasta que el template la usa (si el fragmento está en cache, nunca)."""
+        return LazyValue(loader)
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _backend():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get(FragmentCache.EXTENSION_KEY)
+
+    @staticmethod
+    def _scope(institution_id) -> str:
+        return f"institution:{institution_id or 'none'}"
+
+    @staticmethod
+    def _record(name: str, *, hit: bool) -> None:
+        with FragmentCache._stats_lock:
+            counts = FragmentCache._stats.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    @staticmethod
+    def _collect_dirty_scopes(session, flush_context) -> None:
+        dirty = session.info.setdefault("fragment_cache_scopes", set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if type(obj).__name__ in FragmentCache.WATCHED_MODELS:
+                dirty.add(FragmentCache._institution_for(session, obj))
+
+    @staticmethod
+    def _bump_dirty_scopes(session) -> None:
+        # after_commit también se dispara al liberar un savepoint: se sube la versión recién
+        # cuando confirma la transacción de afuera.
+        if session.in_nested_transaction():
+            return
+        scopes = session.info.pop("fragment_cache_scopes", None)
+        for institution_id in scopes or ():
+            FragmentCache.bump(institution_id)
+
+    @staticmethod
+    def _discard_dirty_scopes(session) -> None:
+        # Deshacer un savepoint no deshace lo que la transacción de afuera ya escribió.
+        if session.in_nested_transaction():
+            return
+        session.info.pop("fragment_cache_scopes", None)
+
+    @staticmethod
+    def _institution_for(session, obj):
+        from models import Grade, Profile, Task, TaskSubmission
+
+        institution_id = getattr(obj, "institution_id", None)
+        if institution_id is not None:
+            return institution_id
+
+        # Entregas, evidencias, mensajes, secciones y adjuntos no guardan la institución:
+        # la resolvemos por su padre (o por quien subió el adjunto).
+        connection = session.connection()
+        if getattr(obj, "grade_id", None) is not None:
+            return connection.execute(select(Grade.institution_id).where(Grade.id == obj.grade_id)).scalar()
+        if getattr(obj, "task_id", None) is not None:
+            return connection.execute(select(Task.institution_id).where(Task.id == obj.task_id)).scalar()
+        if getattr(obj, "submission_id", None) is not None:
+            return connection.execute(
+                select(Task.institution_id)
+                .join(TaskSubmission, TaskSubmission.task_id == Task.id)
+                .where(TaskSubmission.id == obj.submission_id)
+            ).scalar()
+        profile_id = (
+            getattr(obj, "sender_profile_id", None)
+            or getattr(obj, "profile_id", None)
+            or getattr(obj, "uploaded_by_profile_id", None)
+        )
+        if profile_id is not None:
+            return connection.execute(
+                select(Profile.institution_id).where(Profile.id == profile_id)
+            ).scalar()
+        return None
+
+
+class LazyValue:
+    """Lista que se consulta recién al iterarla o evaluarla en un {% if %}."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+
+    def _resolve(self):
+        if not self._loaded:
+            self._value = list(self._loader() or [])
+            self._loaded = True
+        return self._value
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __len__(self):
+        return len(self._resolve())
+
+    def __bool__(self):
+        return bool(self._resolve())
+
+    def __getitem__(self, index):
+        return self._resolve()[index]
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from flask import current_app
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - fallback only when dependency missing
+    Image = None
+    ImageOps = None
+
+
+class ImageDerivativeService:
+    """
+    Variantes redimensionadas de imágenes subidas (adjuntos y logos).
+    Se generan en segundo plano al subir el original y se guardan junto a él en el mismo
+    backend, con clave <hash>@<variante><ext>. Quien sirve el archivo elige la variante
+    con ?size=<variante> y, si todavía no existe, entrega el original.
+    """
+
+    # Lado mayor (px) de cada variante.
+    VARIANTS = {
+        "icon": 128,
+        "thumb": 320,
+        "web": 1280,
+    }
+    DERIVABLE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+    JPEG_QUALITY = 82
+    WEBP_QUALITY = 80
+    # URLs servidas por la app (las únicas que entienden ?size=).
+    APP_SERVED_PREFIXES = ("/uploads/blobs/", "/uploads/s3/")
+
+    @staticmethod
+    def can_derive(mime_type: str | None) -> bool:
+        return Image is not None and (mime_type or "").lower() in ImageDerivativeService.DERIVABLE_MIME_TYPES
+
+    @staticmethod
+    def derivative_key(storage_key: str, variant: str) -> str:
+        base, ext = os.path.splitext(storage_key)
+        return f"{base}@{variant}{ext}"
+
+    @staticmethod
+    def variant_url(url: str | None, variant: str) -> str | None:
+        """URL de la variante pedida; URLs externas o previas a la deduplicación quedan igual."""
+        if not url or variant not in ImageDerivativeService.VARIANTS:
+            return url
+        if not url.startswith(ImageDerivativeService.APP_SERVED_PREFIXES) or "?" in url:
+            return url
+        return f"{url}?size={variant}"
+
+    @staticmethod
+    def schedule(backend, storage_key: str, mime_type: str | None) -> None:
+        """Encola la generación de variantes; el request de subida no espera el resultado."""
+        if not ImageDerivativeService.can_derive(mime_type):
+            return
+        app = current_app._get_current_object()
+        ImageDerivativeService._executor(app).submit(
+            ImageDerivativeService._generate_in_background,
+            app,
+            backend,
+            storage_key,
+            mime_type,
+        )
+
+    @staticmethod
+    def generate(backend, storage_key: str, mime_type: str | None) -> list[str]:
+        """
+        Genera las variantes más chicas que el original (nunca se agranda una imagen).
+        Devuelve las variantes escritas. Es idempotente: reescribir una variante da el mismo archivo.
+        """
+        if not ImageDerivativeService.can_derive(mime_type):
+            return []
+
+        staging_dir = Path(current_app.instance_path) / "uploads" / "tmp"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        image_format = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}[mime_type.lower()]
+
+        written = []
+        with backend.open(storage_key) as source, Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            for variant, max_side in sorted(ImageDerivativeService.VARIANTS.items(), key=lambda item: item[1]):
+                if max(image.size) <= max_side:
+                    break
+                resized = image.copy()
+                resized.thumbnail((max_side, max_side), Image.LANCZOS)
+                with tempfile.NamedTemporaryFile(dir=staging_dir, delete=False) as staging:
+                    staging_path = Path(staging.name)
+                    ImageDerivativeService._save(resized, staging, image_format)
+                try:
+                    backend.put(ImageDerivativeService.derivative_key(storage_key, variant), staging_path, mime_type)
+                finally:
+                    staging_path.unlink(missing_ok=True)
+                written.append(variant)
+        return written
+
+    @staticmethod
+    def delete(backend, storage_key: str) -> None:
+        for variant in ImageDerivativeService.VARIANTS:
+            backend.delete(ImageDerivativeService.derivative_key(storage_key, variant))
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _save(image, handle, image_format: str) -> None:
+        if image_format == "JPEG":
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(handle, "JPEG", quality=ImageDerivativeService.JPEG_QUALITY, optimize=True, progressive=True)
+        elif image_format == "WEBP":
+            image.save(handle, "WEBP", quality=ImageDerivativeService.WEBP_QUALITY, method=4)
+        else:
+            image.save(handle, "PNG", optimize=True)
+
+    @staticmethod
+    def _executor(app) -> ThreadPoolExecutor:
+        executor = app.extensions.get("image_derivative_executor")
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=int(app.config.get("IMAGE_DERIVATIVE_WORKERS") or 2),
+                thread_name_prefix="image-derivatives",
+            )
+            app.extensions["image_derivative_executor"] = executor
+        return executor
+
+    @staticmethod
+    def _generate_in_background(app, backend, storage_key: str, mime_type: str | None) -> None:
+        with app.app_context():
+            try:
+                ImageDerivativeService.generate(backend, storage_key, mime_type)
+            except Exception as exc:  # pragma: no cover - imágenes corruptas o backend caído
+                app.logger.warning("No se pudieron generar variantes de %s: %s", storage_key, exc)
+
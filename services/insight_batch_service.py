@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import func, insert
+
+from extensions import db
+from models import (
+    InsightReport,
+    InsightReportJob,
+    Lesson,
+    Profile,
+    ReportScope,
+    RoleEnum,
+    Section,
+    Task,
+    TaskSubmission,
+)
+from services.ai_insights_service import AIInsightsService
+from services.async_ai_client import AsyncAIClient
+from services.fragment_cache import FragmentCache
+from services.insights_service import InsightsService
+
+
+class InsightBatchService:
+    """
+    Reportes individuales (ReportScope.STUDENT) para todos los alumnos de una clase o sección
+    en un único trabajo en segundo plano:
+
+    1. Contextos de todos los alumnos con consultas compartidas (InsightsService.build_student_contexts).
+    2. Llamadas a la IA concurrentes (AsyncAIClient), acotadas por INSIGHT_BATCH_CONCURRENCY.
+    3. Inserción de los InsightReport por lotes, registrando avance y fallos en InsightReportJob.
+
+    Las llamadas corren en un event loop dentro del hilo del trabajo, que es el único que toca la base.
+
+    Los trabajos viven en un ThreadPoolExecutor del proceso web: la app tiene que correr con un
+    único worker (WEB_CONCURRENCY=1). Si el proceso se reinicia, los trabajos que tenía dejan de
+    latir y fail_stale_jobs los marca como fallidos pasado INSIGHT_BATCH_STALE_SECONDS.
+    """
+
+    EXTENSION_KEY = "insight_batch_executor"
+    LIVE_JOBS_KEY = "insight_batch_live_jobs"
+    # Reportes por INSERT (y por commit de avance).
+    INSERT_BATCH_SIZE = 25
+    # Segundos máximos entre commits de avance (cada commit renueva heartbeat_at).
+    HEARTBEAT_SECONDS = 30
+
+    @staticmethod
+    def init_app(app) -> None:
+        if int(app.config.get("WEB_CONCURRENCY") or 1) > 1:
+            # Otro worker no ve este executor: sus trabajos quedarían sin latido al reiniciarse.
+            app.logger.warning(
+                "Reportes en lote: corren en un hilo del proceso web y requieren WEB_CONCURRENCY=1."
+            )
+
+    @staticmethod
+    def start(
+        author: Profile,
+        *,
+        lesson_id: Optional[int] = None,
+        section_id: Optional[int] = None,
+        flavor: Optional[str] = None,
+        custom_prompt: Optional[str] = None,
+    ) -> InsightReportJob:
+        target_kind, target_id, target_label, students = InsightBatchService._resolve_target(
+            author, lesson_id=lesson_id, section_id=section_id
+        )
+        if not students:
+            raise ValueError("No hay alumnos para generar reportes en la clase o sección elegida.")
+
+        job = InsightReportJob(
+            institution_id=author.institution_id,
+            author_profile_id=author.id,
+            target_kind=target_kind,
+            target_id=target_id,
+            target_label=target_label,
+            flavor=flavor,
+            custom_prompt=custom_prompt or None,
+            status=InsightReportJob.STATUS_PENDING,
+            total=len(students),
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        InsightBatchService._live_jobs(app).add(job.id)
+        InsightBatchService._executor(app).submit(InsightBatchService._run_in_background, app, job.id)
+        return job
+
+    @staticmethod
+    def run(job_id: int) -> InsightReportJob:
+        """Ejecuta el trabajo en el hilo actual (lo usa el executor; útil también desde la CLI)."""
+        job = db.session.get(InsightReportJob, job_id)
+        if job is None or job.status != InsightReportJob.STATUS_PENDING:
+            return job
+
+        job.status = InsightReportJob.STATUS_RUNNING
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+        author = job.author
+        lesson_id = job.target_id if job.target_kind == "lesson" else None
+        _, _, _, students = InsightBatchService._resolve_target(
+            author,
+            lesson_id=lesson_id,
+            section_id=job.target_id if job.target_kind == "section" else None,
+        )
+        job.total = len(students)
+        contexts = InsightsService.build_student_contexts(author, students, lesson_id=lesson_id)
+
+        institution = author.institution
+        client = AsyncAIClient(
+            provider_override=institution.ai_provider if institution else None,
+            model_override=institution.ai_model if institution else None,
+            provider_chain=institution.ai_provider_chain if institution else None,
+            institution_id=job.institution_id,
+        )
+        prompts = {
+            student.id: AIInsightsService._prompt_for_scope(
+                scope=ReportScope.STUDENT,
+                target_label=student.full_name,
+                flavor=job.flavor,
+                custom_instructions=job.custom_prompt,
+            )
+            for student in students
+        }
+        names = {student.id: student.full_name for student in students}
+
+        student_ids = list(prompts)
+        failures: list[dict] = []
+        pending_rows: list[dict] = []
+
+        def collect(index: int, ai_result) -> None:
+            student_id = student_ids[index]
+            if isinstance(ai_result, Exception):
+                current_app.logger.warning("Reporte en lote %s: falló el alumno %s: %s", job.id, student_id, ai_result)
+                failures.append({"student_id": student_id, "student": names[student_id], "error": str(ai_result)})
+            else:
+                pending_rows.append(
+                    InsightBatchService._report_row(job, student_id, names[student_id], prompts[student_id], ai_result)
+                )
+            heartbeat_due = datetime.utcnow() - job.heartbeat_at >= timedelta(seconds=InsightBatchService.HEARTBEAT_SECONDS)
+            if len(pending_rows) >= InsightBatchService.INSERT_BATCH_SIZE or heartbeat_due:
+                InsightBatchService._flush(job, pending_rows, failures)
+                pending_rows.clear()
+
+        client.generate_many(
+            [
+                {"prompt": prompts[student_id], "context": contexts[student_id], "call_site": "insights_batch"}
+                for student_id in student_ids
+            ],
+            concurrency=int(current_app.config.get("INSIGHT_BATCH_CONCURRENCY") or 4),
+            on_result=collect,
+        )
+        InsightBatchService._flush(job, pending_rows, failures)
+        job.status = InsightReportJob.STATUS_DONE if job.completed or not job.total else InsightReportJob.STATUS_ERROR
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        # Los INSERT por lote no pasan por la unit of work: invalidamos los fragmentos a mano.
+        FragmentCache.bump(job.institution_id)
+        return job
+
+    @staticmethod
+    def fail_stale_jobs(institution_id: int) -> int:
+        """
+        Marca como fallidos los trabajos pendientes o en curso que no pertenecen a este proceso
+        y no latieron en INSIGHT_BATCH_STALE_SECONDS (el proceso que los corría ya no existe).
+        """
+        stale_seconds = int(current_app.config.get("INSIGHT_BATCH_STALE_SECONDS") or 900)
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+        last_seen = func.coalesce(InsightReportJob.heartbeat_at, InsightReportJob.started_at, InsightReportJob.created_at)
+        query = InsightReportJob.query.filter(
+            InsightReportJob.institution_id == institution_id,
+            InsightReportJob.status.in_((InsightReportJob.STATUS_PENDING, InsightReportJob.STATUS_RUNNING)),
+            last_seen < cutoff,
+        )
+        live = InsightBatchService._live_jobs(current_app._get_current_object())
+        if live:
+            query = query.filter(InsightReportJob.id.notin_(live))
+
+        stale = query.all()
+        for job in stale:
+            current_app.logger.warning("Reporte en lote %s: sin latido desde %s, se marca como fallido.", job.id, cutoff)
+            job.status = InsightReportJob.STATUS_ERROR
+            job.finished_at = datetime.utcnow()
+        if stale:
+            db.session.commit()
+        return len(stale)
+
+    @staticmethod
+    def recent_jobs(profile: Profile, limit: int = 5) -> list[InsightReportJob]:
+        InsightBatchService.fail_stale_jobs(profile.institution_id)
+        return (
+            InsightReportJob.query.filter_by(
+                institution_id=profile.institution_id,
+                author_profile_id=profile.id,
+            )
+            .order_by(InsightReportJob.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _resolve_target(
+        author: Profile,
+        *,
+        lesson_id: Optional[int],
+        section_id: Optional[int],
+    ) -> tuple[str, int, str, list[Profile]]:
+        students_query = Profile.query.filter_by(institution_id=author.institution_id, role=RoleEnum.ALUMNO)
+
+        if lesson_id:
+            lesson = db.session.get(Lesson, lesson_id)
+            if not lesson or lesson.institution_id != author.institution_id:
+                raise ValueError("La clase seleccionada no existe o no pertenece a tu institución.")
+            if author.role == RoleEnum.PROFESOR and lesson.teacher_profile_id != author.id:
+                raise ValueError("Sólo podés generar reportes en lote de tus propias clases.")
+            if lesson.section_id:
+                students_query = students_query.filter(Profile.section_id == lesson.section_id)
+            else:
+                # Clase sin sección: los alumnos que entregaron alguna de sus tareas.
+                submitted = (
+                    db.session.query(TaskSubmission.student_profile_id)
+                    .join(Task)
+                    .filter(Task.lesson_id == lesson.id)
+                )
+                students_query = students_query.filter(Profile.id.in_(submitted))
+            label = f"{lesson.title} ({lesson.class_date})"
+            kind, target_id = "lesson", lesson.id
+        elif section_id:
+            section = db.session.get(Section, section_id)
+            if not section or section.grade.institution_id != author.institution_id:
+                raise ValueError("La sección seleccionada no existe o no pertenece a tu institución.")
+            students_query = students_query.filter(Profile.section_id == section.id)
+            label = f"{section.grade.name} {section.name}"
+            kind, target_id = "section", section.id
+        else:
+            raise ValueError("Elegí una clase o una sección para el reporte en lote.")
+
+        return kind, target_id, label, students_query.order_by(Profile.full_name.asc()).all()
+
+    @staticmethod
+    def _report_row(job: InsightReportJob, student_id: int, student_name: str, prompt: str, ai_result: dict) -> dict:
+        now = datetime.utcnow()
+        return {
+            "institution_id": job.institution_id,
+            "author_profile_id": job.author_profile_id,
+            "scope": ReportScope.STUDENT,
+            "target_id": student_id,
+            "target_label": student_name,
+            "ai_model": ai_result.get("model"),
+            "prompt_snapshot": prompt,
+            "context_snapshot": ai_result.get("context_snapshot"),
+            "ai_draft": ai_result.get("text"),
+            "final_text": ai_result.get("text"),
+            "status": "draft",
+            "job_id": job.id,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    @staticmethod
+    def _flush(job: InsightReportJob, rows: list[dict], failures: list[dict]) -> None:
+        if rows:
+            db.session.execute(insert(InsightReport), rows)
+        job.completed += len(rows)
+        job.failed = len(failures)
+        job.failures = json.dumps(failures, ensure_ascii=False) if failures else None
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    @staticmethod
+    def _executor(app) -> ThreadPoolExecutor:
+        executor = app.extensions.get(InsightBatchService.EXTENSION_KEY)
+        if executor is None:
+            # Un trabajo a la vez: la concurrencia está dentro de cada trabajo (llamadas a la IA).
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="insight-batch")
+            app.extensions[InsightBatchService.EXTENSION_KEY] = executor
+        return executor
+
+    @staticmethod
+    def _live_jobs(app) -> set[int]:
+        """Ids de los trabajos encolados o en curso en el executor de este proceso."""
+        return app.extensions.setdefault(InsightBatchService.LIVE_JOBS_KEY, set())
+
+    @staticmethod
+    def _run_in_background(app, job_id: int) -> None:
+        with app.app_context():
+            try:
+                InsightBatchService.run(job_id)
+            except Exception as exc:  # pragma: no cover - base caída o error inesperado
+                app.logger.exception("Falló el reporte en lote %s: %s", job_id, exc)
+                db.session.rollback()
+                job = db.session.get(InsightReportJob, job_id)
+                if job is not None:
+                    job.status = InsightReportJob.STATUS_ERROR
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+            finally:
+                InsightBatchService._live_jobs(app).discard(job_id)
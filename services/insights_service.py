@@ -3,6 +3,9 @@ from __future__ import annotations
 from collections import Counter
 from datetime import datetime, timedelta
 
+from sqlalchemy.orm import contains_eager, joinedload
+
+from extensions import replica_reads
 from models import (
     Task,
     TaskSubmission,
@@ -19,11 +22,15 @@ class InsightsService:
     Genera métricas para dashboards y prepara los contextos que alimentan los reportes con IA.
     """
 
+    # Tope de ids por IN al armar contextos en lote.
+    BATCH_SIZE = 500
+
     # -------------------------
     # DASHBOARD METRICS
     # -------------------------
 
     @staticmethod
+    @replica_reads()
     def collect_for_profile(profile: Profile) -> dict:
         """
         Devuelve KPIs contextualizados según el rol:
@@ -158,6 +165,7 @@ class InsightsService:
     # -------------------------
 
     @staticmethod
+    @replica_reads()
     def build_report_context(profile: Profile, scope: ReportScope, target_id: int | None) -> tuple[dict, str | None]:
         tasks_query = Task.query.filter_by(institution_id=profile.institution_id)
         submissions_query = TaskSubmission.query.join(Task).filter(
@@ -198,16 +206,86 @@ class InsightsService:
                 )
             target_label = profile.institution.name if profile.institution else "Institución"
 
-        tasks = tasks_query.all()
-        submissions = submissions_query.all()
+        context = InsightsService._report_context(
+            scope,
+            target_id,
+            tasks_query.all(),
+            submissions_query.all(),
+            bitacora_query.all(),
+        )
+        return context, target_label
+
+    @staticmethod
+    @replica_reads()
+    def build_student_contexts(
+        profile: Profile,
+        students: list[Profile],
+        *,
+        lesson_id: int | None = None,
+    ) -> dict[int, dict]:
+        """
+        Contextos STUDENT (mismo formato que build_report_context) para muchos alumnos a la vez:
+        una query de entregas y una de bitácora para todo el grupo, en lugar de tres por alumno.
+        Con lesson_id, cada contexto se limita a las tareas y notas de esa clase.
+        """
+        student_ids = [student.id for student in students]
+        submissions_by_student: dict[int, list] = {student_id: [] for student_id in student_ids}
+        bitacora_by_student: dict[int, list] = {student_id: [] for student_id in student_ids}
+
+        for start in range(0, len(student_ids), InsightsService.BATCH_SIZE):
+            chunk = student_ids[start : start + InsightsService.BATCH_SIZE]
+            submissions_query = (
+                TaskSubmission.query.join(Task)
+                .filter(
+                    Task.institution_id == profile.institution_id,
+                    TaskSubmission.student_profile_id.in_(chunk),
+                )
+                .options(contains_eager(TaskSubmission.task))
+            )
+            bitacora_query = BitacoraEntrada.query.filter(
+                BitacoraEntrada.institution_id == profile.institution_id,
+                BitacoraEntrada.student_profile_id.in_(chunk),
+            ).options(
+                joinedload(BitacoraEntrada.author_profile),
+                joinedload(BitacoraEntrada.student_profile),
+            )
+            if lesson_id is not None:
+                submissions_query = submissions_query.filter(Task.lesson_id == lesson_id)
+                bitacora_query = bitacora_query.filter(BitacoraEntrada.lesson_id == lesson_id)
+
+            for submission in submissions_query.all():
+                submissions_by_student[submission.student_profile_id].append(submission)
+            for entry in bitacora_query.all():
+                bitacora_by_student[entry.student_profile_id].append(entry)
+
+        contexts = {}
+        for student_id in student_ids:
+            submissions = submissions_by_student[student_id]
+            # Igual que el reporte individual: las tareas son las que el alumno entregó.
+            tasks = list({submission.task_id: submission.task for submission in submissions}.values())
+            contexts[student_id] = InsightsService._report_context(
+                ReportScope.STUDENT,
+                student_id,
+                tasks,
+                submissions,
+                bitacora_by_student[student_id],
+            )
+        return contexts
+
+    # -------------------------
+    # HELPERS
+    # -------------------------
+
+    @staticmethod
+    def _report_context(scope: ReportScope, target_id, tasks, submissions, bitacora_entries) -> dict:
         approvals, approval_rate = InsightsService._approvals_stats(submissions)
         late_submissions = InsightsService._late_submissions(submissions)
         no_help_rate = InsightsService._no_help_rate(submissions)
 
         highlights = InsightsService._highlights(tasks, submissions, approvals, approval_rate, no_help_rate)
-        followups = InsightsService._psy_followups(bitacora_query.all())
+        followups = InsightsService._psy_followups(bitacora_entries)
 
-        context = {
+        return {
             "scope": scope.value,
             "target_id": target_id,
             "metrics": {
@@ -223,11 +301,6 @@ class InsightsService:
             "highlights": highlights,
             "followups": followups,
         }
-        return context, target_label
-
-    # -------------------------
-    # HELPERS
-    # -------------------------
 
     @staticmethod
     def _approvals_stats(submissions):
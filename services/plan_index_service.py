@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+
+from sqlalchemy import insert, or_
+
+from extensions import db
+from models import Plan, PlanItem, PlanSuggestionIndex
+
+
+class PlanIndexService:
+    """
+    Mantiene el índice precalculado grado → área → sugerencias de cada Plan.
+    El índice se reconstruye sólo en el camino de escritura (fin del parseo, borrado de
+    documentos, `flask rebuild-plan-indexes`); las APIs de /api/planes lo leen con una búsqueda
+    por (plan_id, grade_key). Mientras un plan no tenga índice (suggestion_index_etag = None)
+    los GET lo calculan en memoria desde los PlanItem, sin escribir.
+    """
+
+    # Clave en db.session.info con los índices calculados en memoria durante el request.
+    _FALLBACK_KEY = "plan_index_fallback"
+
+    @staticmethod
+    def grade_key(value: str | None) -> str | None:
+        key = (value or "").strip().lower()
+        return key[:64] or None
+
+    @staticmethod
+    def invalidate(plan: Plan) -> None:
+        plan.suggestion_index_etag = None
+        db.session.info.get(PlanIndexService._FALLBACK_KEY, {}).pop(plan.id, None)
+
+    @staticmethod
+    def current_etag(plan: Plan) -> str:
+        """Etag del índice vigente; sin índice guardado, el del índice calculado en memoria."""
+        if plan.suggestion_index_etag is not None:
+            return plan.suggestion_index_etag
+        return PlanIndexService._fallback(plan)[1]
+
+    @staticmethod
+    def rebuild(plan: Plan) -> str:
+        # Serializa las reconstrucciones del mismo plan (DELETE + INSERT sobre uq_plan_suggestion_index_grade).
+        db.session.query(Plan.id).filter(Plan.id == plan.id).with_for_update().scalar()
+        rows, etag = PlanIndexService._build(plan)
+
+        PlanSuggestionIndex.query.filter_by(plan_id=plan.id).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(insert(PlanSuggestionIndex), rows)
+
+        plan.suggestion_index_etag = etag
+        db.session.info.get(PlanIndexService._FALLBACK_KEY, {}).pop(plan.id, None)
+        db.session.flush()
+        return etag
+
+    @staticmethod
+    def grades(plan: Plan) -> list[str]:
+        if plan.suggestion_index_etag is None:
+            rows = [(row["grade_labels"],) for row in PlanIndexService._fallback(plan)[0]]
+        else:
+            rows = db.session.query(PlanSuggestionIndex.grade_labels).filter(
+                PlanSuggestionIndex.plan_id == plan.id
+            )
+        labels: set[str] = set()
+        for (grade_labels,) in rows:
+            labels.update(grade_labels or [])
+        return sorted(labels)
+
+    @staticmethod
+    def areas_for_grade(plan: Plan, grade_label: str | None, normalized: str | None) -> list[dict]:
+        """
+        Devuelve [{"area", "suggestions"}] para el grado, ordenado por área, combinando las
+        filas de la etiqueta normalizada y de la original.
+        """
+        keys = {PlanIndexService.grade_key(normalized), PlanIndexService.grade_key(grade_label)}
+        keys.discard(None)
+        if not keys:
+            return []
+        if plan.suggestion_index_etag is None:
+            areas_by_row = [
+                row["areas"] for row in PlanIndexService._fallback(plan)[0] if row["grade_key"] in keys
+            ]
+        else:
+            areas_by_row = [
+                areas
+                for (areas,) in db.session.query(PlanSuggestionIndex.areas).filter(
+                    PlanSuggestionIndex.plan_id == plan.id,
+                    PlanSuggestionIndex.grade_key.in_(keys),
+                )
+            ]
+        if len(areas_by_row) == 1:
+            return areas_by_row[0] or []
+
+        merged: dict[str, dict[int, dict]] = {}
+        for areas in areas_by_row:
+            for entry in areas or []:
+                bucket = merged.setdefault(entry["area"], {})
+                for suggestion in entry["suggestions"]:
+                    bucket.setdefault(suggestion["id"], suggestion)
+        return [
+            {"area": area_name, "suggestions": [bucket[item_id] for item_id in sorted(bucket)]}
+            for area_name, bucket in sorted(merged.items())
+        ]
+
+    @staticmethod
+    def serialize_suggestion(item: PlanItem) -> dict:
+        metadata = item.metadata_dict
+        class_ideas = metadata.get("class_ideas") if isinstance(metadata.get("class_ideas"), list) else []
+        title = (
+            metadata.get("title")
+            or metadata.get("titulo")
+            or metadata.get("name")
+            or metadata.get("nombre")
+            or f"{item.area} · Objetivo"
+        )
+        return {
+            "id": item.id,
+            "grado": item.grado,
+            "area": item.area,
+            "title": title,
+            "descripcion": item.descripcion,
+            "description": item.descripcion,
+            "class_ideas": class_ideas,
+            "period": metadata.get("period") or metadata.get("periodo"),
+            "metadata": metadata,
+        }
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _build(plan: Plan) -> tuple[list[dict], str]:
+        """Filas del índice (una por grade_key) y su etag, a partir de los PlanItem del plan."""
+        items = (
+            PlanItem.query.filter(
+                PlanItem.plan_id == plan.id,
+                or_(PlanItem.grado.isnot(None), PlanItem.grado_normalizado.isnot(None)),
+            )
+            .order_by(PlanItem.area.asc(), PlanItem.created_at.asc(), PlanItem.id.asc())
+            .all()
+        )
+
+        entries: dict[str, dict] = {}
+        for item in items:
+            # Un ítem se indexa por su grado normalizado y por su etiqueta original, igual que
+            # el filtro (grado_normalizado == X OR lower(grado) == lower(Y)) al que reemplaza.
+            keys = {
+                PlanIndexService.grade_key(item.grado_normalizado),
+                PlanIndexService.grade_key(item.grado),
+            }
+            keys.discard(None)
+            suggestion = PlanIndexService.serialize_suggestion(item)
+            for key in keys:
+                entry = entries.setdefault(key, {"labels": set(), "areas": {}})
+                if item.grado:
+                    entry["labels"].add(item.grado)
+                entry["areas"].setdefault(item.area, []).append(suggestion)
+
+        rows = [
+            {
+                "plan_id": plan.id,
+                "grade_key": key,
+                "grade_labels": sorted(entry["labels"]),
+                "areas": [
+                    {"area": area_name, "suggestions": suggestions}
+                    for area_name, suggestions in entry["areas"].items()
+                ],
+            }
+            for key, entry in sorted(entries.items())
+        ]
+        digest = hashlib.sha256(json.dumps(rows, sort_keys=True, default=str).encode("utf-8"))
+        return rows, digest.hexdigest()
+
+    @staticmethod
+    def _fallback(plan: Plan) -> tuple[list[dict], str]:
+        """Índice en memoria de un plan sin índice guardado, calculado una vez por request."""
+        cache = db.session.info.setdefault(PlanIndexService._FALLBACK_KEY, {})
+        if plan.id not in cache:
+            cache[plan.id] = PlanIndexService._build(plan)
+        return cache[plan.id]
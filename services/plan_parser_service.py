@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import re
 from typing import Iterator, Sequence
 
 from flask import current_app
+from sqlalchemy import bindparam, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
 from werkzeug.datastructures import FileStorage
 
 from extensions import db
-from models import Plan, PlanDocument, PlanItem, StudyPlan
+from models import Plan, PlanDocument, PlanFragment, PlanItem, PlanParseCheckpoint, StudyPlan
 from services.ai_client import AIClient
+from services.ai_telemetry import AITelemetry
+from services.token_estimator import TokenEstimator
 from services.curriculum_service import CurriculumService
+from services.plan_index_service import PlanIndexService
 
 try:
     from pypdf import PdfReader
@@ -23,10 +30,27 @@ class PlanParserService:
     - extraer texto desde archivos PDF o TXT
     - trocear el contenido y pedirle a un LLM que devuelva (grado, área, descripción)
     - persistir los PlanItem asociados
+
+    Cada fragmento se identifica por el hash de su texto y de LLM_INSTRUCTION_VERSION: las
+    respuestas del LLM quedan cacheadas en PlanFragment y, al re-procesar un plan editado,
+    sólo se consulta al modelo por los fragmentos que cambiaron. El avance de cada parseo
+    queda en PlanParseCheckpoint para poder retomarlo con resume().
     """
 
-    MAX_CHARS = 6000
-    OVERLAP = 400
+    # Margen de seguridad sobre el prompt fijo y el contexto estructurado que agrega AIClient.
+    PROMPT_MARGIN_TOKENS = 200
+    # La respuesta JSON ronda un cuarto del fragmento: acotamos la entrada para que la
+    # salida entre en max_tokens del cliente.
+    OUTPUT_TOKENS_PER_INPUT_TOKEN = 0.25
+    MIN_FRAGMENT_TOKENS = 500
+    OVERLAP_TOKENS = 100
+    BULK_BATCH_SIZE = 1000
+    HEADING_PATTERN = re.compile(
+        r"^(?:\d+(?:\.\d+)*[.)]?\s|[IVXLC]+[.)]\s|(?:grado|año|área|area|eje|bloque|unidad|ciclo|nivel)\b)",
+        re.IGNORECASE,
+    )
+    # Incrementar al cambiar LLM_INSTRUCTION para invalidar los fragmentos cacheados.
+    LLM_INSTRUCTION_VERSION = "1"
 
     LLM_INSTRUCTION = """
 Actúas como un parser semántico de documentos educativos (planes de estudio, diseños curriculares, programas, bibliografías).
@@ -86,13 +110,6 @@ Si el fragmento no tiene información aprovechable, devuelve [].
         if not text:
             raise ValueError("El contenido del plan está vacío.")
 
-        items_payload = cls._collect_llm_items(
-            text=text,
-            institution_id=institution_id,
-            plan_document=plan_document,
-            client=client,
-        )
-
         plan = cls._ensure_plan(
             study_plan=study_plan,
             institution_id=institution_id,
@@ -103,10 +120,11 @@ Si el fragmento no tiene información aprovechable, devuelve [].
             contenido=text,
         )
 
-        created = cls._persist_plan_items(
+        created = cls._parse_with_checkpoints(
             plan=plan,
             plan_document=plan_document,
-            items_payload=items_payload,
+            text=text,
+            client=client,
             delete_existing=True,
         )
         return plan, created
@@ -122,26 +140,98 @@ Si el fragmento no tiene información aprovechable, devuelve [].
     ) -> int:
         """
         Procesa plan.contenido_bruto en fragmentos y genera PlanItem persistidos.
+        chunk_size (opcional) fija el presupuesto de tokens por fragmento.
         Devuelve la cantidad de items creados.
         """
         text = (plan.contenido_bruto or "").strip()
         if not text:
             return 0
 
-        items_payload = cls._collect_llm_items(
-            text=text,
-            institution_id=plan.institution_id,
+        return cls._parse_with_checkpoints(
+            plan=plan,
             plan_document=None,
+            text=text,
             client=client,
             chunk_size=chunk_size,
+            delete_existing=reset_previous,
         )
-        return cls._persist_plan_items(
+
+    @classmethod
+    def resume(
+        cls,
+        plan: Plan,
+        *,
+        plan_document: PlanDocument | None = None,
+        client: AIClient | None = None,
+    ) -> int:
+        """
+        Retoma un parseo interrumpido: los fragmentos con checkpoint completo no se vuelven a
+        procesar y sólo se consulta al LLM por los pendientes o fallidos.
+        """
+        if plan_document:
+            text = (plan_document.curriculum_document.raw_text or "").strip()
+        else:
+            text = (plan.contenido_bruto or "").strip()
+        if not text:
+            return 0
+        return cls._parse_with_checkpoints(
             plan=plan,
-            plan_document=None,
-            items_payload=items_payload,
-            delete_existing=reset_previous,
+            plan_document=plan_document,
+            text=text,
+            client=client,
+            delete_existing=True,
         )
 
+    @staticmethod
+    def progress(plan: Plan, plan_document: PlanDocument | None = None) -> dict:
+        """
+        Resume el estado de los checkpoints del plan/documento: total, done, pending, error.
+        """
+        query = db.session.query(PlanParseCheckpoint.status, func.count(PlanParseCheckpoint.id)).filter(
+            PlanParseCheckpoint.plan_id == plan.id,
+            PlanParseCheckpoint.plan_document_id == (plan_document.id if plan_document else None),
+        )
+        counts = dict(query.group_by(PlanParseCheckpoint.status).all())
+        return PlanParserService._progress_payload(counts)
+
+    @staticmethod
+    def progress_by_document(plan_document_ids: Sequence[int]) -> dict[int, dict]:
+        if not plan_document_ids:
+            return {}
+        rows = (
+            db.session.query(
+                PlanParseCheckpoint.plan_document_id,
+                PlanParseCheckpoint.status,
+                func.count(PlanParseCheckpoint.id),
+            )
+            .filter(PlanParseCheckpoint.plan_document_id.in_(list(plan_document_ids)))
+            .group_by(PlanParseCheckpoint.plan_document_id, PlanParseCheckpoint.status)
+            .all()
+        )
+        grouped: dict[int, dict[str, int]] = {}
+        for plan_document_id, status, count in rows:
+            grouped.setdefault(plan_document_id, {})[status] = count
+        return {
+            plan_document_id: PlanParserService._progress_payload(counts)
+            for plan_document_id, counts in grouped.items()
+        }
+
+    @staticmethod
+    def _progress_payload(counts: dict[str, int]) -> dict:
+        done = counts.get(PlanParseCheckpoint.STATUS_DONE, 0)
+        pending = counts.get(PlanParseCheckpoint.STATUS_PENDING, 0)
+        failed = counts.get(PlanParseCheckpoint.STATUS_ERROR, 0)
+        total = done + pending + failed
+        if not total:
+            status = None
+        elif pending:
+            status = "processing"
+        elif failed:
+            status = "partial"
+        else:
+            status = "ready"
+        return {"total": total, "done": done, "pending": pending, "error": failed, "status": status}
+
     @classmethod
     def _ensure_plan(
         cls,
@@ -175,113 +265,410 @@ Si el fragmento no tiene información aprovechable, devuelve [].
         return plan
 
     @classmethod
-    def _collect_llm_items(
+    def _parse_with_checkpoints(
         cls,
         *,
-        text: str,
-        institution_id: int,
+        plan: Plan,
         plan_document: PlanDocument | None,
+        text: str,
         client: AIClient | None,
+        delete_existing: bool,
         chunk_size: int | None = None,
-    ) -> list[dict]:
-        client = client or AIClient()
-        max_chars = chunk_size or cls.MAX_CHARS
-        collected: list[dict] = []
-
-        for fragment_index, fragment in enumerate(cls._chunk_text(text, max_chars, cls.OVERLAP)):
-            prompt = cls._build_prompt(fragment, fragment_index)
-            try:
-                result = client.generate(
-                    prompt=prompt,
-                    context={
-                        "fragment_index": fragment_index,
-                        "plan_document_id": plan_document.id if plan_document else None,
-                    },
-                )
-            except Exception as exc:  # pragma: no cover - depends on external provider
-                current_app.logger.warning("LLM parse falló en fragmento %s: %s", fragment_index, exc)
-                continue
+    ) -> int:
+        """
+        Procesa los fragmentos de a uno y confirma (commit) cada resultado junto con su
+        checkpoint, de modo que un corte del proceso o del proveedor no pierde lo ya
+        parseado y el plan muestra resultados parciales mientras avanza.
+        Con delete_existing se aplica un diff por fragmento: se conservan las filas de los
+        fragmentos que no cambiaron y las de fragmentos que ya no existen se borran al final,
+        sólo si todos los fragmentos terminaron (un fallo nunca deja menos datos que antes).
+        Devuelve la cantidad de ítems asociados al plan/documento.
+        """
+        client = client or AIClient(institution_id=plan.institution_id)
+        estimator = client.token_estimator()
+        token_budget = chunk_size or cls._fragment_token_budget(client, estimator)
+        fragments = cls._chunk_text(text, token_budget, estimator)
+        stats = cls._chunk_stats(fragments, token_budget, estimator)
+        current_app.logger.info(
+            "Plan parser: %s fragmentos, presupuesto %s tokens, llenado medio %.0f%%",
+            stats["fragment_count"],
+            token_budget,
+            stats["fill_ratio"] * 100,
+        )
+        if plan_document:
+            plan_document.parse_stats = stats
+        else:
+            plan.parse_stats = stats
 
-            items = cls._parse_llm_payload(result.get("text", ""))
-            if not items:
+        scope = cls._item_scope(plan, plan_document)
+        hashes = [cls._fragment_hash(fragment) for fragment in fragments]
+        checkpoints = cls._prepare_checkpoints(plan, plan_document, hashes)
+        persisted_hashes: set[str] = set()
+        if delete_existing:
+            persisted_hashes = {
+                row.fragment_hash
+                for row in db.session.query(PlanItem.fragment_hash)
+                .filter(*scope, PlanItem.fragment_hash.isnot(None))
+                .distinct()
+            }
+        db.session.commit()
+
+        total = 0
+        fragment_indexes: dict[str, int] = {}
+        for fragment_index, (fragment, fragment_hash) in enumerate(zip(fragments, hashes)):
+            fragment_indexes.setdefault(fragment_hash, fragment_index)
+            checkpoint = checkpoints[fragment_index]
+            if checkpoint.status == PlanParseCheckpoint.STATUS_DONE and fragment_hash in persisted_hashes:
+                total += checkpoint.item_count
                 continue
 
-            for payload in items:
-                description = (payload.get("descripcion") or "").strip()
-                if not description:
+            items = cls._cached_fragment_items(plan.institution_id, fragment_hash)
+            if items is not None:
+                AITelemetry.record(call_site="plan_parser", institution_id=plan.institution_id, cache_hit=True)
+            else:
+                items = cls._parse_fragment_with_llm(
+                    fragment,
+                    fragment_index,
+                    client=client,
+                    plan_document=plan_document,
+                )
+                if items is None:
+                    checkpoint.status = PlanParseCheckpoint.STATUS_ERROR
+                    checkpoint.item_count = 0
+                    db.session.commit()
                     continue
-                area = (payload.get("area") or "").strip() or "General"
-                grade = cls._coerce_grade(payload.get("grado"))
-
-                normalized_grade = None
-                if grade:
-                    normalized_grade = CurriculumService.normalize_grade_label(grade, institution_id)
-
-                collected.append(
-                    {
-                        "grado": grade,
-                        "grado_normalizado": normalized_grade,
-                        "area": area[:255],
-                        "descripcion": description,
-                        "metadata": cls._merge_metadata(payload, fragment_index),
-                    }
+                items = cls._store_fragment_items(plan.institution_id, fragment_hash, items)
+
+            payloads = cls._normalize_items(items, fragment_index, fragment_hash, plan.institution_id)
+            if fragment_hash not in persisted_hashes:
+                cls._insert_plan_items(plan=plan, plan_document=plan_document, items_payload=payloads)
+                if delete_existing:
+                    persisted_hashes.add(fragment_hash)
+            checkpoint.status = PlanParseCheckpoint.STATUS_DONE
+            checkpoint.item_count = len(payloads)
+            total += len(payloads)
+            db.session.commit()
+
+        if delete_existing:
+            unfinished = sum(1 for checkpoint in checkpoints if checkpoint.status != PlanParseCheckpoint.STATUS_DONE)
+            if unfinished:
+                # No sabemos qué filas viejas reemplazaba cada fragmento fallido: sin podar, el
+                # documento conserva sus ítems previos hasta un parseo que termine completo.
+                current_app.logger.warning(
+                    "Plan parser: %s fragmentos sin procesar, se conservan los ítems anteriores", unfinished
                 )
+            else:
+                cls._prune_stale_items(scope, fragment_indexes)
+        PlanIndexService.rebuild(plan)
+        return total
 
-        return collected
+    @staticmethod
+    def _item_scope(plan: Plan, plan_document: PlanDocument | None) -> list:
+        scope = [PlanItem.plan_id == plan.id]
+        if plan_document:
+            scope.append(PlanItem.plan_document_id == plan_document.id)
+        return scope
+
+    @staticmethod
+    def _prepare_checkpoints(
+        plan: Plan,
+        plan_document: PlanDocument | None,
+        hashes: list[str],
+    ) -> list[PlanParseCheckpoint]:
+        """
+        Alinea los checkpoints con la lista actual de fragmentos: conserva el estado de los
+        que mantienen su hash, reinicia los que cambiaron y descarta los sobrantes.
+        """
+        plan_document_id = plan_document.id if plan_document else None
+        existing = {
+            checkpoint.fragment_index: checkpoint
+            for checkpoint in PlanParseCheckpoint.query.filter_by(
+                plan_id=plan.id,
+                plan_document_id=plan_document_id,
+            )
+        }
+        checkpoints: list[PlanParseCheckpoint] = []
+        for fragment_index, fragment_hash in enumerate(hashes):
+            checkpoint = existing.pop(fragment_index, None)
+            if checkpoint is None:
+                checkpoint = PlanParseCheckpoint(
+                    plan_id=plan.id,
+                    plan_document_id=plan_document_id,
+                    fragment_index=fragment_index,
+                )
+                db.session.add(checkpoint)
+            if checkpoint.fragment_hash != fragment_hash:
+                checkpoint.fragment_hash = fragment_hash
+                checkpoint.status = PlanParseCheckpoint.STATUS_PENDING
+                checkpoint.item_count = 0
+            checkpoints.append(checkpoint)
+        for leftover in existing.values():
+            db.session.delete(leftover)
+        return checkpoints
 
     @classmethod
-    def _persist_plan_items(
+    def _normalize_items(
+        cls,
+        items: list[dict],
+        fragment_index: int,
+        fragment_hash: str,
+        institution_id: int,
+    ) -> list[dict]:
+        normalized: list[dict] = []
+        for payload in items:
+            description = (payload.get("descripcion") or "").strip()
+            if not description:
+                continue
+            area = (payload.get("area") or "").strip() or "General"
+            grade = cls._coerce_grade(payload.get("grado"))
+
+            normalized_grade = None
+            if grade:
+                normalized_grade = CurriculumService.normalize_grade_label(grade, institution_id)
+
+            normalized.append(
+                {
+                    "grado": grade,
+                    "grado_normalizado": normalized_grade,
+                    "area": area[:255],
+                    "descripcion": description,
+                    "metadata": cls._merge_metadata(payload, fragment_index),
+                    "fragment_hash": fragment_hash,
+                }
+            )
+        return normalized
+
+    @classmethod
+    def _parse_fragment_with_llm(
+        cls,
+        fragment: str,
+        fragment_index: int,
+        *,
+        client: AIClient,
+        plan_document: PlanDocument | None,
+    ) -> list[dict] | None:
+        """
+        Devuelve los ítems crudos del LLM para un fragmento, o None si la llamada falló
+        (en ese caso no se cachea nada y el fragmento se reintentará en el próximo parseo).
+        """
+        prompt = cls._build_prompt(fragment, fragment_index)
+        try:
+            result = client.generate(
+                prompt=prompt,
+                context={
+                    "fragment_index": fragment_index,
+                    "plan_document_id": plan_document.id if plan_document else None,
+                },
+                call_site="plan_parser",
+            )
+        except Exception as exc:  # pragma: no cover - depends on external provider
+            current_app.logger.warning("LLM parse falló en fragmento %s: %s", fragment_index, exc)
+            return None
+        if result.get("model") == "heuristic":
+            # El fallback heurístico no estructura planes: no lo cacheamos como respuesta válida.
+            return None
+        return cls._parse_llm_payload(result.get("text", ""))
+
+    @classmethod
+    def _fragment_hash(cls, fragment: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(cls.LLM_INSTRUCTION_VERSION.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(fragment.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _cached_fragment_items(institution_id: int, fragment_hash: str) -> list[dict] | None:
+        cached = PlanFragment.query.filter_by(
+            institution_id=institution_id,
+            content_hash=fragment_hash,
+        ).first()
+        return cached.items if cached else None
+
+    @staticmethod
+    def _store_fragment_items(institution_id: int, fragment_hash: str, items: list[dict]) -> list[dict]:
+        """Cachea los ítems del fragmento y devuelve los que quedaron guardados."""
+        try:
+            with db.session.begin_nested():
+                db.session.add(
+                    PlanFragment(
+                        institution_id=institution_id,
+                        content_hash=fragment_hash,
+                        items_json=items,
+                    )
+                )
+        except IntegrityError:
+            # Otro parseo del mismo contenido lo guardó en paralelo: usamos esa fila.
+            cached = PlanFragment.query.filter_by(institution_id=institution_id, content_hash=fragment_hash).one()
+            return cached.items
+        return items
+
+    @classmethod
+    def _insert_plan_items(
         cls,
         *,
         plan: Plan,
         plan_document: PlanDocument | None,
         items_payload: list[dict],
-        delete_existing: bool,
-    ) -> int:
-        if delete_existing:
-            query = PlanItem.query.filter(PlanItem.plan_id == plan.id)
-            if plan_document:
-                query = query.filter(PlanItem.plan_document_id == plan_document.id)
-            query.delete(synchronize_session=False)
-            db.session.flush()
-
-        for payload in items_payload:
-            plan_item = PlanItem(
-                plan_id=plan.id,
-                plan_document_id=plan_document.id if plan_document else None,
-                grado=payload.get("grado"),
-                grado_normalizado=payload.get("grado_normalizado"),
-                area=payload.get("area"),
-                descripcion=payload.get("descripcion"),
+    ) -> None:
+        """
+        Inserta los ítems en lote (executemany), sin instanciar PlanItem en la sesión.
+        """
+        plan_document_id = plan_document.id if plan_document else None
+        rows = [
+            {
+                "plan_id": plan.id,
+                "plan_document_id": plan_document_id,
+                "grado": payload.get("grado"),
+                "grado_normalizado": payload.get("grado_normalizado"),
+                "area": payload.get("area"),
+                "descripcion": payload.get("descripcion"),
+                "metadata_json": payload.get("metadata") or {},
+                "fragment_hash": payload.get("fragment_hash"),
+            }
+            for payload in items_payload
+        ]
+        for start in range(0, len(rows), cls.BULK_BATCH_SIZE):
+            db.session.execute(insert(PlanItem), rows[start : start + cls.BULK_BATCH_SIZE])
+        PlanIndexService.invalidate(plan)
+
+    @classmethod
+    def _prune_stale_items(cls, scope: list, fragment_indexes: dict[str, int]) -> None:
+        """
+        Borra en una sola sentencia los PlanItem cuyos fragmentos ya no existen y actualiza
+        el fragment_index de los que cambiaron de posición en el documento.
+        """
+        stale = PlanItem.query.filter(*scope)
+        if fragment_indexes:
+            stale = stale.filter(
+                or_(
+                    PlanItem.fragment_hash.is_(None),
+                    PlanItem.fragment_hash.notin_(list(fragment_indexes)),
+                )
             )
-            plan_item.metadata_dict = payload.get("metadata") or {}
-            db.session.add(plan_item)
+        stale.delete(synchronize_session=False)
 
-        return len(items_payload)
+        moved = []
+        kept_rows = (
+            db.session.query(PlanItem.id, PlanItem.fragment_hash, PlanItem.metadata_json)
+            .filter(*scope, PlanItem.fragment_hash.isnot(None))
+            .all()
+        )
+        for row in kept_rows:
+            metadata = row.metadata_json or {}
+            new_index = fragment_indexes.get(row.fragment_hash)
+            if metadata.get("fragment_index") != new_index:
+                moved.append({"_id": row.id, "_metadata": {**metadata, "fragment_index": new_index}})
+        if moved:
+            statement = (
+                update(PlanItem.__table__)
+                .where(PlanItem.__table__.c.id == bindparam("_id"))
+                .values(metadata=bindparam("_metadata"))
+            )
+            for start in range(0, len(moved), cls.BULK_BATCH_SIZE):
+                db.session.execute(statement, moved[start : start + cls.BULK_BATCH_SIZE])
+        db.session.flush()
+
+    @classmethod
+    def _fragment_token_budget(cls, client: AIClient, estimator: TokenEstimator) -> int:
+        """
+        Tokens de texto por fragmento: lo que queda de la ventana de contexto del modelo
+        tras reservar max_tokens para la respuesta y el prompt fijo, acotado además para
+        que el JSON resultante no supere max_tokens.
+        """
+        overhead = (
+            estimator.count(cls._build_prompt("", 0))
+            + estimator.count(client.SYSTEM_PROMPT)
+            + cls.PROMPT_MARGIN_TOKENS
+        )
+        context_budget = client.context_window - client.max_tokens - overhead
+        output_budget = int(client.max_tokens / cls.OUTPUT_TOKENS_PER_INPUT_TOKEN)
+        return max(cls.MIN_FRAGMENT_TOKENS, min(context_budget, output_budget))
+
+    @classmethod
+    def _chunk_text(cls, text: str, token_budget: int, estimator: TokenEstimator) -> list[str]:
+        """
+        Empaqueta bloques completos (título + párrafo) en la menor cantidad de fragmentos que
+        respetan token_budget. Al ser secuencial, el empaquetado voraz es óptimo y los cortes
+        dependen sólo del contenido: editar un párrafo no desplaza los fragmentos siguientes.
+        """
+        fragments: list[str] = []
+        buffer: list[str] = []
+        size = 0
+        for unit in cls._text_units(text.strip(), token_budget, estimator):
+            tokens = estimator.count(unit)
+            if buffer and size + tokens > token_budget:
+                fragments.append("\n".join(buffer))
+                buffer = []
+                size = 0
+            buffer.append(unit)
+            size += tokens
+        if buffer:
+            fragments.append("\n".join(buffer))
+        return fragments
+
+    @classmethod
+    def _text_units(cls, text: str, token_budget: int, estimator: TokenEstimator) -> Iterator[str]:
+        """
+        Divide el texto en bloques que empiezan en un título o tras una línea en blanco.
+        Los bloques que exceden el presupuesto se parten por líneas y, como último recurso,
+        en ventanas con OVERLAP_TOKENS de solapamiento.
+        """
+        for block in cls._text_blocks(text):
+            if estimator.count(block) <= token_budget:
+                yield block
+                continue
+            for line in block.splitlines():
+                tokens = estimator.count(line)
+                if tokens <= token_budget:
+                    yield line
+                    continue
+                chars_per_token = len(line) / tokens
+                window = max(1, int(token_budget * chars_per_token))
+                step = max(1, window - int(cls.OVERLAP_TOKENS * chars_per_token))
+                start = 0
+                while start < len(line):
+                    yield line[start : start + window]
+                    if start + window >= len(line):
+                        break
+                    start += step
+
+    @classmethod
+    def _text_blocks(cls, text: str) -> Iterator[str]:
+        current: list[str] = []
+        pending_heading: list[str] = []
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            is_heading = bool(line) and len(line) <= 120 and bool(cls.HEADING_PATTERN.match(line))
+            if (not line or is_heading) and current:
+                yield "\n".join(current)
+                current = []
+            if not line:
+                continue
+            if is_heading and not current:
+                # Un título se pega al bloque que lo sigue para no quedar huérfano al final
+                # de un fragmento.
+                pending_heading.append(line)
+                continue
+            if pending_heading:
+                current.extend(pending_heading)
+                pending_heading = []
+            current.append(line)
+        current.extend(pending_heading)
+        if current:
+            yield "\n".join(current)
 
     @staticmethod
-    def _chunk_text(text: str, max_chars: int, overlap: int) -> Iterator[str]:
-        clean = text.strip()
-        if not clean:
-            return
-        overlap = min(overlap, max_chars // 2)
-        start = 0
-        length = len(clean)
-        while start < length:
-            end = min(length, start + max_chars)
-            chunk = clean[start:end]
-            if end < length:
-                newline_break = chunk.rfind("\n")
-                if newline_break > max_chars * 0.5:
-                    end = start + newline_break
-                    chunk = clean[start:end]
-            chunk = chunk.strip()
-            if not chunk:
-                break
-            yield chunk
-            if end >= length:
-                break
-            start = max(end - overlap, start + max_chars)
+    def _chunk_stats(fragments: list[str], token_budget: int, estimator: TokenEstimator) -> dict:
+        token_counts = [estimator.count(fragment) for fragment in fragments]
+        total = sum(token_counts)
+        return {
+            "fragment_count": len(fragments),
+            "token_budget": token_budget,
+            "tokens_total": total,
+            "fill_ratio": round(total / (token_budget * len(fragments)), 3) if fragments else 0.0,
+            "tokenizer": "heuristic" if estimator.is_heuristic else "model",
+        }
 
     @classmethod
     def _build_prompt(cls, fragment: str, index: int) -> str:
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from models import Profile, RoleEnum
+from models.user import normalize_search_name
+
+
+class RecipientSearchService:
+    """
+    Búsqueda por prefijo de destinatarios dentro de la institución (typeahead de Mensajes,
+    Insights y panel docente). Compara contra Profile.search_name, el nombre en minúsculas y
+    sin tildes, con un rango sobre el índice (institution_id, search_name) en lugar de traer
+    todos los perfiles de la institución.
+    """
+
+    # Mismos grupos que entiende _filter_recipient_ids con los tokens "group:<clave>".
+    GROUPS = {
+        "students": ("Alumnos", (RoleEnum.ALUMNO,)),
+        "parents": ("Familias", (RoleEnum.PADRE,)),
+        "staff": (
+            "Equipo",
+            (RoleEnum.PROFESOR, RoleEnum.PSICOPEDAGOGIA, RoleEnum.ADMIN_COLEGIO, RoleEnum.RECTOR),
+        ),
+    }
+    MIN_TERM_LENGTH = 2
+    DEFAULT_LIMIT = 15
+    MAX_LIMIT = 50
+
+    @staticmethod
+    def search(profile: Profile, term: str | None, *, group: str | None = None, limit: int = DEFAULT_LIMIT) -> list[Profile]:
+        """
+        Perfiles de la institución de `profile` (sin incluirlo) cuyo nombre empieza por `term`.
+        Si no se llenan `limit` resultados se completa con coincidencias al inicio de otra palabra
+        del nombre ("perez" encuentra a "Ana Pérez") y con perfiles cuyo rol o grupo empieza por
+        el término ("prof" trae profesores).
+        """
+        normalized = normalize_search_name(term)
+        if not getattr(profile, "institution_id", None) or len(normalized) < RecipientSearchService.MIN_TERM_LENGTH:
+            return []
+
+        if group:
+            if group not in RecipientSearchService.GROUPS:
+                raise ValueError("grupo inválido")
+            roles = RecipientSearchService.GROUPS[group][1]
+        else:
+            roles = tuple(role for _, group_roles in RecipientSearchService.GROUPS.values() for role in group_roles)
+
+        base_query = Profile.query.filter(
+            Profile.institution_id == profile.institution_id,
+            Profile.id != profile.id,
+            Profile.role.in_(roles),
+        )
+
+        # 1) Prefijo del nombre completo: rango sobre el índice, sin LIKE.
+        results = (
+            base_query.filter(
+                Profile.search_name >= normalized,
+                Profile.search_name < normalized + "\uffff",
+            )
+            .order_by(Profile.search_name.asc(), Profile.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+        # 2) Prefijo de otra palabra del nombre (apellidos).
+        if len(results) < limit:
+            escaped = normalized.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            results += RecipientSearchService._excluding(
+                base_query.filter(Profile.search_name.like(f"% {escaped}%", escape="\\")),
+                results,
+                limit - len(results),
+            )
+
+        # 3) Rol o nombre de grupo ("alum", "famil", "equipo", "psico").
+        role_matches = RecipientSearchService._roles_matching(normalized, roles)
+        if len(results) < limit and role_matches:
+            results += RecipientSearchService._excluding(
+                base_query.filter(Profile.role.in_(role_matches)),
+                results,
+                limit - len(results),
+            )
+        return results
+
+    @staticmethod
+    def serialize(profile: Profile) -> dict:
+        return {
+            "id": profile.id,
+            "full_name": profile.full_name,
+            "role": profile.role.value if profile.role else None,
+            "group": RecipientSearchService.group_label(profile.role),
+        }
+
+    @staticmethod
+    def group_label(role: RoleEnum | None) -> str | None:
+        for label, group_roles in RecipientSearchService.GROUPS.values():
+            if role in group_roles:
+                return label
+        return None
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _excluding(query, found: list[Profile], limit: int) -> list[Profile]:
+        if found:
+            query = query.filter(Profile.id.notin_([item.id for item in found]))
+        return query.order_by(Profile.search_name.asc(), Profile.id.asc()).limit(limit).all()
+
+    @staticmethod
+    def _roles_matching(normalized: str, roles: tuple) -> list[RoleEnum]:
+        matches = {role for role in roles if normalize_search_name(role.value).startswith(normalized)}
+        for label, group_roles in RecipientSearchService.GROUPS.values():
+            if normalize_search_name(label).startswith(normalized):
+                matches.update(role for role in group_roles if role in roles)
+        return sorted(matches, key=lambda role: role.value)
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from flask import current_app, url_for
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import Grade, Institution, Profile, RoleEnum, Section, User
+from models.user import normalize_search_name
+from services.fragment_cache import FragmentCache
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # pragma: no cover - fallback only when dependency missing
+    load_workbook = None
+
+
+class RosterImportService:
+    """
+    Alta masiva de usuarios + perfiles de una institución desde un CSV o XLSX.
+
+    1. Validación en streaming: se lee fila a fila (nunca el archivo entero en memoria) y
+       se chequea email, nombre, rol, sección y duplicados contra el archivo y la base.
+    2. Contraseñas: las filas con contraseña se hashean en un pool de procesos (el hash es
+       lento a propósito); las que no traen, y siempre las familias, reciben un token de
+       activación como en api/activation.py. El reporte devuelve el enlace de cada una en
+       "activations" (como magic_link en POST /profiles) para hacérselo llegar.
+    3. Inserción por lotes de User y Profile dentro de una única transacción.
+
+    Con dry_run sólo se ejecuta el paso 1 y se devuelve el reporte.
+    """
+
+    # Encabezados aceptados (normalizados) -> campo.
+    COLUMN_ALIASES = {
+        "email": "email",
+        "correo": "email",
+        "mail": "email",
+        "full_name": "full_name",
+        "nombre": "full_name",
+        "nombre completo": "full_name",
+        "role": "role",
+        "rol": "role",
+        "password": "password",
+        "contrasena": "password",
+        "seccion": "section",
+        "section": "section",
+        "curso": "section",
+    }
+    REQUIRED_COLUMNS = ("email", "full_name", "role")
+    # Roles que se pueden dar de alta desde un padrón (ADMIN de plataforma nunca).
+    IMPORTABLE_ROLES = set(RoleEnum) - {RoleEnum.ADMIN}
+    EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+    BATCH_SIZE = 500
+    ACTIVATION_HOURS = 72
+    # El reporte lista como máximo estos errores (el total siempre se informa).
+    MAX_REPORTED_ERRORS = 200
+
+    @staticmethod
+    def import_roster(institution: Institution, stream, filename: str, *, dry_run: bool = False) -> dict:
+        started = time.perf_counter()
+        report = {
+            "dry_run": dry_run,
+            "total_rows": 0,
+            "valid_rows": 0,
+            "created_users": 0,
+            "created_profiles": 0,
+            "activation_tokens": 0,
+            "activations": [],
+            "errors": [],
+            "error_count": 0,
+            "timings": {},
+        }
+
+        valid_rows = list(RosterImportService._validate(institution, stream, filename, report))
+        report["valid_rows"] = len(valid_rows)
+        report["timings"]["validate_seconds"] = round(time.perf_counter() - started, 3)
+
+        if dry_run or not valid_rows:
+            return RosterImportService._finish(report, started)
+
+        hash_started = time.perf_counter()
+        RosterImportService._assign_credentials(valid_rows)
+        report["activation_tokens"] = sum(1 for row in valid_rows if row["activation_token"])
+        report["timings"]["hash_seconds"] = round(time.perf_counter() - hash_started, 3)
+
+        insert_started = time.perf_counter()
+        try:
+            users, profiles = RosterImportService._bulk_insert(institution, valid_rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # Los INSERT por lote no pasan por la unit of work: invalidamos los fragmentos a mano.
+        FragmentCache.bump(institution.id)
+        report["created_users"] = users
+        report["created_profiles"] = profiles
+        report["activations"] = RosterImportService._activation_links(valid_rows)
+        report["timings"]["insert_seconds"] = round(time.perf_counter() - insert_started, 3)
+        return RosterImportService._finish(report, started)
+
+    @staticmethod
+    def iter_rows(stream, filename: str) -> Iterator[tuple[int, dict]]:
+        """(número de fila, {campo: valor}) con los encabezados ya mapeados a campos."""
+        extension = os.path.splitext(filename or "")[1].lower()
+        if extension in (".xlsx", ".xlsm"):
+            raw_rows = RosterImportService._xlsx_rows(stream)
+        elif extension in (".csv", ".txt", ""):
+            raw_rows = RosterImportService._csv_rows(stream)
+        else:
+            raise ValueError("Formato no soportado: subí un .csv o .xlsx.")
+
+        header = next(raw_rows, None)
+        if not header:
+            raise ValueError("El archivo está vacío.")
+        fields = [RosterImportService.COLUMN_ALIASES.get(normalize_search_name(str(cell or ""))) for cell in header]
+        missing = [column for column in RosterImportService.REQUIRED_COLUMNS if column not in fields]
+        if missing:
+            raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}.")
+
+        for row_number, raw in enumerate(raw_rows, start=2):
+            values = {
+                field: str(cell).strip() if cell is not None else ""
+                for field, cell in zip(fields, raw)
+                if field
+            }
+            if not any(values.values()):
+                continue
+            yield row_number, values
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _validate(institution: Institution, stream, filename: str, report: dict) -> Iterator[dict]:
+        sections = RosterImportService._section_lookup(institution.id)
+        seen_emails: set[str] = set()
+        pending: list[dict] = []
+
+        for row_number, values in RosterImportService.iter_rows(stream, filename):
+            report["total_rows"] += 1
+            email = values.get("email", "").lower()
+            full_name = " ".join(values.get("full_name", "").split())
+            role_raw = values.get("role", "").upper()
+
+            error = None
+            role = RoleEnum.__members__.get(role_raw)
+            section_id = None
+            if not RosterImportService.EMAIL_RE.match(email):
+                error = "email inválido"
+            elif not full_name:
+                error = "falta el nombre"
+            elif role not in RosterImportService.IMPORTABLE_ROLES:
+                error = f"rol inválido: {values.get('role') or '(vacío)'}"
+            elif email in seen_emails:
+                error = "email repetido en el archivo"
+            elif values.get("section"):
+                section_id = sections.get(normalize_search_name(values["section"]))
+                if section_id is None:
+                    error = f"sección desconocida: {values['section']}"
+
+            if error:
+                RosterImportService._add_error(report, row_number, email, error)
+                continue
+
+            seen_emails.add(email)
+            pending.append(
+                {
+                    "row": row_number,
+                    "email": email,
+                    "full_name": full_name,
+                    "role": role,
+                    "password": values.get("password") or None,
+                    "section_id": section_id,
+                }
+            )
+            if len(pending) >= RosterImportService.BATCH_SIZE:
+                yield from RosterImportService._check_existing(institution.id, pending, report)
+                pending = []
+
+        if pending:
+            yield from RosterImportService._check_existing(institution.id, pending, report)
+
+    @staticmethod
+    def _check_existing(institution_id: int, rows: list[dict], report: dict) -> Iterator[dict]:
+        """Un query por lote: usuarios ya existentes y si ya tienen perfil en la institución."""
+        emails = [row["email"] for row in rows]
+        existing = dict(db.session.query(User.email, User.id).filter(User.email.in_(emails)).all())
+        with_profile = set()
+        if existing:
+            with_profile = {
+                user_id
+                for (user_id,) in db.session.query(Profile.user_id).filter(
+                    Profile.user_id.in_(list(existing.values())),
+                    Profile.institution_id == institution_id,
+                )
+            }
+        for row in rows:
+            user_id = existing.get(row["email"])
+            if user_id in with_profile:
+                RosterImportService._add_error(report, row["row"], row["email"], "ya tiene perfil en la institución")
+                continue
+            # Usuario de otra institución: sólo se le agrega el perfil (como POST /profiles).
+            row["user_id"] = user_id
+            yield row
+
+    @staticmethod
+    def _assign_credentials(rows: list[dict]) -> None:
+        expires = datetime.utcnow() + timedelta(hours=RosterImportService.ACTIVATION_HOURS)
+        to_hash = []
+        for row in rows:
+            row["password_hash"] = None
+            row["activation_token"] = None
+            row["activation_expires"] = None
+            if row["user_id"] is not None:
+                continue
+            if row["password"] and row["role"] is not RoleEnum.PADRE:
+                to_hash.append(row)
+            else:
+                row["activation_token"] = secrets.token_urlsafe(24)
+                row["activation_expires"] = expires
+
+        hashes = RosterImportService._hash_passwords([row["password"] for row in to_hash])
+        for row, password_hash in zip(to_hash, hashes):
+            row["password_hash"] = password_hash
+
+    @staticmethod
+    def _activation_links(rows: list[dict]) -> list[dict]:
+        return [
+            {
+                "row": row["row"],
+                "email": row["email"],
+                "full_name": row["full_name"],
+                "role": row["role"].value,
+                "magic_link": url_for("api.activate_form", token=row["activation_token"], _external=True),
+                "expires_at": row["activation_expires"].isoformat(),
+            }
+            for row in rows
+            if row["activation_token"]
+        ]
+
+    @staticmethod
+    def _hash_passwords(passwords: list[str]) -> list[str]:
+        workers = int(current_app.config.get("ROSTER_IMPORT_WORKERS") or os.cpu_count() or 1)
+        if workers <= 1 or len(passwords) < 2 * workers:
+            return [generate_password_hash(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+    @staticmethod
+    def _bulk_insert(institution: Institution, rows: list[dict]) -> tuple[int, int]:
+        created_users = 0
+        for start in range(0, len(rows), RosterImportService.BATCH_SIZE):
+            batch = rows[start : start + RosterImportService.BATCH_SIZE]
+            new_users = [row for row in batch if row["user_id"] is None]
+            if new_users:
+                inserted = db.session.execute(
+                    insert(User).returning(User.id, User.email),
+                    [
+                        {"email": row["email"], "password_hash": row["password_hash"], "active": True}
+                        for row in new_users
+                    ],
+                )
+                ids_by_email = {email: user_id for user_id, email in inserted}
+                for row in new_users:
+                    row["user_id"] = ids_by_email[row["email"]]
+                created_users += len(new_users)
+
+            db.session.execute(
+                insert(Profile),
+                [
+                    {
+                        "user_id": row["user_id"],
+                        "institution_id": institution.id,
+                        "role": row["role"],
+                        "full_name": row["full_name"],
+                        "section_id": row["section_id"],
+                        "activation_token": row["activation_token"],
+                        "activation_expires": row["activation_expires"],
+                    }
+                    for row in batch
+                ],
+            )
+        return created_users, len(rows)
+
+    @staticmethod
+    def _section_lookup(institution_id: int) -> dict[str, int]:
+        """Acepta "<grado> <sección>" ("1° año A") o sólo la sección si no es ambigua."""
+        lookup: dict[str, int] = {}
+        ambiguous: set[str] = set()
+        rows = (
+            db.session.query(Section.id, Section.name, Grade.name)
+            .join(Grade, Grade.id == Section.grade_id)
+            .filter(Grade.institution_id == institution_id)
+            .all()
+        )
+        for section_id, section_name, grade_name in rows:
+            lookup[normalize_search_name(f"{grade_name} {section_name}")] = section_id
+            short = normalize_search_name(section_name)
+            if short in lookup and lookup[short] != section_id:
+                ambiguous.add(short)
+            lookup.setdefault(short, section_id)
+        for key in ambiguous:
+            lookup.pop(key, None)
+        return lookup
+
+    @staticmethod
+    def _csv_rows(stream) -> Iterator[list]:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        try:
+            yield from csv.reader(text, dialect)
+        finally:
+            text.detach()
+
+    @staticmethod
+    def _xlsx_rows(stream) -> Iterator[tuple]:
+        if load_workbook is None:
+            raise ValueError("Instala el paquete openpyxl para importar archivos .xlsx (o subí un .csv).")
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _add_error(report: dict, row_number: int, email: str, message: str) -> None:
+        report["error_count"] += 1
+        if len(report["errors"]) < RosterImportService.MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "email": email, "error": message})
+
+    @staticmethod
+    def _finish(report: dict, started: float) -> dict:
+        elapsed = time.perf_counter() - started
+        report["timings"]["total_seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["total_rows"] / elapsed, 1) if elapsed else None
+        return report
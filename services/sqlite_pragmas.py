@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from sqlalchemy import event
+
+from extensions import db
+
+
+class SQLitePragmas:
+    """
+    Ajustes de SQLite para producción, aplicados en cada conexión nueva del pool:
+
+    - journal_mode=WAL: las lecturas no bloquean a la escritura ni al revés (en modo
+      rollback-journal cada escritura bloquea toda la base).
+    - synchronous=NORMAL: con WAL sólo se sincroniza en los checkpoints; una caída de la
+      máquina puede perder las últimas transacciones, pero no corrompe la base.
+    - busy_timeout: cuánto espera una escritura por el lock antes de "database is locked".
+    - mmap_size / cache_size: lecturas desde memoria en vez de read() por página.
+    - temp_store=MEMORY: tablas temporales de ORDER BY / GROUP BY en memoria.
+
+    Se desactiva con SQLITE_PRODUCTION_MODE=0. No hace nada con otros motores ni con bases
+    en memoria (que no admiten WAL).
+
+    Aparte, en toda base SQLite (también en memoria y sin el perfil de producción) el BEGIN lo
+    emite SQLAlchemy y no el driver: pysqlite no abre transacción antes de un SAVEPOINT, así
+    que un begin_nested() al principio de la transacción confirmaba todo al liberarse y el
+    rollback posterior ya no deshacía nada.
+    """
+
+    @staticmethod
+    def init_app(app) -> None:
+        with app.app_context():
+            # Primario y, si está configurada, la réplica de lectura.
+            engines = [engine for engine in db.engines.values() if engine.dialect.name == "sqlite"]
+        for engine in engines:
+            event.listen(engine, "connect", SQLitePragmas._disable_driver_transactions)
+            event.listen(engine, "begin", SQLitePragmas._begin)
+
+        if not app.config.get("SQLITE_PRODUCTION_MODE", True):
+            return
+        pragmas = SQLitePragmas.pragmas(app.config)
+        for engine in engines:
+            if engine.url.database in (None, "", ":memory:") or "mode=memory" in str(engine.url):
+                continue
+            event.listen(engine, "connect", SQLitePragmas._listener(pragmas))
+
+    @staticmethod
+    def pragmas(config) -> list[tuple[str, str | int]]:
+        return [
+            ("journal_mode", "WAL"),
+            ("synchronous", "NORMAL"),
+            ("busy_timeout", int(config.get("SQLITE_BUSY_TIMEOUT_MS") or 5000)),
+            ("mmap_size", int(config.get("SQLITE_MMAP_SIZE") or 0)),
+            # Negativo = KiB (positivo serían páginas).
+            ("cache_size", -int(config.get("SQLITE_CACHE_SIZE_KB") or 2000)),
+            ("temp_store", "MEMORY"),
+        ]
+
+    @staticmethod
+    def _disable_driver_transactions(dbapi_connection, connection_record) -> None:
+        # Sin BEGIN implícito del driver; lo emite _begin al iniciar cada transacción.
+        dbapi_connection.isolation_level = None
+
+    @staticmethod
+    def _begin(connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+    @staticmethod
+    def _listener(pragmas: list[tuple[str, str | int]]):
+        def apply_pragmas(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas:
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+        return apply_pragmas
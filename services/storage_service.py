@@ -1,20 +1,390 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
 from pathlib import Path
-from uuid import uuid4
 
-from flask import current_app
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from werkzeug.utils import secure_filename
 
+from extensions import db
+from models import Attachment, Institution, PlatformTheme, StoredBlob
+from services.attachment_loader import AttachmentLoader
+from services.image_derivative_service import ImageDerivativeService
 
-def save_logo(file_storage):
+try:
+    import boto3
+except ImportError:  # pragma: no cover - fallback only when dependency missing
+    boto3 = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LocalBlobBackend:
+    """Blobs en disco bajo root, servidos por la app en url_prefix."""
+
+    name = "local"
+
+    def __init__(self, root: Path, url_prefix: str):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def put(self, key: str, source: Path, mime_type: str | None) -> None:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+
+    def open(self, key: str):
+        return open(self.root / key, "rb")
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+
+class S3BlobBackend:
+    """Blobs en un bucket compatible con S3 (boto3 o LocalS3Client)."""
+
+    name = "s3"
+
+    def __init__(self, client, bucket: str, url_prefix: str):
+        self.client = client
+        self.bucket = bucket
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def exists(self, key: str) -> bool:
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=key, MaxKeys=1)
+        return any(item.get("Key") == key for item in response.get("Contents") or [])
+
+    def put(self, key: str, source: Path, mime_type: str | None) -> None:
+        extra = {"ContentType": mime_type} if mime_type else {}
+        try:
+            with open(source, "rb") as handle:
+                self.client.upload_fileobj(handle, self.bucket, key, ExtraArgs=extra)
+        finally:
+            Path(source).unlink(missing_ok=True)
+
+    def open(self, key: str):
+        # Las variantes se generan en memoria: alcanza con traer el objeto completo.
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            return io.BytesIO(body.read())
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+
+class LocalS3Client:
+    """
+    Stand-in local del subconjunto de la API de S3 que usa S3BlobBackend, para desarrollo
+    y pruebas sin un bucket real. Cada bucket es un directorio bajo root.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def list_objects_v2(self, *, Bucket: str, Prefix: str = "", MaxKeys: int = 1000) -> dict:
+        bucket_root = self.root / Bucket
+        contents = []
+        if bucket_root.is_dir():
+            for path in sorted(bucket_root.rglob("*")):
+                key = path.relative_to(bucket_root).as_posix()
+                if path.is_file() and key.startswith(Prefix):
+                    contents.append({"Key": key, "Size": path.stat().st_size})
+                    if len(contents) >= MaxKeys:
+                        break
+        return {"KeyCount": len(contents), "Contents": contents}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs: dict | None = None) -> None:
+        target = self.root / Bucket / Key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as handle:
+            while True:
+                chunk = Fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                handle.write(chunk)
+
+    def get_object(self, *, Bucket: str, Key: str) -> dict:
+        return {"Body": open(self.root / Bucket / Key, "rb")}
+
+    def delete_object(self, *, Bucket: str, Key: str) -> None:
+        (self.root / Bucket / Key).unlink(missing_ok=True)
+
+
+def blob_backend():
+    """Backend configurado para la app actual (se instancia una vez por app)."""
+    backend = current_app.extensions.get("blob_backend")
+    if backend is not None:
+        return backend
+
+    uploads_root = Path(current_app.instance_path) / "uploads"
+    if (current_app.config.get("STORAGE_BACKEND") or "local").lower() == "s3":
+        bucket = current_app.config.get("S3_BUCKET") or "estudia"
+        endpoint = current_app.config.get("S3_ENDPOINT_URL")
+        if boto3 is not None and endpoint:
+            client = boto3.client("s3", endpoint_url=endpoint)
+        else:
+            current_app.logger.info("S3 no configurado: usamos el stand-in local en %s", uploads_root / "s3")
+            client = LocalS3Client(uploads_root / "s3")
+        public_url = current_app.config.get("S3_PUBLIC_URL") or f"/uploads/s3/{bucket}"
+        backend = S3BlobBackend(client, bucket, public_url)
+    else:
+        backend = LocalBlobBackend(uploads_root / "blobs", "/uploads/blobs")
+
+    current_app.extensions["blob_backend"] = backend
+    return backend
+
+
+def save_upload(file_storage) -> dict | None:
+    """
+    Guarda un archivo subido de forma deduplicada: lo escribe por bloques a un temporal
+    mientras calcula su sha256 y, si ese contenido ya existía, sólo suma una referencia.
+    Devuelve la metadata que esperan AttachmentService / SubmissionService.
+    """
     if not file_storage or not file_storage.filename:
         return None
     filename = secure_filename(file_storage.filename)
     if not filename:
         return None
-    ext = Path(filename).suffix
-    storage_dir = Path(current_app.instance_path) / "uploads" / "logos"
-    storage_dir.mkdir(parents=True, exist_ok=True)
-    final_name = f"{uuid4().hex}{ext}"
-    file_path = storage_dir / final_name
-    file_storage.save(file_path)
-    return f"/uploads/logos/{final_name}"
+
+    backend = blob_backend()
+    staging_dir = Path(current_app.instance_path) / "uploads" / "tmp"
+    staging_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=staging_dir, delete=False) as staging:
+        staging_path = Path(staging.name)
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            staging.write(chunk)
+
+    try:
+        blob = _register_blob(
+            backend,
+            content_hash=digest.hexdigest(),
+            extension=Path(filename).suffix.lower(),
+            staging_path=staging_path,
+            mime_type=file_storage.mimetype,
+            size=size,
+        )
+    finally:
+        staging_path.unlink(missing_ok=True)
+
+    return {
+        "filename": filename,
+        "storage_path": blob.url,
+        "mime_type": file_storage.mimetype,
+        "file_size": size,
+    }
+
+
+def _register_blob(backend, *, content_hash: str, extension: str, staging_path: Path, mime_type, size: int):
+    """
+    Suma una referencia al blob de content_hash, creándolo si no existe. La fila se bloquea
+    (FOR UPDATE) para no competir con _purge_released_blobs, y el archivo se escribe recién
+    cuando la fila ya existe: si la transacción no se confirma, _end_blob_transaction lo borra.
+    """
+    session = db.session
+    blob = (
+        session.query(StoredBlob).filter_by(content_hash=content_hash).with_for_update().populate_existing().first()
+    )
+    if blob is not None:
+        bumped = session.query(StoredBlob).filter_by(id=blob.id).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count + 1},
+            synchronize_session=False,
+        )
+        if bumped:
+            if blob.ref_count <= 0 and not backend.exists(blob.storage_key):
+                # Fila en cero cuyo purgado quedó a medias: reponemos el archivo.
+                _write_blob(session, backend, blob.storage_key, staging_path, mime_type)
+            return blob
+        # La purgó otra transacción entre el SELECT y el UPDATE (SQLite ignora FOR UPDATE).
+        session.expunge(blob)
+
+    key = f"{content_hash[:2]}/{content_hash}{extension}"
+    try:
+        with session.begin_nested():
+            blob = StoredBlob(
+                content_hash=content_hash,
+                backend=backend.name,
+                storage_key=key,
+                url=backend.url(key),
+                mime_type=mime_type,
+                size=size,
+                ref_count=1,
+            )
+            session.add(blob)
+    except IntegrityError:
+        # Otra request registró el mismo contenido en paralelo: usamos esa fila (ya confirmada).
+        blob = session.query(StoredBlob).filter_by(content_hash=content_hash).with_for_update().one()
+        session.query(StoredBlob).filter_by(id=blob.id).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count + 1},
+            synchronize_session=False,
+        )
+        return blob
+
+    if not backend.exists(key):
+        _write_blob(session, backend, key, staging_path, mime_type)
+    return blob
+
+
+def _write_blob(session, backend, key: str, staging_path: Path, mime_type) -> None:
+    backend.put(key, staging_path, mime_type)
+    session.info.setdefault(_WRITTEN_KEYS, []).append((key, mime_type))
+
+
+def release_blob(url: str | None) -> None:
+    """
+    Resta una referencia al blob publicado en url; cuando llega a cero, la fila y el archivo
+    se borran después del commit (ver _purge_released_blobs).
+    URLs que no corresponden a un blob (archivos previos a la deduplicación) se ignoran.
+
+    Borrar adjuntos, sus registros padre o cambiar un logo ya libera la referencia
+    (ver _release_removed_references): esto queda para referencias sin fila propia.
+    """
+    _release(db.session, url)
+
+
+def _release(session, url: str | None) -> None:
+    if not url:
+        return
+    with session.no_autoflush:
+        blob = session.query(StoredBlob).filter_by(url=url).with_for_update().first()
+        if blob is None:
+            return
+        session.query(StoredBlob).filter_by(id=blob.id).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count - 1},
+            synchronize_session=False,
+        )
+        session.refresh(blob)
+    if blob.ref_count <= 0:
+        # La fila queda en cero hasta el commit: otra subida del mismo contenido puede
+        # revivirla, por eso el purgado vuelve a mirar ref_count antes de borrar el archivo.
+        session.info.setdefault(_RELEASED_BLOBS, []).append(blob.id)
+
+
+# Registros con adjuntos (Attachment.context_type): no hay FK, así que al borrarlos hay que
+# borrar sus adjuntos a mano para no dejar referencias colgadas.
+ATTACHMENT_PARENTS = {
+    **AttachmentLoader.CONTEXT_TYPES,
+    "TaskSubmission": "submission",
+}
+# Modelos cuyo logo_url puede apuntar a un blob.
+_LOGO_MODELS = (Institution, PlatformTheme)
+_RELEASED_BLOBS = "released_blob_ids"
+_WRITTEN_KEYS = "written_blob_keys"
+
+
+def _release_removed_references(session, flush_context, instances) -> None:
+    """before_flush: punto único donde se liberan los blobs de adjuntos y logos quitados."""
+    attachments = set()
+    urls = []
+    with session.no_autoflush:
+        for obj in list(session.deleted):
+            if isinstance(obj, Attachment):
+                attachments.add(obj)
+                continue
+            context_type = ATTACHMENT_PARENTS.get(type(obj).__name__)
+            if context_type is not None and obj.id is not None:
+                attachments.update(
+                    session.query(Attachment).filter_by(context_type=context_type, context_id=obj.id)
+                )
+            if isinstance(obj, _LOGO_MODELS):
+                urls.append(obj.logo_url)
+
+        for obj in session.dirty:
+            if isinstance(obj, _LOGO_MODELS):
+                history = inspect(obj).attrs.logo_url.history
+                if history.added:
+                    urls.extend(history.deleted)
+
+    for attachment in attachments:
+        if attachment not in session.deleted:
+            session.delete(attachment)
+        urls.append(attachment.storage_path)
+    for url in urls:
+        _release(session, url)
+
+
+def _commit_blob_transaction(session) -> None:
+    """after_commit: deriva los archivos nuevos y purga los blobs que quedaron sin referencias."""
+    if session.in_nested_transaction():
+        return
+    written = session.info.pop(_WRITTEN_KEYS, None)
+    released = session.info.pop(_RELEASED_BLOBS, None)
+    if not has_app_context() or not (written or released):
+        return
+    backend = blob_backend()
+    for key, mime_type in written or ():
+        ImageDerivativeService.schedule(backend, key, mime_type)
+    if released:
+        _purge_released_blobs(backend, released)
+
+
+def _purge_released_blobs(backend, blob_ids: list[int]) -> None:
+    """
+    Borra cada blob en su propia transacción, sólo si sigue en cero: el DELETE condicional
+    bloquea la fila, así que una subida concurrente o la revive antes (y no se borra nada)
+    o espera a que fila y archivo desaparezcan y los vuelve a crear.
+    """
+    table = StoredBlob.__table__
+    for blob_id in blob_ids:
+        with db.engine.begin() as connection:
+            storage_key = connection.execute(select(table.c.storage_key).where(table.c.id == blob_id)).scalar()
+            purged = connection.execute(delete(table).where(table.c.id == blob_id, table.c.ref_count <= 0))
+            if purged.rowcount:
+                backend.delete(storage_key)
+                ImageDerivativeService.delete(backend, storage_key)
+
+
+def _end_blob_transaction(session, transaction) -> None:
+    """
+    after_transaction_end: lo que quedó pendiente en la transacción externa no se confirmó
+    (rollback o close(), que no dispara after_rollback). Los archivos escritos por ella no
+    tienen fila que los referencie; las liberaciones se descartan.
+    """
+    if transaction.parent is not None:
+        return
+    written = session.info.pop(_WRITTEN_KEYS, None)
+    session.info.pop(_RELEASED_BLOBS, None)
+    if not written or not has_app_context():
+        return
+    backend = blob_backend()
+    table = StoredBlob.__table__
+    with db.engine.connect() as connection:
+        for key, _mime_type in written:
+            # Por las dudas: nunca borrar un archivo que alguna fila confirmada referencia.
+            if connection.execute(select(table.c.id).where(table.c.storage_key == key)).first() is None:
+                backend.delete(key)
+
+
+event.listen(Session, "before_flush", _release_removed_references)
+event.listen(Session, "after_commit", _commit_blob_transaction)
+event.listen(Session, "after_transaction_end", _end_blob_transaction)
+
+
+def save_logo(file_storage):
+    saved = save_upload(file_storage)
+    return saved["storage_path"] if saved else None
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import math
+from typing import Callable
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - fallback only when dependency missing
+    tiktoken = None
+
+
+TokenCounter = Callable[[str], int]
+
+
+class TokenEstimator:
+    """
+    Estima la cantidad de tokens de un texto para un modelo dado.
+    Usa el tokenizer registrado para el modelo (o tiktoken si está instalado) y, si no hay
+    ninguno disponible, una heurística por caracteres calibrada para texto en español.
+    """
+
+    CHARS_PER_TOKEN = 3.5
+
+    _registry: dict[str, TokenCounter] = {}
+
+    def __init__(self, counter: TokenCounter | None = None):
+        self._counter = counter
+
+    @classmethod
+    def register_tokenizer(cls, model_prefix: str, counter: TokenCounter) -> None:
+        """Registra un contador de tokens para los modelos cuyo nombre empieza con model_prefix."""
+        cls._registry[model_prefix.lower()] = counter
+
+    @classmethod
+    def for_model(cls, model: str | None) -> "TokenEstimator":
+        name = (model or "").lower()
+        matches = [prefix for prefix in cls._registry if name.startswith(prefix)]
+        if matches:
+            return cls(cls._registry[max(matches, key=len)])
+        if tiktoken is not None and name:
+            try:
+                encoding = tiktoken.encoding_for_model(name)
+            except KeyError:
+                encoding = None
+            if encoding is not None:
+                return cls(lambda text: len(encoding.encode(text)))
+        return cls()
+
+    @property
+    def is_heuristic(self) -> bool:
+        return self._counter is None
+
+    def count(self, text: str | None) -> int:
+        if not text:
+            return 0
+        if self._counter is not None:
+            return self._counter(text)
+        return math.ceil(len(text) / self.CHARS_PER_TOKEN)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from sqlalchemy import and_, exists, or_, true
+from sqlalchemy.orm import joinedload
+
+from models import Profile, RoleEnum, User
+from models.user import normalize_search_name
+
+
+class UserDirectoryService:
+    """
+    Directorio paginado de usuarios para /admin/usuarios.
+    Visibilidad, filtros y "puede gestionar" se resuelven en SQL sobre la página pedida,
+    así que el costo de cada render depende del tamaño de página y no del total de usuarios.
+    """
+
+    PAGE_SIZE = 50
+
+    @staticmethod
+    def page(
+        viewer: Profile,
+        *,
+        q: str | None = None,
+        role: RoleEnum | None = None,
+        institution_id: int | None = None,
+        limit: int = PAGE_SIZE,
+        after: list | None = None,
+    ) -> dict:
+        """
+        Usuarios ordenados por email con keyset (email, id) para `after`.
+        q busca por prefijo de email o de nombre (sin tildes) de alguno de sus perfiles;
+        role e institution_id exigen un perfil visible con ese rol / en esa institución.
+        Devuelve usuarios, perfiles visibles por usuario, ids gestionables y el próximo cursor.
+        """
+        is_owner = UserDirectoryService.is_owner(viewer)
+        scope = UserDirectoryService._visible_profile_filters(viewer, is_owner)
+
+        profile_filters = list(scope)
+        if role is not None:
+            profile_filters.append(Profile.role == role)
+        if institution_id is not None and is_owner:
+            profile_filters.append(Profile.institution_id == institution_id)
+
+        query = User.query.filter(exists().where(Profile.user_id == User.id, *profile_filters))
+
+        term = (q or "").strip().lower()
+        if term:
+            name_term = normalize_search_name(term)
+            name_match = exists().where(
+                Profile.user_id == User.id,
+                *profile_filters,
+                Profile.search_name >= name_term,
+                Profile.search_name < name_term + "\uffff",
+            )
+            query = query.filter(
+                or_(
+                    and_(User.email >= term, User.email < term + "\uffff"),
+                    name_match,
+                )
+            )
+
+        if after:
+            email, user_id = after
+            query = query.filter(
+                or_(User.email > email, and_(User.email == email, User.id > user_id))
+            )
+
+        # Gestionable = owner, o todos los perfiles del usuario están en la institución del viewer
+        # (misma regla que _can_manage_user, calculada en la misma query).
+        if is_owner:
+            manageable_column = true()
+        else:
+            manageable_column = ~exists().where(
+                Profile.user_id == User.id,
+                or_(
+                    Profile.institution_id.is_(None),
+                    Profile.institution_id != viewer.institution_id,
+                ),
+            )
+
+        rows = (
+            query.add_columns(manageable_column.label("manageable"))
+            .order_by(User.email.asc(), User.id.asc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_values = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_values = [rows[-1][0].email, rows[-1][0].id]
+
+        users = [user for user, _ in rows]
+        manageable = {user.id for user, can_manage in rows if can_manage}
+
+        profiles_by_user: dict[int, list[Profile]] = {user.id: [] for user in users}
+        if users:
+            profiles = (
+                Profile.query.filter(Profile.user_id.in_(list(profiles_by_user)), *scope)
+                .options(joinedload(Profile.institution))
+                .order_by(Profile.full_name.asc())
+                .all()
+            )
+            for profile in profiles:
+                profiles_by_user[profile.user_id].append(profile)
+
+        return {
+            "users": users,
+            "profiles_by_user": profiles_by_user,
+            "manageable": manageable,
+            "next": next_values,
+        }
+
+    @staticmethod
+    def is_owner(viewer: Profile | None) -> bool:
+        return bool(viewer and viewer.role and viewer.role.name == "ADMIN")
+
+    # -----------------
+    # Helpers internos
+    # -----------------
+
+    @staticmethod
+    def _visible_profile_filters(viewer: Profile, is_owner: bool) -> list:
+        if is_owner:
+            return []
+        # Un admin de colegio ve los perfiles de su institución, salvo los ADMIN de plataforma.
+        return [
+            Profile.institution_id == viewer.institution_id,
+            Profile.role != RoleEnum.ADMIN,
+        ]
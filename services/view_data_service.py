@@ -2,7 +2,12 @@ from __future__ import annotations
 
 from datetime import date, timedelta
 
-from sqlalchemy import asc, desc
+from sqlalchemy import and_, asc, desc, or_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+
+from extensions import replica_reads
+from services.attachment_loader import AttachmentLoader
+from services.fragment_cache import FragmentCache
 
 from models import (
     Lesson,
@@ -22,48 +27,62 @@ class ViewDataService:
     Centraliza queries y evita repetir lógica en app.py.
     """
 
+    # Cantidad de clases que el dashboard precarga en los selectores; el resto se pide por API.
+    DASHBOARD_LESSON_OPTIONS = 20
+    DASHBOARD_TOP_N = 5
+
     @staticmethod
     def teacher_dashboard(profile: Profile) -> dict:
+        """
+        Resumen acotado del panel docente: contadores y top-N resueltos en SQL, sin importar
+        cuántas clases o tareas acumuló el profesor. Los listados completos se paginan con
+        teacher_lessons_page / teacher_tasks_page (ver api/dashboard.py).
+        """
         lessons_query = Lesson.query.filter_by(teacher_profile_id=profile.id)
         today = date.today()
         week_limit = today + timedelta(days=7)
+        top_n = ViewDataService.DASHBOARD_TOP_N
 
         clases_hoy = (
             lessons_query.filter(Lesson.class_date == date.today())
             .order_by(asc(Lesson.start_time))
-            .limit(5)
+            .limit(top_n)
             .all()
         )
-        todas_las_clases = lessons_query.order_by(desc(Lesson.class_date)).all()
-        lessons_upcoming = (
-            lessons_query.filter(Lesson.class_date >= today)
+        lessons_recent, lessons_next = ViewDataService.teacher_lessons_page(
+            profile, limit=ViewDataService.DASHBOARD_LESSON_OPTIONS
+        )
+        # Los bloques que el template cachea por fragmento se consultan sólo si se renderizan.
+        lessons_upcoming = FragmentCache.lazy(
+            lambda: lessons_query.filter(Lesson.class_date >= today)
             .order_by(asc(Lesson.class_date), asc(Lesson.start_time))
-            .limit(5)
+            .limit(top_n)
             .all()
         )
         lessons_week = (
             lessons_query.filter(Lesson.class_date.between(today, week_limit)).count()
         )
 
-        tasks = (
-            Task.query.join(Lesson)
-            .filter(Lesson.teacher_profile_id == profile.id)
-            .order_by(asc(Task.due_date))
+        teacher_tasks = Task.query.join(Lesson).filter(Lesson.teacher_profile_id == profile.id)
+        # Mismo orden que antes se hacía en Python: por fecha de entrega y las sin fecha al final.
+        tasks_upcoming = FragmentCache.lazy(
+            lambda: teacher_tasks.options(contains_eager(Task.lesson))
+            .order_by(Task.due_date.is_(None), asc(Task.due_date), asc(Task.id))
+            .limit(top_n)
             .all()
         )
-        tasks_upcoming = sorted(
-            tasks,
-            key=lambda task: ((task.due_date or date.max)),
-        )[:5]
-        tasks_active = sum(
-            1
-            for task in tasks
-            if task.due_date is None or task.due_date >= today
-        )
+        tasks_active = teacher_tasks.filter(
+            or_(Task.due_date.is_(None), Task.due_date >= today)
+        ).count()
 
         submissions = (
             TaskSubmission.query.join(Task)
             .filter(Task.lesson.has(teacher_profile_id=profile.id))
+            .options(
+                contains_eager(TaskSubmission.task),
+                joinedload(TaskSubmission.student),
+                selectinload(TaskSubmission.evidences),
+            )
             .order_by(TaskSubmission.submitted_at.desc())
             .limit(10)
             .all()
@@ -78,8 +97,8 @@ class ViewDataService:
             .count()
         )
 
-        students = (
-            Profile.query.filter_by(
+        students = FragmentCache.lazy(
+            lambda: Profile.query.filter_by(
                 institution_id=profile.institution_id, role=RoleEnum.ALUMNO
             )
             .order_by(Profile.full_name.asc())
@@ -105,15 +124,13 @@ class ViewDataService:
             .all()
         )
 
-        overdue_tasks = (
-            Task.query.join(Lesson)
-            .filter(
-                Lesson.teacher_profile_id == profile.id,
-                Task.due_date.isnot(None),
-                Task.due_date < today,
-            )
-            .count()
-        )
+        # El dashboard muestra los adjuntos de la bitácora y de los mensajes recientes.
+        AttachmentLoader.preload(bitacora_entries, recent_messages)
+
+        overdue_tasks = teacher_tasks.filter(
+            Task.due_date.isnot(None),
+            Task.due_date < today,
+        ).count()
         alerts = []
         if overdue_tasks:
             alerts.append(f"{overdue_tasks} tareas vencidas pendientes de cierre.")
@@ -124,9 +141,9 @@ class ViewDataService:
 
         return {
             "clases_hoy": clases_hoy,
-            "lessons": todas_las_clases,
+            "lessons": lessons_recent,
+            "lessons_next": lessons_next,
             "lessons_upcoming": lessons_upcoming,
-            "tasks": tasks,
             "tasks_upcoming": tasks_upcoming,
             "submissions": submissions,
             "students": students,
@@ -141,6 +158,66 @@ class ViewDataService:
             "alerts": alerts,
         }
 
+    @staticmethod
+    def teacher_lessons_page(profile: Profile, *, limit: int, after: list | None = None) -> tuple[list, list | None]:
+        """
+        Clases del profesor, de la más reciente a la más vieja, paginadas por (class_date, id).
+        Devuelve (clases, cursor de la próxima página o None).
+        """
+        query = Lesson.query.filter_by(teacher_profile_id=profile.id)
+        if after:
+            class_date, lesson_id = date.fromisoformat(after[0]), after[1]
+            query = query.filter(
+                or_(
+                    Lesson.class_date < class_date,
+                    and_(Lesson.class_date == class_date, Lesson.id < lesson_id),
+                )
+            )
+        lessons = query.order_by(desc(Lesson.class_date), desc(Lesson.id)).limit(limit + 1).all()
+        if len(lessons) <= limit:
+            return lessons, None
+        lessons = lessons[:limit]
+        return lessons, [lessons[-1].class_date.isoformat(), lessons[-1].id]
+
+    @staticmethod
+    def teacher_tasks_page(profile: Profile, *, limit: int, after: list | None = None) -> tuple[list, list | None]:
+        """
+        Tareas de las clases del profesor por fecha de entrega (las sin fecha al final),
+        paginadas por (sin_fecha, due_date, id).
+        """
+        query = (
+            Task.query.join(Lesson)
+            .filter(Lesson.teacher_profile_id == profile.id)
+            .options(contains_eager(Task.lesson))
+        )
+        if after:
+            without_date, due_date, task_id = after
+            if without_date:
+                query = query.filter(Task.due_date.is_(None), Task.id > task_id)
+            else:
+                due_date = date.fromisoformat(due_date)
+                query = query.filter(
+                    or_(
+                        Task.due_date.is_(None),
+                        Task.due_date > due_date,
+                        and_(Task.due_date == due_date, Task.id > task_id),
+                    )
+                )
+        tasks = (
+            query.order_by(Task.due_date.is_(None), asc(Task.due_date), asc(Task.id))
+            .limit(limit + 1)
+            .all()
+        )
+        if len(tasks) <= limit:
+            return tasks, None
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        return tasks, [
+            last.due_date is None,
+            last.due_date.isoformat() if last.due_date else None,
+            last.id,
+        ]
+
     @staticmethod
     def student_portal(profile: Profile) -> dict:
         tasks_query = Task.query.filter_by(institution_id=profile.institution_id)
@@ -162,6 +239,7 @@ class ViewDataService:
             .limit(5)
             .all()
         )
+        AttachmentLoader.preload(bitacora_entries)
 
         return {
             "tasks": tasks,
@@ -184,6 +262,7 @@ class ViewDataService:
 
         lessons = lessons_query.order_by(desc(Lesson.class_date)).all()
         tasks = tasks_query.order_by(asc(Task.due_date)).all()
+        AttachmentLoader.preload(tasks)
 
         can_create = profile.role in (
             RoleEnum.PROFESOR,
@@ -201,12 +280,22 @@ class ViewDataService:
 
     @staticmethod
     def psico_dashboard(profile: Profile) -> dict:
-        students = (
-            Profile.query.filter_by(institution_id=profile.institution_id, role=RoleEnum.ALUMNO)
-            .order_by(Profile.full_name.asc())
-            .all()
+        # Ambos listados se resuelven al renderizarse (con el fragmento en cache no hay queries),
+        # fuera de esta función: cada uno abre su propio bloque de lecturas en réplica.
+        students = FragmentCache.lazy(
+            replica_reads()(
+                lambda: Profile.query.filter_by(institution_id=profile.institution_id, role=RoleEnum.ALUMNO)
+                .order_by(Profile.full_name.asc())
+                .all()
+            )
+        )
+        student_cards = FragmentCache.lazy(
+            replica_reads()(lambda: ViewDataService._psico_student_cards(profile, students))
         )
+        return {"students": student_cards, "student_choices": students}
 
+    @staticmethod
+    def _psico_student_cards(profile: Profile, students) -> list[dict]:
         student_cards = []
         for student in students:
             submissions = (
@@ -241,5 +330,4 @@ class ViewDataService:
                     "pending_tasks": pending_tasks,
                 }
             )
-
-        return {"students": student_cards, "student_choices": students}
+        return student_cards
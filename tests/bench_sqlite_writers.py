@@ -0,0 +1,138 @@
+"""
+Contención de escrituras en SQLite con y sin el perfil de producción (SQLitePragmas).
+
+Durante --seconds corren --writers hilos que insertan un AICallLog y actualizan una fila
+caliente (un contador) por transacción, y --readers hilos con consultas agregadas (GROUP BY).
+Se reportan escrituras/s, lecturas/s, latencia de escritura (p50/p99) y errores
+"database is locked", primero con SQLITE_PRODUCTION_MODE=0 y luego con 1.
+
+Uso (desde la raíz del repo):
+    python tests/bench_sqlite_writers.py
+    python tests/bench_sqlite_writers.py --writers 12 --readers 8 --seconds 10
+
+Motor: SQLite en un archivo temporal por modo. Cada modo corre en un subproceso porque la
+configuración se lee al importar config.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(mode: str, writers: int, readers: int, seconds: float) -> None:
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import func, update
+    from sqlalchemy.exc import OperationalError
+
+    from app import app
+    from extensions import db
+    from models import AICallLog
+
+    with app.app_context():
+        db.create_all()
+        counter = AICallLog(call_site="contador")
+        db.session.add(counter)
+        db.session.commit()
+        counter_id = counter.id
+
+    deadline = time.perf_counter() + seconds
+    write_latencies: list[float] = []
+    reads = [0]
+    locked = [0]
+    lock = threading.Lock()
+
+    def writer(number: int) -> None:
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    db.session.add(AICallLog(call_site=f"writer-{number}", latency_ms=number))
+                    db.session.execute(
+                        update(AICallLog).where(AICallLog.id == counter_id).values(latency_ms=AICallLog.latency_ms + 1)
+                    )
+                    db.session.commit()
+                except OperationalError:
+                    db.session.rollback()
+                    with lock:
+                        locked[0] += 1
+                    continue
+                with lock:
+                    write_latencies.append(time.perf_counter() - started)
+            db.session.remove()
+
+    def reader() -> None:
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                db.session.query(AICallLog.call_site, func.count(), func.avg(AICallLog.latency_ms)).group_by(
+                    AICallLog.call_site
+                ).all()
+                db.session.rollback()
+                with lock:
+                    reads[0] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(write_latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(
+        f"SQLITE_PRODUCTION_MODE={mode}: {len(latencies) / seconds:.0f} escrituras/s, {reads[0] / seconds:.0f} lecturas/s, "
+        f"escritura p50 {statistics.median(latencies or [0]) * 1000:.1f} ms, p99 {p99 * 1000:.0f} ms, "
+        f"{locked[0]} 'database is locked'"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=6)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--run", metavar="MODE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.writers, args.readers, args.seconds)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="estudia-bench-") as tmp_dir:
+        for mode in ("0", "1"):
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, f'writers-{mode}.db')}",
+                "SQLITE_PRODUCTION_MODE": mode,
+                "AI_PROVIDER": "heuristic",
+                "FRAGMENT_CACHE_ENABLED": "0",
+                "AI_TELEMETRY_ENABLED": "0",
+            }
+            env.pop("DATABASE_REPLICA_URL", None)
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--run",
+                mode,
+                "--writers",
+                str(args.writers),
+                "--readers",
+                str(args.readers),
+                "--seconds",
+                str(args.seconds),
+            ]
+            subprocess.run(command, env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark del panel docente con un profesor cargado: 5.000 clases y 10.000 tareas propias
+más 3.000 clases de otro profesor de la misma institución.
+
+Mide GET /profe (tiempo y tamaño del HTML), las consultas de ViewDataService.teacher_dashboard
+y el recorrido completo de /api/dashboard/clases y /api/dashboard/tareas por cursor
+(verificando que no haya repetidos ni faltantes).
+
+Uso (desde la raíz del repo):
+    python tests/bench_teacher_dashboard.py
+    python tests/bench_teacher_dashboard.py --lessons 20000 --tasks-per-lesson 3
+
+Motor: SQLite en un archivo temporal (DATABASE_URL se fija antes de importar la app).
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=5_000)
+    parser.add_argument("--tasks-per-lesson", type=int, default=2)
+    parser.add_argument("--other-lessons", type=int, default=3_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="estudia-bench-")
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ["AI_PROVIDER"] = "heuristic"
+    os.environ["FRAGMENT_CACHE_ENABLED"] = "0"
+    os.environ["AI_TELEMETRY_ENABLED"] = "0"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import event, insert
+
+    from app import app
+    from extensions import db
+    from models import Institution, Lesson, Profile, RoleEnum, Task, User
+    from services.view_data_service import ViewDataService
+
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        institution = Institution(name="Bench")
+        db.session.add(institution)
+        db.session.flush()
+        profiles = []
+        for number in range(2):
+            user = User(email=f"profe{number}@example.com")
+            db.session.add(user)
+            db.session.flush()
+            profile = Profile(user_id=user.id, institution_id=institution.id, role=RoleEnum.PROFESOR, full_name=f"Profe {number}")
+            db.session.add(profile)
+            profiles.append(profile)
+        db.session.commit()
+        teacher, other = profiles
+
+        start = date(2020, 3, 1)
+        lesson_rows = [
+            {
+                "institution_id": institution.id,
+                "teacher_profile_id": teacher_id,
+                "title": f"Clase {number}",
+                "class_date": start + timedelta(days=number // 3),
+            }
+            for teacher_id, count in ((teacher.id, args.lessons), (other.id, args.other_lessons))
+            for number in range(count)
+        ]
+        db.session.execute(insert(Lesson), lesson_rows)
+        lesson_ids = [row.id for row in db.session.query(Lesson.id).filter_by(teacher_profile_id=teacher.id)]
+        task_rows = [
+            {
+                "institution_id": institution.id,
+                "lesson_id": lesson_id,
+                "title": f"Tarea {lesson_id}.{number}",
+                "due_date": None if (lesson_id + number) % 11 == 0 else start + timedelta(days=(lesson_id * 7 + number) % 1500),
+            }
+            for lesson_id in lesson_ids
+            for number in range(args.tasks_per_lesson)
+        ]
+        db.session.execute(insert(Task), task_rows)
+        db.session.commit()
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *parts: statements.append(parts[2]))
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(teacher.user_id)
+            session["_fresh"] = True
+
+        timings, size = [], 0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.get("/profe")
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            size = len(response.data)
+        print(f"GET /profe: mediana {statistics.median(timings) * 1000:.0f} ms, {size / 1024:.0f} KB de HTML")
+
+        statements.clear()
+        started = time.perf_counter()
+        ViewDataService.teacher_dashboard(db.session.get(Profile, teacher.id))
+        elapsed = time.perf_counter() - started
+        print(f"teacher_dashboard: {len(statements)} consultas, {elapsed * 1000:.0f} ms")
+
+        for url, key, expected in (
+            ("/api/dashboard/clases", "clases", args.lessons),
+            ("/api/dashboard/tareas", "tareas", len(task_rows)),
+        ):
+            ids, cursor, pages = [], None, 0
+            started = time.perf_counter()
+            while True:
+                query = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+                payload = client.get(url, query_string=query).get_json()
+                ids.extend(row["id"] for row in payload[key])
+                pages += 1
+                cursor = payload["next_cursor"]
+                if cursor is None:
+                    break
+            elapsed = time.perf_counter() - started
+            assert len(ids) == len(set(ids)) == expected, (url, len(ids), len(set(ids)), expected)
+            print(f"{url}: {len(ids)} filas en {pages} páginas, {elapsed * 1000 / pages:.1f} ms por página")
+
+
+if __name__ == "__main__":
+    main()
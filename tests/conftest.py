@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# La configuración se lee al importar config.py: el entorno de prueba va antes de importar la app.
+_TMP_DIR = tempfile.mkdtemp(prefix="estudia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["AI_PROVIDER"] = "heuristic"
+os.environ["FRAGMENT_CACHE_ENABLED"] = "0"
+os.environ["AI_TELEMETRY_ENABLED"] = "0"
+for _var in ("AI_API_KEY", "OPENAI_API_KEY", "AI_PROVIDER_CHAIN", "DATABASE_REPLICA_URL", "FRAGMENT_CACHE_REDIS_URL"):
+    os.environ.pop(_var, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Institution, Profile, RoleEnum, User  # noqa: E402
+
+
+@pytest.fixture()
+def app():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        db.create_all()
+        try:
+            yield flask_app
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def institution(app):
+    institution = Institution(name="Colegio de prueba")
+    db.session.add(institution)
+    db.session.commit()
+    return institution
+
+
+@pytest.fixture()
+def make_profile(app):
+    """make_profile(institution, role, full_name) -> Profile (con su User)."""
+    counter = iter(range(1, 10_000))
+
+    def factory(institution, role: RoleEnum, full_name: str | None = None) -> Profile:
+        number = next(counter)
+        user = User(email=f"{role.value.lower()}{number}@example.com")
+        db.session.add(user)
+        db.session.flush()
+        profile = Profile(
+            user_id=user.id,
+            institution_id=institution.id if institution else None,
+            role=role,
+            full_name=full_name or f"{role.value.title()} {number}",
+        )
+        db.session.add(profile)
+        db.session.commit()
+        return profile
+
+    return factory
+
+
+def login(client, profile: Profile) -> None:
+    with client.session_transaction() as session:
+        session["_user_id"] = str(profile.user_id)
+        session["_fresh"] = True
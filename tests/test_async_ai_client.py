@@ -0,0 +1,251 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from urllib import request as urlrequest
+
+import pytest
+
+from services import AsyncAIClient
+from services.ai_providers import AIProviderHealth
+
+
+class StubServer:
+    """
+    Servidor compatible con /v1/chat/completions en un event loop propio (hilo aparte).
+    El prompt elige la respuesta: [id=N] se devuelve como texto, [delay=S] demora la
+    respuesta, [status=500] responde con error y [chunked] usa Transfer-Encoding: chunked.
+    Las respuestas normales dejan la conexión abierta (keep-alive) hasta que el cliente cierra.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait(5)
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _shutdown(self) -> None:
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.requests += 1
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            length = int(re.search(r"(?i)content-length: (\d+)", head).group(1))
+            body = json.loads(await reader.readexactly(length))
+            prompt = " ".join(message["content"] for message in body["messages"])
+
+            delay = re.search(r"\[delay=([\d.]+)\]", prompt)
+            if delay:
+                await asyncio.sleep(float(delay.group(1)))
+            if "[status=500]" in prompt:
+                payload = b'{"error": "boom"}'
+                writer.write(b"HTTP/1.1 500 Internal Server Error\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+                return
+
+            marker = re.search(r"\[id=(\w+)\]", prompt)
+            text = f"respuesta {marker.group(1) if marker else '?'}"
+            payload = json.dumps({"model": "stub-model", "choices": [{"message": {"content": text}}]}).encode()
+            if "[chunked]" in prompt:
+                writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+                for start in range(0, len(payload), 7):
+                    chunk = payload[start : start + 7]
+                    writer.write(b"%x;ext=1\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+                return
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\nConnection: keep-alive\r\n\r\n" % len(payload) + payload)
+            await writer.drain()
+            # Keep-alive: no cerramos; el cliente tiene que cortar tras Content-Length bytes.
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture()
+def client(app, stub_server, monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("AI_API_KEY", "test-key")
+    monkeypatch.setenv("AI_API_BASE", f"http://127.0.0.1:{stub_server.port}/v1")
+    monkeypatch.setenv("AI_TIMEOUT", "3")
+    monkeypatch.setenv("AI_HEDGE_ENABLED", "0")
+    monkeypatch.setenv("AI_BREAKER_FAILURES", "100")
+    # Salud de endpoints limpia: los fallos de un test no abren el circuito del siguiente.
+    monkeypatch.setattr(AIProviderHealth, "_registry", {})
+    return AsyncAIClient()
+
+
+def test_results_keep_request_order(client):
+    # Tres a la vez: el cupo por institución de AIScheduler (AI_INSTITUTION_CONCURRENCY).
+    delays = [0.6, 0.3, 0.0]
+    completed = []
+    requests = [{"prompt": f"[id={index}] [delay={delay}]", "context": {}} for index, delay in enumerate(delays)]
+
+    results = client.generate_many(requests, concurrency=len(requests), on_result=lambda index, _: completed.append(index))
+
+    assert [result["text"] for result in results] == [f"respuesta {index}" for index in range(len(delays))]
+    # on_result llega a medida que terminan: la más rápida primero.
+    assert completed == [2, 1, 0]
+
+
+def test_concurrency_limit_is_respected(client):
+    requests = [{"prompt": f"[id={index}] [delay=0.2]", "context": {}} for index in range(4)]
+
+    started = time.perf_counter()
+    results = client.generate_many(requests, concurrency=2)
+    elapsed = time.perf_counter() - started
+
+    assert [result["text"] for result in results] == [f"respuesta {index}" for index in range(4)]
+    assert 0.4 <= elapsed < 2.0
+
+
+def test_keep_alive_response_does_not_hang(client):
+    started = time.perf_counter()
+    result = client.run_sync(client.agenerate("[id=ka]", {}))
+
+    assert result["text"] == "respuesta ka"
+    assert result["model"] == "stub-model"
+    assert time.perf_counter() - started < 1.0
+
+
+def test_chunked_response_is_decoded(client):
+    result = client.run_sync(client.agenerate("[id=chunks] [chunked]", {}))
+
+    assert result["text"] == "respuesta chunks"
+    assert result["provider"] == "openai"
+
+
+def test_server_error_falls_back_to_heuristic(client, stub_server):
+    result = client.run_sync(client.agenerate("[status=500]", {}))
+
+    assert result["model"] == "heuristic"
+    assert stub_server.requests == 1
+
+
+def test_timeout_falls_back_to_heuristic(client, monkeypatch):
+    monkeypatch.setenv("AI_TIMEOUT", "0.3")
+    client = AsyncAIClient()
+
+    started = time.perf_counter()
+    result = client.run_sync(client.agenerate("[delay=2]", {}))
+
+    assert result["model"] == "heuristic"
+    assert time.perf_counter() - started < 1.5
+
+
+def test_failures_in_batch_do_not_affect_other_results(client):
+    requests = [
+        {"prompt": "[id=a]", "context": {}},
+        {"prompt": "[status=500]", "context": {}},
+        {"prompt": "[id=c] [chunked]", "context": {}},
+    ]
+
+    results = client.generate_many(requests, concurrency=3)
+
+    assert [result["model"] for result in results] == ["stub-model", "heuristic", "stub-model"]
+    assert results[2]["text"] == "respuesta c"
+
+
+def test_requests_honor_http_proxy(client, stub_server, monkeypatch):
+    # El stub hace de proxy: el endpoint configurado no resuelve, sólo se llega vía HTTP_PROXY.
+    monkeypatch.setenv("AI_API_BASE", "http://api.ejemplo.invalid/v1")
+    monkeypatch.setenv("HTTP_PROXY", f"http://127.0.0.1:{stub_server.port}")
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    monkeypatch.delenv("no_proxy", raising=False)
+    # urllib arma su opener (y lee los proxies del entorno) una sola vez por proceso.
+    monkeypatch.setattr(urlrequest, "_opener", None)
+
+    results = AsyncAIClient().generate_many([{"prompt": "[id=proxy]", "context": {}}])
+
+    assert results[0]["text"] == "respuesta proxy"
+    assert stub_server.requests == 1
+
+
+def test_cancel_skips_requests_not_started(client, stub_server):
+    cancel = threading.Event()
+    requests = [{"prompt": f"[id={index}]", "context": {}} for index in range(4)]
+
+    results = client.generate_many(requests, concurrency=1, on_result=lambda index, _: cancel.set(), cancel=cancel)
+
+    assert results[0]["text"] == "respuesta 0"
+    assert all(isinstance(result, RuntimeError) for result in results[1:])
+    assert stub_server.requests == 1
+
+
+def test_closing_suggestions_stream_cancels_pending_areas(client, stub_server, institution, monkeypatch):
+    import app as app_module
+    from types import SimpleNamespace
+
+    from extensions import db
+    from models import PlanFragment
+
+    monkeypatch.setitem(app_module.app.config, "OBJECTIVE_SUGGESTIONS_CONCURRENCY", 1)
+    monkeypatch.setattr(app_module, "_parse_ai_objectives", lambda text: [{"objetivo": text}])
+    plan = SimpleNamespace(institution_id=institution.id, name="Plan", year=2026, jurisdiction=None)
+    area_map = {
+        f"Área {index}": [SimpleNamespace(content_text=f"[id={index}] [delay=0.2] contenidos")] for index in range(4)
+    }
+
+    areas = app_module._ai_suggestions_by_area(
+        institution=institution,
+        plan=plan,
+        document=SimpleNamespace(id=1),
+        grade=SimpleNamespace(id=1, name="3°"),
+        area_map=area_map,
+    )
+    area_name, suggestions = next(areas)
+    areas.close()
+    time.sleep(1.0)
+
+    # La segunda área pudo haber arrancado antes del close; las demás ya no se piden.
+    assert stub_server.requests <= 2
+    assert suggestions[0]["objetivo"].startswith("respuesta")
+    # Lo que ya llegó queda en cache aunque el stream se haya cortado.
+    assert db.session.query(PlanFragment).filter_by(institution_id=institution.id).count() == 1
+
+
+def test_breaker_is_per_endpoint_url_and_model(monkeypatch):
+    from services.ai_providers import AIEndpoint
+
+    monkeypatch.setattr(AIProviderHealth, "_registry", {})
+    default = AIEndpoint("openai", "https://api.openai.com/v1", "key", "gpt-4o-mini")
+    other_model = default._replace(model="gpt-4o")
+    other_base = default._replace(api_base="https://proxy.colegio.example/v1")
+
+    broken = AIProviderHealth.for_endpoint(default)
+    for _ in range(broken.failure_threshold):
+        broken.record_failure("HTTP 500")
+
+    assert not AIProviderHealth.for_endpoint(default).allow()
+    assert AIProviderHealth.for_endpoint(other_model).allow()
+    assert AIProviderHealth.for_endpoint(other_base).allow()
+    assert len(AIProviderHealth.stats()) == 3
@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event
+
+from conftest import login
+from extensions import db
+from models import (
+    Attachment,
+    BitacoraEntrada,
+    Lesson,
+    Message,
+    MessageThread,
+    MessageThreadParticipant,
+    RoleEnum,
+    Task,
+)
+
+ROWS = 4
+
+
+@contextmanager
+def _attachment_queries():
+    """Junta las consultas que leen la tabla attachment mientras dura el bloque."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM attachment" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _attach(context_type: str, context_id: int, filename: str, profile) -> None:
+    db.session.add(
+        Attachment(
+            context_type=context_type,
+            context_id=context_id,
+            filename=filename,
+            storage_path=f"/uploads/blobs/aa/{filename}",
+            uploaded_by_profile_id=profile.id,
+        )
+    )
+
+
+def test_tasks_list_loads_attachments_in_one_query(client, institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    lesson = Lesson(institution_id=institution.id, teacher_profile_id=teacher.id, title="Fracciones", class_date=date.today())
+    db.session.add(lesson)
+    db.session.flush()
+    for number in range(ROWS):
+        task = Task(institution_id=institution.id, lesson_id=lesson.id, title=f"Tarea {number}")
+        db.session.add(task)
+        db.session.flush()
+        _attach("task", task.id, f"tarea-{number}.pdf", teacher)
+    db.session.commit()
+    login(client, teacher)
+    db.session.expunge_all()
+
+    with _attachment_queries() as statements:
+        response = client.get("/tareas")
+
+    assert response.status_code == 200
+    for number in range(ROWS):
+        assert f"tarea-{number}.pdf" in response.get_data(as_text=True)
+    assert len(statements) == 1
+
+
+def test_student_portal_loads_bitacora_attachments_in_one_query(client, institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    for number in range(ROWS):
+        entry = BitacoraEntrada(
+            institution_id=institution.id,
+            student_profile_id=student.id,
+            author_profile_id=teacher.id,
+            nota=f"Registro {number}",
+            visible_para_alumno=True,
+        )
+        db.session.add(entry)
+        db.session.flush()
+        _attach("bitacora", entry.id, f"registro-{number}.pdf", teacher)
+    db.session.commit()
+    login(client, student)
+    db.session.expunge_all()
+
+    with _attachment_queries() as statements:
+        response = client.get("/alumno/portal")
+
+    assert response.status_code == 200
+    for number in range(ROWS):
+        assert f"registro-{number}.pdf" in response.get_data(as_text=True)
+    assert len(statements) == 1
+
+
+def test_teacher_dashboard_loads_attachments_once_per_context(client, institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    thread = MessageThread(subject="Consultas")
+    db.session.add(thread)
+    db.session.flush()
+    db.session.add(MessageThreadParticipant(thread_id=thread.id, profile_id=teacher.id))
+    for number in range(ROWS):
+        entry = BitacoraEntrada(
+            institution_id=institution.id,
+            student_profile_id=student.id,
+            author_profile_id=teacher.id,
+            nota=f"Registro {number}",
+        )
+        message = Message(thread_id=thread.id, sender_profile_id=student.id, text=f"Mensaje {number}")
+        db.session.add_all([entry, message])
+        db.session.flush()
+        _attach("bitacora", entry.id, f"registro-{number}.pdf", teacher)
+        _attach("message", message.id, f"mensaje-{number}.png", student)
+    db.session.commit()
+    login(client, teacher)
+    db.session.expunge_all()
+
+    with _attachment_queries() as statements:
+        response = client.get("/profe")
+
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    for number in range(ROWS):
+        assert f"registro-{number}.pdf" in html
+        assert f"mensaje-{number}.png" in html
+    # Un IN por tipo de contexto (bitácora y mensajes), no una consulta por fila.
+    assert len(statements) == 2
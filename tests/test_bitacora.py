@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from api.utils.pagination import encode_cursor
+from conftest import login
+from models import RoleEnum
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        encode_cursor(datetime(2025, 3, 1, 10, 0)),
+        encode_cursor(datetime(2025, 3, 1, 10, 0), 5, 9),
+        encode_cursor(datetime(2025, 3, 1, 10, 0), "5"),
+        encode_cursor(datetime(2025, 3, 1, 10, 0), None),
+        encode_cursor(12, 5),
+        "no-es-base64!",
+    ],
+)
+def test_malformed_cursor_returns_400(client, institution, make_profile, cursor):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    login(client, teacher)
+
+    response = client.get(f"/api/bitacora/{student.id}", query_string={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "cursor inválido"}
+
+
+def test_valid_cursor_is_accepted(client, institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    login(client, teacher)
+
+    cursor = encode_cursor(datetime(2025, 3, 1, 10, 0), 5)
+    response = client.get(f"/api/bitacora/{student.id}", query_string={"cursor": cursor})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"entradas": [], "next_cursor": None}
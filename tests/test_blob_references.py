@@ -0,0 +1,165 @@
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from extensions import db
+from models import Attachment, BitacoraEntrada, RoleEnum, StoredBlob
+from services import save_logo, save_upload
+from services.storage_service import LocalBlobBackend
+
+
+@pytest.fixture()
+def backend(app, tmp_path, monkeypatch):
+    backend = LocalBlobBackend(tmp_path / "blobs", "/uploads/blobs")
+    monkeypatch.setitem(app.extensions, "blob_backend", backend)
+    monkeypatch.setattr(app, "instance_path", str(tmp_path))
+    return backend
+
+
+def _upload(content: bytes, filename: str = "informe.pdf") -> FileStorage:
+    return FileStorage(stream=io.BytesIO(content), filename=filename, content_type="application/pdf")
+
+
+def _attach(context_type: str, context_id: int, content: bytes) -> Attachment:
+    saved = save_upload(_upload(content))
+    attachment = Attachment(context_type=context_type, context_id=context_id, **saved)
+    db.session.add(attachment)
+    db.session.commit()
+    return attachment
+
+
+def _blob(url: str) -> StoredBlob | None:
+    db.session.expire_all()
+    return StoredBlob.query.filter_by(url=url).first()
+
+
+@pytest.fixture()
+def entrada(institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    entrada = BitacoraEntrada(
+        institution_id=institution.id,
+        student_profile_id=student.id,
+        author_profile_id=teacher.id,
+        nota="Nota",
+    )
+    db.session.add(entrada)
+    db.session.commit()
+    return entrada
+
+
+def test_deleting_attachment_releases_blob(backend, entrada):
+    first = _attach("bitacora", entrada.id, b"mismo contenido")
+    second = _attach("bitacora", entrada.id, b"mismo contenido")
+    url = first.storage_path
+    key = _blob(url).storage_key
+    assert _blob(url).ref_count == 2
+
+    db.session.delete(first)
+    db.session.commit()
+    assert _blob(url).ref_count == 1
+    assert backend.exists(key)
+
+    db.session.delete(second)
+    db.session.commit()
+    assert _blob(url) is None
+    assert not backend.exists(key)
+
+
+def test_deleting_parent_removes_its_attachments(backend, entrada):
+    attachment = _attach("bitacora", entrada.id, b"adjunto de la entrada")
+    url = attachment.storage_path
+
+    db.session.delete(entrada)
+    db.session.commit()
+
+    assert Attachment.query.count() == 0
+    assert _blob(url) is None
+
+
+def test_rollback_keeps_file(backend, entrada):
+    attachment = _attach("bitacora", entrada.id, b"contenido")
+    key = _blob(attachment.storage_path).storage_key
+
+    db.session.delete(attachment)
+    db.session.flush()
+    db.session.rollback()
+
+    assert _blob(attachment.storage_path).ref_count == 1
+    assert backend.exists(key)
+
+
+def test_replacing_logo_releases_previous(backend, institution):
+    institution.logo_url = save_logo(_upload(b"logo viejo", "logo.png"))
+    db.session.commit()
+    old_url = institution.logo_url
+
+    institution.logo_url = save_logo(_upload(b"logo nuevo", "logo.png"))
+    db.session.commit()
+
+    assert _blob(old_url) is None
+    assert _blob(institution.logo_url).ref_count == 1
+
+
+def test_rollback_removes_file_written_by_upload(backend):
+    saved = save_upload(_upload(b"subida que no se confirma"))
+    key = _blob(saved["storage_path"]).storage_key
+    assert backend.exists(key)
+
+    db.session.rollback()
+
+    assert _blob(saved["storage_path"]) is None
+    assert not backend.exists(key)
+
+
+def test_session_close_removes_uncommitted_file(backend):
+    saved = save_upload(_upload(b"subida abandonada"))
+    key = saved["storage_path"].rsplit("/blobs/", 1)[1]
+
+    db.session.remove()
+
+    assert not backend.exists(key)
+
+
+def test_reupload_before_commit_keeps_released_blob(backend, entrada):
+    attachment = _attach("bitacora", entrada.id, b"contenido compartido")
+    url = attachment.storage_path
+    key = _blob(url).storage_key
+
+    db.session.delete(attachment)
+    db.session.flush()
+    # Otra referencia al mismo contenido antes de que el purgado post-commit revise la fila.
+    _attach("bitacora", entrada.id, b"contenido compartido")
+
+    assert _blob(url).ref_count == 1
+    assert backend.exists(key)
+
+
+def test_savepoint_commit_does_not_purge_early(backend, entrada):
+    attachment = _attach("bitacora", entrada.id, b"contenido en savepoint")
+    url = attachment.storage_path
+    key = _blob(url).storage_key
+
+    db.session.delete(attachment)
+    db.session.flush()
+    with db.session.begin_nested():
+        pass
+    assert backend.exists(key)
+
+    db.session.rollback()
+    assert _blob(url).ref_count == 1
+    assert backend.exists(key)
+
+
+def test_upload_restores_file_of_half_purged_blob(backend, entrada):
+    attachment = _attach("bitacora", entrada.id, b"purgado a medias")
+    blob = _blob(attachment.storage_path)
+    blob.ref_count = 0
+    db.session.commit()
+    backend.delete(blob.storage_key)
+
+    _attach("bitacora", entrada.id, b"purgado a medias")
+
+    assert _blob(attachment.storage_path).ref_count == 1
+    assert backend.exists(blob.storage_key)
@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+
+import pytest
+
+from api.utils.pagination import encode_cursor
+from conftest import login
+from extensions import db
+from models import Lesson, RoleEnum, Task
+from services.view_data_service import ViewDataService
+
+
+@pytest.fixture()
+def teacher_with_lessons(institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    other = make_profile(institution, RoleEnum.PROFESOR)
+    start = date(2025, 3, 3)
+    for number in range(7):
+        # Dos clases por día: el desempate por id tiene que mantener el orden entre páginas.
+        lesson = Lesson(
+            institution_id=institution.id,
+            teacher_profile_id=teacher.id,
+            title=f"Clase {number}",
+            class_date=start + timedelta(days=number // 2),
+        )
+        db.session.add(lesson)
+        db.session.flush()
+        for task_number in range(2):
+            due = None if task_number and number % 3 == 0 else start + timedelta(days=(number + task_number) // 3)
+            db.session.add(
+                Task(
+                    institution_id=institution.id,
+                    lesson_id=lesson.id,
+                    title=f"Tarea {number}.{task_number}",
+                    due_date=due,
+                )
+            )
+    db.session.add(Lesson(institution_id=institution.id, teacher_profile_id=other.id, title="Ajena", class_date=start))
+    db.session.commit()
+    return teacher
+
+
+def _walk(client, url: str, key: str) -> list[dict]:
+    rows, cursor = [], None
+    while True:
+        response = client.get(url, query_string={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert len(payload[key]) <= 3
+        rows.extend(payload[key])
+        cursor = payload["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def test_lesson_pages_round_trip(client, teacher_with_lessons):
+    login(client, teacher_with_lessons)
+
+    rows = _walk(client, "/api/dashboard/clases", "clases")
+
+    expected = (
+        Lesson.query.filter_by(teacher_profile_id=teacher_with_lessons.id)
+        .order_by(Lesson.class_date.desc(), Lesson.id.desc())
+        .all()
+    )
+    assert [row["id"] for row in rows] == [lesson.id for lesson in expected]
+
+
+def test_task_pages_round_trip(client, teacher_with_lessons):
+    login(client, teacher_with_lessons)
+
+    rows = _walk(client, "/api/dashboard/tareas", "tareas")
+
+    tasks = Task.query.join(Lesson).filter(Lesson.teacher_profile_id == teacher_with_lessons.id).all()
+    expected = sorted(tasks, key=lambda task: (task.due_date is None, task.due_date or date.min, task.id))
+    assert [row["id"] for row in rows] == [task.id for task in expected]
+    assert rows[-1]["due_date"] is None
+
+
+def test_service_pages_match_api(teacher_with_lessons):
+    lessons, cursor = ViewDataService.teacher_lessons_page(teacher_with_lessons, limit=4)
+    rest, last_cursor = ViewDataService.teacher_lessons_page(teacher_with_lessons, limit=4, after=cursor)
+
+    assert len(lessons) == 4 and len(rest) == 3
+    assert last_cursor is None
+    assert not {lesson.id for lesson in lessons} & {lesson.id for lesson in rest}
+
+
+@pytest.mark.parametrize(
+    ("url", "cursor"),
+    [
+        ("/api/dashboard/clases", encode_cursor("2025-03-03")),
+        ("/api/dashboard/clases", encode_cursor("2025-03-03", "5")),
+        ("/api/dashboard/clases", encode_cursor(20250303, 5)),
+        ("/api/dashboard/clases", encode_cursor("marzo", 5)),
+        ("/api/dashboard/tareas", encode_cursor(False, "2025-03-03")),
+        ("/api/dashboard/tareas", encode_cursor(False, None, 5)),
+        ("/api/dashboard/tareas", encode_cursor(0, "2025-03-03", 5)),
+        ("/api/dashboard/tareas", encode_cursor(False, "2025-03-03", 5.5)),
+        ("/api/dashboard/tareas", "no-es-base64!"),
+    ],
+)
+def test_malformed_cursor_returns_400(client, teacher_with_lessons, url, cursor):
+    login(client, teacher_with_lessons)
+
+    response = client.get(url, query_string={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "cursor inválido"}
@@ -0,0 +1,134 @@
+from extensions import db
+from models import (
+    Attachment,
+    BitacoraEntrada,
+    Institution,
+    Message,
+    MessageThread,
+    MessageThreadParticipant,
+    PlatformTheme,
+    RoleEnum,
+    Task,
+    TaskSubmission,
+)
+from services.file_delivery_service import FileDeliveryService
+
+
+def _attachment(url: str, profile, context_type: str = "task", context_id: int | None = None) -> None:
+    if context_id is None:
+        task = Task(institution_id=profile.institution_id, title="Guía")
+        db.session.add(task)
+        db.session.flush()
+        context_id = task.id
+    db.session.add(
+        Attachment(
+            context_type=context_type,
+            context_id=context_id,
+            filename="guia.pdf",
+            storage_path=url,
+            uploaded_by_profile_id=profile.id,
+        )
+    )
+    db.session.commit()
+
+
+def test_logos_are_public(institution):
+    institution.logo_url = "/uploads/blobs/aa/logo.png"
+    db.session.add(PlatformTheme(logo_url="/uploads/blobs/bb/plataforma.png"))
+    db.session.commit()
+
+    assert FileDeliveryService.is_public("/uploads/blobs/aa/logo.png")
+    assert FileDeliveryService.is_public("/uploads/blobs/bb/plataforma.png")
+    assert not FileDeliveryService.is_public("/uploads/blobs/cc/otro.pdf")
+    assert FileDeliveryService.can_access("/uploads/blobs/aa/logo.png", None)
+
+
+def test_task_attachment_visible_only_within_task_institution(institution, make_profile):
+    other = Institution(name="Otro colegio")
+    db.session.add(other)
+    db.session.commit()
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    _attachment("/uploads/blobs/dd/guia.pdf", teacher)
+
+    assert FileDeliveryService.can_access("/uploads/blobs/dd/guia.pdf", make_profile(institution, RoleEnum.ALUMNO))
+    assert not FileDeliveryService.can_access("/uploads/blobs/dd/guia.pdf", make_profile(other, RoleEnum.ALUMNO))
+    assert not FileDeliveryService.can_access("/uploads/blobs/dd/guia.pdf", None)
+    assert FileDeliveryService.can_access("/uploads/blobs/dd/guia.pdf", make_profile(None, RoleEnum.ADMIN))
+
+
+def test_student_cannot_fetch_another_students_bitacora_attachment(institution, make_profile):
+    psico = make_profile(institution, RoleEnum.PSICOPEDAGOGIA)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    classmate = make_profile(institution, RoleEnum.ALUMNO)
+    entry = BitacoraEntrada(
+        institution_id=institution.id,
+        student_profile_id=student.id,
+        author_profile_id=psico.id,
+        nota="Entrevista con la familia",
+        visible_para_alumno=True,
+        visible_para_padres=False,
+    )
+    db.session.add(entry)
+    db.session.flush()
+    _attachment("/uploads/blobs/ee/informe.pdf", psico, "bitacora", entry.id)
+
+    assert FileDeliveryService.can_access("/uploads/blobs/ee/informe.pdf", student)
+    assert FileDeliveryService.can_access("/uploads/blobs/ee/informe.pdf", make_profile(institution, RoleEnum.PROFESOR))
+    assert not FileDeliveryService.can_access("/uploads/blobs/ee/informe.pdf", classmate)
+    assert not FileDeliveryService.can_access("/uploads/blobs/ee/informe.pdf", make_profile(institution, RoleEnum.PADRE))
+
+    entry.visible_para_alumno = False
+    db.session.commit()
+    assert not FileDeliveryService.can_access("/uploads/blobs/ee/informe.pdf", student)
+
+
+def test_message_attachment_visible_only_to_thread_participants(institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    thread = MessageThread(subject="Consulta")
+    db.session.add(thread)
+    db.session.flush()
+    for profile in (teacher, student):
+        db.session.add(MessageThreadParticipant(thread_id=thread.id, profile_id=profile.id))
+    message = Message(thread_id=thread.id, sender_profile_id=student.id, text="Adjunto mi duda")
+    db.session.add(message)
+    db.session.flush()
+    _attachment("/uploads/blobs/ff/duda.png", student, "message", message.id)
+
+    assert FileDeliveryService.can_access("/uploads/blobs/ff/duda.png", teacher)
+    assert not FileDeliveryService.can_access("/uploads/blobs/ff/duda.png", make_profile(institution, RoleEnum.ALUMNO))
+    assert not FileDeliveryService.can_access("/uploads/blobs/ff/duda.png", make_profile(institution, RoleEnum.PROFESOR))
+
+
+def test_submission_attachment_visible_to_its_student_and_staff(institution, make_profile):
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    task = Task(institution_id=institution.id, title="Entrega")
+    db.session.add(task)
+    db.session.flush()
+    submission = TaskSubmission(task_id=task.id, student_profile_id=student.id)
+    db.session.add(submission)
+    db.session.flush()
+    _attachment("/uploads/blobs/gg/audio.mp3", student, "submission", submission.id)
+
+    assert FileDeliveryService.can_access("/uploads/blobs/gg/audio.mp3", make_profile(institution, RoleEnum.PROFESOR))
+    assert not FileDeliveryService.can_access("/uploads/blobs/gg/audio.mp3", make_profile(institution, RoleEnum.ALUMNO))
+
+
+def test_shared_blob_visible_if_any_parent_allows_it(institution, make_profile):
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    student = make_profile(institution, RoleEnum.ALUMNO)
+    classmate = make_profile(institution, RoleEnum.ALUMNO)
+    entry = BitacoraEntrada(
+        institution_id=institution.id,
+        student_profile_id=student.id,
+        author_profile_id=teacher.id,
+        nota="Misma guía",
+    )
+    db.session.add(entry)
+    db.session.flush()
+    _attachment("/uploads/blobs/hh/guia.pdf", teacher, "bitacora", entry.id)
+    assert not FileDeliveryService.can_access("/uploads/blobs/hh/guia.pdf", classmate)
+
+    # El mismo contenido subido como adjunto de una tarea de la institución.
+    _attachment("/uploads/blobs/hh/guia.pdf", teacher)
+    assert FileDeliveryService.can_access("/uploads/blobs/hh/guia.pdf", classmate)
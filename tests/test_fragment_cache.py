@@ -0,0 +1,100 @@
+from flask import Flask
+
+from extensions import db
+from models import Attachment, Grade, RoleEnum, Section
+from services import FragmentCache
+from services import fragment_cache as fragment_cache_module
+from services.fragment_cache import MemoryFragmentBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_memory_backend_honours_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fragment_cache_module.time, "monotonic", clock.monotonic)
+    backend = MemoryFragmentBackend()
+
+    backend.set("panel", "<ul></ul>", ttl=60)
+    clock.now += 59
+    assert backend.get("panel") == "<ul></ul>"
+
+    clock.now += 2
+    assert backend.get("panel") is None
+    assert "panel" not in backend._entries
+
+
+def test_memory_backend_is_refused_with_several_workers():
+    app = Flask(__name__)
+    app.config.update(WEB_CONCURRENCY=2, FRAGMENT_CACHE_REDIS_URL=None)
+
+    FragmentCache.init_app(app)
+
+    assert app.extensions[FragmentCache.EXTENSION_KEY] is None
+    with app.app_context():
+        # Sin backend se renderiza siempre.
+        assert FragmentCache.render("panel", caller=lambda: "<p>hola</p>") == "<p>hola</p>"
+
+
+def test_single_worker_uses_memory_backend():
+    app = Flask(__name__)
+    app.config.update(WEB_CONCURRENCY=1, FRAGMENT_CACHE_REDIS_URL=None, FRAGMENT_CACHE_SIZE=8)
+
+    FragmentCache.init_app(app)
+
+    assert isinstance(app.extensions[FragmentCache.EXTENSION_KEY], MemoryFragmentBackend)
+
+
+def _version(institution) -> int:
+    return FragmentCache._backend().version(FragmentCache._scope(institution.id))
+
+
+def test_section_membership_and_attachments_bump_institution_version(app, institution, make_profile):
+    grade = Grade(institution_id=institution.id, name="3°")
+    db.session.add(grade)
+    db.session.flush()
+    section_a = Section(grade_id=grade.id, name="A")
+    section_b = Section(grade_id=grade.id, name="B")
+    db.session.add_all([section_a, section_b])
+    db.session.commit()
+    student = make_profile(institution, RoleEnum.ALUMNO)
+
+    before = _version(institution)
+    section_a.name = "3° A"
+    db.session.commit()
+    assert _version(institution) > before
+
+    before = _version(institution)
+    student.section_id = section_b.id
+    db.session.commit()
+    assert _version(institution) > before
+
+    before = _version(institution)
+    db.session.add(
+        Attachment(
+            context_type="bitacora",
+            context_id=1,
+            filename="informe.pdf",
+            storage_path="/uploads/blobs/aa/informe.pdf",
+            uploaded_by_profile_id=student.id,
+        )
+    )
+    db.session.commit()
+    assert _version(institution) > before
+
+
+def test_savepoint_does_not_bump_before_outer_commit(app, institution):
+    before = _version(institution)
+    db.session.add(Grade(institution_id=institution.id, name="4°"))
+    db.session.flush()
+    with db.session.begin_nested():
+        db.session.add(Grade(institution_id=institution.id, name="5°"))
+    assert _version(institution) == before
+
+    db.session.commit()
+    assert _version(institution) == before + 1
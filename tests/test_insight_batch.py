@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import InsightReportJob, RoleEnum
+from services import InsightBatchService
+
+
+def _job(institution, author, status: str, *, age: timedelta, heartbeat: timedelta | None = None) -> InsightReportJob:
+    now = datetime.utcnow()
+    job = InsightReportJob(
+        institution_id=institution.id,
+        author_profile_id=author.id,
+        target_kind="section",
+        target_id=1,
+        status=status,
+        total=10,
+        created_at=now - age,
+        heartbeat_at=now - heartbeat if heartbeat is not None else None,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_orphaned_jobs_are_marked_failed(app, institution, make_profile, monkeypatch):
+    monkeypatch.setitem(app.config, "INSIGHT_BATCH_STALE_SECONDS", 60)
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    orphan_pending = _job(institution, teacher, InsightReportJob.STATUS_PENDING, age=timedelta(hours=1))
+    orphan_running = _job(
+        institution, teacher, InsightReportJob.STATUS_RUNNING, age=timedelta(hours=1), heartbeat=timedelta(minutes=5)
+    )
+    beating = _job(institution, teacher, InsightReportJob.STATUS_RUNNING, age=timedelta(hours=1), heartbeat=timedelta(seconds=5))
+    done = _job(institution, teacher, InsightReportJob.STATUS_DONE, age=timedelta(hours=1))
+
+    assert InsightBatchService.fail_stale_jobs(institution.id) == 2
+
+    db.session.expire_all()
+    assert orphan_pending.status == InsightReportJob.STATUS_ERROR
+    assert orphan_running.status == InsightReportJob.STATUS_ERROR
+    assert orphan_running.finished_at is not None
+    assert beating.status == InsightReportJob.STATUS_RUNNING
+    assert done.status == InsightReportJob.STATUS_DONE
+
+
+def test_jobs_queued_in_this_process_are_not_failed(app, institution, make_profile, monkeypatch):
+    monkeypatch.setitem(app.config, "INSIGHT_BATCH_STALE_SECONDS", 60)
+    teacher = make_profile(institution, RoleEnum.PROFESOR)
+    queued = _job(institution, teacher, InsightReportJob.STATUS_PENDING, age=timedelta(hours=1))
+    monkeypatch.setitem(app.extensions, InsightBatchService.LIVE_JOBS_KEY, {queued.id})
+
+    assert InsightBatchService.fail_stale_jobs(institution.id) == 0
+    assert InsightBatchService.recent_jobs(teacher)[0].status == InsightReportJob.STATUS_PENDING
@@ -0,0 +1,101 @@
+import pytest
+
+from conftest import login
+from extensions import db
+from models import (
+    CurriculumDocument,
+    Plan,
+    PlanDocument,
+    PlanItem,
+    PlanSuggestionIndex,
+    RoleEnum,
+    StudyPlan,
+)
+from services import PlanIndexService
+
+
+@pytest.fixture()
+def plan_with_documents(institution):
+    study_plan = StudyPlan(institution_id=institution.id, name="Matemática 3°")
+    db.session.add(study_plan)
+    db.session.flush()
+    plan = Plan(institution_id=institution.id, study_plan_id=study_plan.id, nombre="Plan", contenido_bruto="...")
+    db.session.add(plan)
+    db.session.flush()
+
+    documents = []
+    for area in ("Geometría", "Números"):
+        curriculum_document = CurriculumDocument(institution_id=institution.id, title=f"Diseño {area}")
+        db.session.add(curriculum_document)
+        db.session.flush()
+        document = PlanDocument(
+            study_plan_id=study_plan.id,
+            institution_id=institution.id,
+            curriculum_document_id=curriculum_document.id,
+            title=area,
+        )
+        db.session.add(document)
+        db.session.flush()
+        db.session.add(
+            PlanItem(
+                plan_id=plan.id,
+                plan_document_id=document.id,
+                grado="3°",
+                area=area,
+                descripcion=f"Objetivo de {area}",
+            )
+        )
+        documents.append(document)
+    study_plan.curriculum_document_id = documents[0].curriculum_document_id
+    db.session.commit()
+    return plan, documents
+
+
+def _areas(client, plan):
+    return client.get(f"/api/planes/{plan.id}/areas?grado=3°")
+
+
+def test_get_without_index_serves_items_without_writing(client, institution, make_profile, plan_with_documents):
+    plan, _documents = plan_with_documents
+    login(client, make_profile(institution, RoleEnum.PROFESOR))
+
+    response = _areas(client, plan)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"areas": ["Geometría", "Números"]}
+    assert response.headers["ETag"]
+    db.session.expire_all()
+    assert db.session.get(Plan, plan.id).suggestion_index_etag is None
+    assert PlanSuggestionIndex.query.filter_by(plan_id=plan.id).count() == 0
+
+
+def test_index_and_fallback_share_etag(client, institution, make_profile, plan_with_documents):
+    plan, _documents = plan_with_documents
+    login(client, make_profile(institution, RoleEnum.PROFESOR))
+    unindexed = _areas(client, plan)
+
+    PlanIndexService.rebuild(plan)
+    db.session.commit()
+    indexed = _areas(client, plan)
+
+    assert indexed.get_json() == unindexed.get_json()
+    assert indexed.headers["ETag"] == unindexed.headers["ETag"]
+
+
+def test_deleting_plan_document_refreshes_index(client, institution, make_profile, plan_with_documents):
+    plan, documents = plan_with_documents
+    PlanIndexService.rebuild(plan)
+    db.session.commit()
+    login(client, make_profile(institution, RoleEnum.PROFESOR))
+    before = _areas(client, plan)
+    etag = before.headers["ETag"]
+
+    response = client.post("/plan", data={"action": "delete_plan_document", "plan_document_id": documents[1].id})
+    assert response.status_code == 302
+
+    after = client.get(f"/api/planes/{plan.id}/areas?grado=3°", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.get_json() == {"areas": ["Geometría"]}
+    assert after.headers["ETag"] != etag
+    suggestions = client.get(f"/api/planes/{plan.id}/sugerencias?grado=3°").get_json()
+    assert [entry["area"] for entry in suggestions["areas"]] == ["Geometría"]
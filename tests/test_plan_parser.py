@@ -0,0 +1,126 @@
+import json
+import re
+
+import pytest
+
+from extensions import db
+from models import Plan, PlanFragment, PlanItem
+from services import AIClient, PlanParserService
+
+
+PARAGRAPHS = [
+    f"Contenido {number}: los alumnos resuelven problemas de la unidad {number} con material concreto y registran sus estrategias."
+    for number in range(1, 5)
+]
+
+
+class CountingClient(AIClient):
+    """Devuelve un ítem por fragmento sin salir a la red y cuenta las llamadas."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, prompt: str, context: dict, *, call_site: str | None = None) -> dict:
+        self.calls += 1
+        fragment = re.search(r"<<<\n(.*)\n>>>", prompt, re.S).group(1)
+        items = [{"grado": "3°", "area": "Matemática", "descripcion": fragment.splitlines()[0]}]
+        return {"text": json.dumps(items, ensure_ascii=False), "model": "stub"}
+
+
+@pytest.fixture()
+def plan(institution):
+    plan = Plan(institution_id=institution.id, nombre="Plan", contenido_bruto="\n\n".join(PARAGRAPHS))
+    db.session.add(plan)
+    db.session.commit()
+    return plan
+
+
+def _parse(plan, client):
+    # Presupuesto de un párrafo por fragmento: cada edición afecta a un único fragmento.
+    estimator = client.token_estimator()
+    budget = max(estimator.count(paragraph) for paragraph in PARAGRAPHS) + 1
+    return PlanParserService.parse_plan_with_llm(plan, client=client, chunk_size=budget, reset_previous=True)
+
+
+def test_first_parse_calls_llm_once_per_fragment(plan):
+    client = CountingClient()
+
+    assert _parse(plan, client) == len(PARAGRAPHS)
+    assert plan.parse_stats["fragment_count"] == len(PARAGRAPHS)
+    assert client.calls == len(PARAGRAPHS)
+
+
+def test_reparse_without_edits_makes_no_llm_calls(plan):
+    _parse(plan, CountingClient())
+
+    client = CountingClient()
+    assert _parse(plan, client) == len(PARAGRAPHS)
+    assert client.calls == 0
+
+
+def test_editing_one_paragraph_makes_exactly_one_llm_call(plan):
+    _parse(plan, CountingClient())
+
+    edited = list(PARAGRAPHS)
+    edited[2] = edited[2].replace("material concreto", "calculadora")
+    plan.contenido_bruto = "\n\n".join(edited)
+    db.session.commit()
+
+    client = CountingClient()
+    assert _parse(plan, client) == len(PARAGRAPHS)
+    assert client.calls == 1
+    descriptions = {item.descripcion for item in PlanItem.query.filter_by(plan_id=plan.id)}
+    assert descriptions == set(edited)
+
+
+class FailingClient(CountingClient):
+    """Falla (respuesta heurística) para los fragmentos que contienen failing_text."""
+
+    def __init__(self, failing_text: str):
+        super().__init__()
+        self.failing_text = failing_text
+
+    def generate(self, prompt: str, context: dict, *, call_site: str | None = None) -> dict:
+        if self.failing_text in prompt:
+            self.calls += 1
+            return {"text": "", "model": "heuristic"}
+        return super().generate(prompt, context, call_site=call_site)
+
+
+def test_failed_fragment_keeps_previous_items(plan):
+    _parse(plan, CountingClient())
+
+    edited = list(PARAGRAPHS)
+    edited[1] = edited[1].replace("material concreto", "regletas")
+    plan.contenido_bruto = "\n\n".join(edited)
+    db.session.commit()
+
+    client = FailingClient("regletas")
+    _parse(plan, client)
+
+    assert client.calls == 1
+    descriptions = {item.descripcion for item in PlanItem.query.filter_by(plan_id=plan.id)}
+    assert PARAGRAPHS[1] in descriptions
+    assert descriptions >= {PARAGRAPHS[0], PARAGRAPHS[2], PARAGRAPHS[3]}
+
+    # Reintento exitoso: ahora sí se reemplazan los ítems del fragmento editado.
+    _parse(plan, CountingClient())
+    descriptions = {item.descripcion for item in PlanItem.query.filter_by(plan_id=plan.id)}
+    assert descriptions == set(edited)
+
+
+def test_concurrent_fragment_cache_insert_reuses_existing_row(plan, monkeypatch):
+    # Otro plan con el mismo contenido guardó los fragmentos entre la consulta al cache y el INSERT.
+    _parse(plan, CountingClient())
+    twin = Plan(institution_id=plan.institution_id, nombre="Plan gemelo", contenido_bruto=plan.contenido_bruto)
+    db.session.add(twin)
+    db.session.commit()
+    monkeypatch.setattr(PlanParserService, "_cached_fragment_items", staticmethod(lambda *_: None))
+
+    client = CountingClient()
+    assert _parse(twin, client) == len(PARAGRAPHS)
+
+    assert client.calls == len(PARAGRAPHS)
+    assert PlanFragment.query.filter_by(institution_id=plan.institution_id).count() == len(PARAGRAPHS)
+    assert PlanItem.query.filter_by(plan_id=twin.id).count() == len(PARAGRAPHS)
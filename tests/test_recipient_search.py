@@ -0,0 +1,36 @@
+from conftest import login
+from extensions import db
+from models import Institution, RoleEnum
+
+
+def test_alumno_cannot_search_recipients(client, institution, make_profile):
+    student = make_profile(institution, RoleEnum.ALUMNO, "Ana Alumna")
+    make_profile(institution, RoleEnum.PROFESOR, "Ana Profesora")
+    login(client, student)
+
+    response = client.get("/api/profiles/buscar?q=an")
+
+    assert response.status_code == 403
+
+
+def test_padre_cannot_search_recipients(client, institution, make_profile):
+    parent = make_profile(institution, RoleEnum.PADRE, "Pablo Padre")
+    login(client, parent)
+
+    assert client.get("/api/profiles/buscar?q=pa").status_code == 403
+
+
+def test_staff_only_sees_own_institution(client, institution, make_profile):
+    other = Institution(name="Otro colegio")
+    db.session.add(other)
+    db.session.commit()
+    teacher = make_profile(institution, RoleEnum.PROFESOR, "Tomás Docente")
+    make_profile(institution, RoleEnum.ALUMNO, "Ana Propia")
+    make_profile(other, RoleEnum.ALUMNO, "Ana Ajena")
+    login(client, teacher)
+
+    response = client.get("/api/profiles/buscar?q=ana")
+
+    assert response.status_code == 200
+    names = [item["full_name"] for item in response.get_json()["resultados"]]
+    assert names == ["Ana Propia"]
@@ -0,0 +1,51 @@
+import io
+
+from conftest import login
+from extensions import db
+from models import Profile, RoleEnum
+
+
+ROSTER = (
+    "email,nombre,rol,contraseña\n"
+    "familia@example.com,Familia Gómez,PADRE,\n"
+    "alumno@example.com,Ana Gómez,ALUMNO,\n"
+    "docente@example.com,Tomás Ruiz,PROFESOR,secreta123\n"
+)
+
+
+def _import(client, institution, *, dry_run=False):
+    query = "?dry_run=1" if dry_run else ""
+    return client.post(
+        f"/api/institutions/{institution.id}/profiles/import{query}",
+        data={"file": (io.BytesIO(ROSTER.encode("utf-8")), "padron.csv")},
+        content_type="multipart/form-data",
+    )
+
+
+def test_import_returns_activation_links(client, institution, make_profile):
+    login(client, make_profile(institution, RoleEnum.ADMIN_COLEGIO))
+
+    response = _import(client, institution)
+
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report["created_profiles"] == 3
+    assert report["activation_tokens"] == 2
+    activations = {item["email"]: item for item in report["activations"]}
+    assert set(activations) == {"familia@example.com", "alumno@example.com"}
+
+    link = activations["familia@example.com"]["magic_link"]
+    token = link.rsplit("/", 1)[-1]
+    profile = Profile.query.filter_by(activation_token=token).one()
+    assert profile.full_name == "Familia Gómez"
+    assert client.get(link).status_code == 200
+
+
+def test_dry_run_returns_no_activation_links(client, institution, make_profile):
+    login(client, make_profile(institution, RoleEnum.ADMIN_COLEGIO))
+
+    report = _import(client, institution, dry_run=True).get_json()
+
+    assert report["valid_rows"] == 3
+    assert report["activations"] == []
+    assert db.session.query(Profile).filter(Profile.activation_token.isnot(None)).count() == 0
@@ -0,0 +1,62 @@
+import threading
+
+from sqlalchemy import text
+
+from extensions import db
+from models import AICallLog
+
+
+def _pragma(name: str):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_file_database_uses_production_pragmas(app):
+    # conftest usa una base SQLite en archivo: cada conexión del pool pasa por SQLitePragmas.
+    assert db.engine.url.database.endswith("test.db")
+
+    assert _pragma("journal_mode") == "wal"
+    assert _pragma("busy_timeout") == app.config["SQLITE_BUSY_TIMEOUT_MS"]
+    assert _pragma("synchronous") == 1  # NORMAL
+    assert _pragma("temp_store") == 2  # MEMORY
+
+
+def test_pragmas_apply_to_every_pooled_connection(app):
+    with db.engine.connect() as first, db.engine.connect() as second:
+        for connection in (first, second):
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == app.config["SQLITE_BUSY_TIMEOUT_MS"]
+
+
+def test_concurrent_writers_do_not_hit_database_locked(app):
+    writers, writes_per_writer = 4, 25
+    errors = []
+
+    def write(number: int) -> None:
+        with app.app_context():
+            try:
+                for _ in range(writes_per_writer):
+                    db.session.add(AICallLog(call_site=f"writer-{number}"))
+                    db.session.commit()
+            except Exception as exc:  # pragma: no cover - sólo si aparece "database is locked"
+                errors.append(exc)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert AICallLog.query.count() == writers * writes_per_writer
+
+
+def test_savepoint_does_not_commit_outer_transaction(app):
+    db.session.execute(text("SELECT 1"))
+    with db.session.begin_nested():
+        db.session.add(AICallLog(call_site="dentro-del-savepoint"))
+
+    db.session.rollback()
+
+    assert AICallLog.query.count() == 0